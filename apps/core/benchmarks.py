@@ -0,0 +1,273 @@
+"""
+In-process endpoint benchmarks, run by ``manage.py benchmark`` and the test
+suite.
+
+Every scenario sends requests through the Django test client, so the whole
+middleware stack, authentication, throttling and the view are measured
+without a server or network in between.
+"""
+
+import math
+import statistics
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from knox.models import AuthToken
+
+from apps.core.throttles import get_redis_client
+from apps.users.models import CustomUser
+
+BENCHMARK_PASSWORD = "benchmark-password-123"
+
+# Instrumented requests per scenario for queries, cache calls and allocations
+INSTRUMENTED_SAMPLES = 20
+
+# Metrics compared against the threshold as a ratio, and exactly
+RATIO_METRICS = ("p50_ms", "p95_ms", "p99_ms", "alloc_peak_kib")
+COUNT_METRICS = ("queries", "cache_calls")
+
+CACHE_METHODS = (
+    "add",
+    "get",
+    "set",
+    "touch",
+    "delete",
+    "get_many",
+    "has_key",
+    "incr",
+    "decr",
+    "set_many",
+    "delete_many",
+)
+
+
+class BenchmarkError(Exception):
+    """
+    Raised when an endpoint answers with an unexpected status code.
+    """
+
+
+class BenchmarkContext:
+    """
+    The users, tokens and clients shared by the scenarios of one run.
+
+    Each scenario gets its own user, so no user throttle is shared between
+    scenarios, and anonymous requests rotate the client IP.
+    """
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex[:8]
+        self.tokens = {}
+        for name in ("admin", "profile_get", "profile_patch", "login"):
+            email = f"bench-{name}-{self.run_id}@example.com"
+            if name == "admin":
+                user = CustomUser.objects.create_superuser(email, BENCHMARK_PASSWORD)
+            else:
+                user = CustomUser.objects.create_user(email, BENCHMARK_PASSWORD)
+            _, self.tokens[name] = AuthToken.objects.create(user=user)
+        self.login_email = f"bench-login-{self.run_id}@example.com"
+
+    def auth(self, name: str) -> dict:
+        return {"HTTP_AUTHORIZATION": f"Bearer {self.tokens[name]}"}
+
+    def ip(self, i: int) -> dict:
+        return {"REMOTE_ADDR": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"}
+
+
+def bench_ping(client, context, i):
+    return client.get(reverse("v1:core:ping"), **context.ip(i))
+
+
+def bench_login(client, context, i):
+    client.cookies.clear()
+    return client.post(
+        reverse("v1:users:knox_login"),
+        {"email": context.login_email, "password": BENCHMARK_PASSWORD},
+        content_type="application/json",
+        **context.ip(i),
+    )
+
+
+def bench_profile_get(client, context, i):
+    return client.get(reverse("v1:users:profile"), **context.auth("profile_get"))
+
+
+def bench_profile_patch(client, context, i):
+    return client.patch(
+        reverse("v1:users:profile"),
+        {"first_name": f"Bench {i}"},
+        content_type="application/json",
+        **context.auth("profile_patch"),
+    )
+
+
+def bench_create_user(client, context, i):
+    return client.post(
+        reverse("v1:users:create"),
+        {
+            "email": f"bench-new-{context.run_id}-{i}@example.com",
+            "password": BENCHMARK_PASSWORD,
+            "password2": BENCHMARK_PASSWORD,
+        },
+        content_type="application/json",
+        **context.auth("admin"),
+    )
+
+
+# name: (request function, expected status, default iterations)
+SCENARIOS = {
+    "ping": (bench_ping, 200, 500),
+    "login": (bench_login, 200, 20),
+    "profile_get": (bench_profile_get, 200, 300),
+    "profile_patch": (bench_profile_patch, 200, 200),
+    "create_user": (bench_create_user, 201, 20),
+}
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    return samples[max(math.ceil(q * len(samples)) - 1, 0)]
+
+
+@contextmanager
+def count_cache_calls():
+    """
+    Counts round-trips to the default cache.
+
+    With django-redis every command and pipeline sent by the redis client is
+    counted, including the throttle scripts; other backends count calls to
+    the Django cache API.
+    """
+    counter = {"calls": 0}
+    cache = caches["default"]
+    if get_redis_client(cache) is not None:
+        import redis
+
+        targets = [(redis.Redis, "execute_command"), (redis.client.Pipeline, "execute")]
+    else:
+        targets = [(cache, name) for name in CACHE_METHODS]
+
+    originals = []
+    for target, name in targets:
+        original = getattr(target, name)
+        originals.append((target, name, original))
+
+        def counted(*args, _original=original, **kwargs):
+            counter["calls"] += 1
+            return _original(*args, **kwargs)
+
+        setattr(target, name, counted)
+    try:
+        yield counter
+    finally:
+        for target, name, original in reversed(originals):
+            if isinstance(target, type):
+                setattr(target, name, original)
+            else:
+                delattr(target, name)
+
+
+def run_scenario(name: str, context, iterations: int | None = None) -> dict:
+    request, expected_status, default_iterations = SCENARIOS[name]
+    iterations = iterations or default_iterations
+    client = Client()
+
+    def send(i):
+        response = request(client, context, i)
+        if response.status_code != expected_status:
+            raise BenchmarkError(
+                f"{name} answered {response.status_code}, expected {expected_status}"
+            )
+
+    # Warm up caches, lazy imports and the token cache before measuring
+    warmup = max(iterations // 10, 1)
+    for i in range(warmup):
+        send(i)
+
+    timings = []
+    for i in range(warmup, warmup + iterations):
+        started_at = time.perf_counter()
+        send(i)
+        timings.append((time.perf_counter() - started_at) * 1000)
+    timings.sort()
+
+    # Instrumentation slows requests down, so it runs in a separate pass
+    samples = min(iterations, INSTRUMENTED_SAMPLES)
+    offset = warmup + iterations
+    peaks = []
+    with CaptureQueriesContext(connection) as queries, count_cache_calls() as cache:
+        tracemalloc.start()
+        try:
+            for i in range(offset, offset + samples):
+                tracemalloc.reset_peak()
+                baseline, _ = tracemalloc.get_traced_memory()
+                send(i)
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append((peak - baseline) / 1024)
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "p99_ms": round(percentile(timings, 0.99), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "queries": round(len(queries) / samples, 2),
+        "cache_calls": round(cache["calls"] / samples, 2),
+        "alloc_peak_kib": round(statistics.median(peaks), 1),
+    }
+
+
+def run_benchmarks(names=None, iterations: int | None = None) -> dict:
+    """
+    Runs the named scenarios (all by default) and returns their metrics.
+
+    The cache gets a fresh key prefix so throttle counters and cached tokens
+    from earlier runs cannot leak into the measurements.
+    """
+    cache_settings = {
+        alias: {**config, "KEY_PREFIX": f"benchmark-{uuid.uuid4().hex[:8]}"}
+        for alias, config in settings.CACHES.items()
+    }
+    with override_settings(CACHES=cache_settings):
+        context = BenchmarkContext()
+        return {
+            name: run_scenario(name, context, iterations) for name in names or SCENARIOS
+        }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """
+    Returns a message for every metric of ``current`` that regressed from
+    ``baseline``.
+
+    Timings and allocations regress when they grow by more than
+    ``threshold`` (a fraction); query and cache round-trip counts regress on
+    any increase.
+    """
+    regressions = []
+    for name, metrics in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in RATIO_METRICS:
+            if metric in base and metrics[metric] > base[metric] * (1 + threshold):
+                regressions.append(
+                    f"{name}.{metric}: {base[metric]} -> {metrics[metric]} "
+                    f"(+{(metrics[metric] / max(base[metric], 1e-9) - 1) * 100:.0f}%)"
+                )
+        for metric in COUNT_METRICS:
+            if metric in base and metrics[metric] > base[metric] + 0.01:
+                regressions.append(
+                    f"{name}.{metric}: {base[metric]} -> {metrics[metric]}"
+                )
+    return regressions
@@ -0,0 +1,71 @@
+import asyncio
+import weakref
+from typing import TYPE_CHECKING
+
+from django_redis.client import DefaultClient
+
+from .timing import record_timing, timed
+
+if TYPE_CHECKING:
+    import redis.asyncio
+
+# asyncio clients are bound to the event loop they were created in
+_async_clients = weakref.WeakKeyDictionary()
+
+
+class TimedRedisClient(DefaultClient):
+    """
+    django-redis client that records the cache API calls of a request in its
+    ``cache`` phase timing. Outside of a request it behaves exactly like
+    ``DefaultClient``.
+
+    Raw redis clients obtained with ``get_client`` are not timed; the
+    throttles that use them are recorded in the ``throttle`` phase instead.
+    """
+
+    add = timed("cache")(DefaultClient.add)
+    get = timed("cache")(DefaultClient.get)
+    set = timed("cache")(DefaultClient.set)
+    touch = timed("cache")(DefaultClient.touch)
+    delete = timed("cache")(DefaultClient.delete)
+    get_many = timed("cache")(DefaultClient.get_many)
+    set_many = timed("cache")(DefaultClient.set_many)
+    delete_many = timed("cache")(DefaultClient.delete_many)
+    has_key = timed("cache")(DefaultClient.has_key)
+    incr = timed("cache")(DefaultClient.incr)
+    decr = timed("cache")(DefaultClient.decr)
+
+
+def get_async_redis_client(cache) -> "redis.asyncio.Redis | None":
+    """
+    Returns an asyncio client to the primary server of a django-redis cache,
+    shared by the current event loop, or ``None`` for any other cache
+    backend. It connects with the URL of the cache's ``LOCATION``;
+    ``CONNECTION_POOL_KWARGS`` are not applied.
+    """
+    client = getattr(cache, "client", None)
+    if not isinstance(client, DefaultClient):
+        return None
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    # django-redis keeps the configured server URLs, the first is the primary
+    location = client._server[0]
+    if location not in clients:
+        # Only ASGI servers need the asyncio client
+        import redis.asyncio
+
+        clients[location] = redis.asyncio.Redis.from_url(location)
+    return clients[location]
+
+
+async def aget(cache, key: str, default=None):
+    """
+    ``cache.aget`` that reads from Redis on the event loop. Django's default
+    ``aget`` runs the sync ``get`` in a thread, which other backends still
+    use. Recorded in the request's ``cache`` phase.
+    """
+    client = get_async_redis_client(cache)
+    if client is None:
+        return await cache.aget(key, default)
+    with record_timing("cache"):
+        value = await client.get(cache.client.make_key(key))
+    return default if value is None else cache.client.decode(value)
@@ -0,0 +1,264 @@
+"""
+Constant responses answered by ``conf/wsgi.py`` and ``conf/asgi.py`` before
+Django's handler runs.
+
+A GET of one of the ``FAST_PATHS`` skips the middleware, the URL resolver
+and DRF: the response is encoded once, with the security headers the
+middleware would add, and every client IP is limited by a sliding window
+kept in the process instead of in Redis. Requests the fast path cannot
+answer the way Django would, such as other methods, plain HTTP that
+``SECURE_SSL_REDIRECT`` redirects, hosts outside ``ALLOWED_HOSTS`` or
+cross-origin requests that need CORS headers, go to Django as before.
+"""
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+
+from django.conf import settings
+from django.http.request import split_domain_port, validate_host
+from rest_framework.exceptions import Throttled
+
+from .metrics import REQUEST_LATENCY, THROTTLE_REJECTIONS
+from .middleware import trusted_client_ip
+
+DURATIONS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Clients whose windows are kept per rate limiter, least recently seen
+# dropped first, so a flood of addresses cannot grow the process
+MAX_CLIENTS = 10000
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """``"10/minute"`` as 10 requests in 60 seconds, like DRF's throttles."""
+    num, period = rate.split("/")
+    return int(num), DURATIONS[period[0]]
+
+
+class RateLimiter:
+    """
+    The sliding window counter of ``RedisRateThrottle`` for the clients of
+    one process: the previous fixed window is weighted by how much of it
+    still overlaps the rolling window.
+    """
+
+    def __init__(self, rate: str, max_clients: int = MAX_CLIENTS):
+        self.num_requests, self.duration = parse_rate(rate)
+        self.max_clients = max_clients
+        self.lock = threading.Lock()
+        # ident -> [window, count in that window, count in the window before]
+        self.clients = OrderedDict()
+
+    def allow(self, ident: str, now: float | None = None) -> float | None:
+        """Counts a request, returning ``None`` or the seconds to wait if denied."""
+        if now is None:
+            now = time.monotonic()
+        window, offset = divmod(now, self.duration)
+        fraction = offset / self.duration
+        with self.lock:
+            state = self.clients.get(ident)
+            if state is None:
+                state = self.clients[ident] = [window, 0, 0]
+                if len(self.clients) > self.max_clients:
+                    self.clients.popitem(last=False)
+            else:
+                self.clients.move_to_end(ident)
+                if state[0] != window:
+                    previous = state[1] if state[0] == window - 1 else 0
+                    state[:] = [window, 0, previous]
+            current, previous = state[1], state[2]
+            if previous * (1 - fraction) + current < self.num_requests:
+                state[1] += 1
+                return None
+
+        if current >= self.num_requests:
+            # Wait for the next window, where this window becomes the previous one
+            next_fraction = 1 - self.num_requests / current
+            return self.duration * (1 - fraction + next_fraction)
+        target_fraction = 1 - (self.num_requests - current) / previous
+        return self.duration * max(target_fraction - fraction, 0)
+
+
+class FastPath:
+    """The encoded response of one path, and the limiter of its clients."""
+
+    def __init__(self, path: str, body, rate: str | None = None):
+        self.route = path.lstrip("/")
+        self.body = json.dumps(body).encode()
+        self.limiter = RateLimiter(rate) if rate else None
+
+
+class FastPaths:
+    """The ``FAST_PATHS`` and what deciding to answer them needs from settings."""
+
+    def __init__(self):
+        self.paths = {
+            path: FastPath(path, **options)
+            for path, options in getattr(settings, "FAST_PATHS", {}).items()
+        }
+        self.headers = [("Content-Type", "application/json")]
+        if settings.SECURE_CONTENT_TYPE_NOSNIFF:
+            self.headers.append(("X-Content-Type-Options", "nosniff"))
+        if settings.SECURE_REFERRER_POLICY:
+            self.headers.append(("Referrer-Policy", settings.SECURE_REFERRER_POLICY))
+        if settings.SECURE_CROSS_ORIGIN_OPENER_POLICY:
+            self.headers.append(
+                ("Cross-Origin-Opener-Policy", settings.SECURE_CROSS_ORIGIN_OPENER_POLICY)
+            )
+        self.headers.append(("X-Frame-Options", settings.X_FRAME_OPTIONS))
+
+        self.hsts = None
+        if settings.SECURE_HSTS_SECONDS:
+            self.hsts = f"max-age={settings.SECURE_HSTS_SECONDS}"
+            if settings.SECURE_HSTS_INCLUDE_SUBDOMAINS:
+                self.hsts += "; includeSubDomains"
+            if settings.SECURE_HSTS_PRELOAD:
+                self.hsts += "; preload"
+
+        self.ssl_redirect = settings.SECURE_SSL_REDIRECT
+        self.redirect_exempt = [re.compile(r) for r in settings.SECURE_REDIRECT_EXEMPT]
+        self.proxy_ssl_header = settings.SECURE_PROXY_SSL_HEADER
+
+        self.allowed_hosts = settings.ALLOWED_HOSTS
+        if settings.DEBUG and not self.allowed_hosts:
+            self.allowed_hosts = [".localhost", "127.0.0.1", "[::1]"]
+        self.use_x_forwarded_host = settings.USE_X_FORWARDED_HOST
+
+    def match(self, method: str, path: str, meta) -> FastPath | None:
+        """
+        The fast path of a request, or ``None`` when Django must answer it.
+        ``meta`` gets the request headers by their ``request.META`` names.
+        """
+        fast_path = self.paths.get(path)
+        if fast_path is None or method not in ("GET", "HEAD"):
+            return None
+        # CorsMiddleware decides which origins get CORS headers
+        if meta("HTTP_ORIGIN") is not None:
+            return None
+        if (
+            self.ssl_redirect
+            and not self.is_secure(meta)
+            and not any(r.search(path.lstrip("/")) for r in self.redirect_exempt)
+        ):
+            return None
+        if "*" not in self.allowed_hosts:
+            host = (self.use_x_forwarded_host and meta("HTTP_X_FORWARDED_HOST")) or meta(
+                "HTTP_HOST"
+            )
+            domain, _ = split_domain_port(host or "")
+            if not domain or not validate_host(domain, self.allowed_hosts):
+                return None
+        return fast_path
+
+    def is_secure(self, meta) -> bool:
+        if self.proxy_ssl_header is not None:
+            header, secure_value = self.proxy_ssl_header
+            value = meta(header)
+            if value is not None:
+                return value.split(",")[0].strip() == secure_value
+        return meta("wsgi.url_scheme") == "https"
+
+    def respond(self, fast_path: FastPath, method: str, meta, started_at: float):
+        """The status, headers and body of the response."""
+        status, body = 200, fast_path.body
+        headers = list(self.headers)
+        if fast_path.limiter is not None:
+            wait = fast_path.limiter.allow(get_trusted_client_ip(meta))
+            if wait is not None:
+                THROTTLE_REJECTIONS.labels("fast_path").inc()
+                status = Throttled.status_code
+                body = json.dumps({"detail": str(Throttled(wait).detail)}).encode()
+                headers.append(("Retry-After", "%d" % wait))
+        if self.hsts is not None and self.is_secure(meta):
+            headers.append(("Strict-Transport-Security", self.hsts))
+        headers.append(("Content-Length", str(len(body))))
+        REQUEST_LATENCY.labels(fast_path.route, method, status).observe(
+            time.perf_counter() - started_at
+        )
+        return status, headers, b"" if method == "HEAD" else body
+
+
+def get_trusted_client_ip(meta) -> str:
+    """``middleware.get_trusted_client_ip`` for the headers given by ``meta``."""
+    return trusted_client_ip(meta("HTTP_X_FORWARDED_FOR"), meta("REMOTE_ADDR"))
+
+
+class WSGIFastPaths:
+    """Answers the ``FAST_PATHS`` in front of a WSGI application."""
+
+    def __init__(self, application):
+        self.application = application
+        self.fast_paths = FastPaths()
+
+    def __call__(self, environ, start_response):
+        started_at = time.perf_counter()
+        method = environ["REQUEST_METHOD"]
+        meta = environ.get
+        fast_path = self.fast_paths.match(method, environ.get("PATH_INFO", ""), meta)
+        if fast_path is None:
+            return self.application(environ, start_response)
+
+        status, headers, body = self.fast_paths.respond(
+            fast_path, method, meta, started_at
+        )
+        start_response(f"{status} {HTTPStatus(status).phrase}", headers)
+        return [body]
+
+
+class ASGIFastPaths:
+    """Answers the ``FAST_PATHS`` in front of an ASGI application."""
+
+    def __init__(self, application):
+        self.application = application
+        self.fast_paths = FastPaths()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.application(scope, receive, send)
+
+        started_at = time.perf_counter()
+        method = scope["method"]
+        meta = ASGIMeta(scope).get
+        fast_path = self.fast_paths.match(method, scope["path"], meta)
+        if fast_path is None:
+            return await self.application(scope, receive, send)
+
+        status, headers, body = self.fast_paths.respond(
+            fast_path, method, meta, started_at
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (name.encode("latin-1"), value.encode("latin-1"))
+                    for name, value in headers
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+class ASGIMeta:
+    """The ``request.META`` names of an ASGI scope that the fast paths read."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.headers = None
+
+    def get(self, name: str):
+        if name == "REMOTE_ADDR":
+            client = self.scope.get("client")
+            return client[0] if client else None
+        if name == "wsgi.url_scheme":
+            return self.scope.get("scheme")
+        if self.headers is None:
+            self.headers = {
+                "HTTP_" + key.decode("latin-1").upper().replace("-", "_"): value
+                for key, value in self.scope["headers"]
+            }
+        value = self.headers.get(name)
+        return value.decode("latin-1") if value is not None else None
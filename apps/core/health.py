@@ -0,0 +1,150 @@
+"""
+Readiness of a server process for the load balancer. ``Readiness`` probes
+every database, every cache and the Celery broker concurrently, each
+within ``HEALTH_CHECK_TIMEOUT``, and the process reuses the result for
+``HEALTH_CHECK_CACHE_SECONDS``. However often it is asked, a process probes
+each dependency at most once per period, and never starts a probe while
+the previous one is still waiting for an answer.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+from conf.celery import app as celery_app
+
+from .throttles import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def probe_database(alias: str):
+    connection = connections[alias]
+    connection.close_if_unusable_or_obsolete()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    finally:
+        # No request ends in the probe threads to close it
+        connection.close_if_unusable_or_obsolete()
+
+
+def probe_cache(alias: str):
+    cache = caches[alias]
+    client = get_redis_client(cache)
+    if client is None:
+        cache.has_key("health")
+    else:
+        client.ping()
+
+
+def probe_broker():
+    with celery_app.connection_for_write(
+        connect_timeout=settings.HEALTH_CHECK_TIMEOUT
+    ) as connection:
+        connection.ensure_connection(max_retries=0)
+
+
+def get_probes() -> dict:
+    """The probe of every dependency, by the name it is reported with."""
+    probes = {f"database:{alias}": (probe_database, alias) for alias in connections}
+    probes.update({f"cache:{alias}": (probe_cache, alias) for alias in settings.CACHES})
+    probes["broker"] = (probe_broker,)
+    return probes
+
+
+def run_probe(probe, *args) -> tuple[float, Exception | None]:
+    """Runs a probe, returning the seconds it took and what it raised."""
+    started_at = time.perf_counter()
+    try:
+        probe(*args)
+    except Exception as e:
+        return time.perf_counter() - started_at, e
+    return time.perf_counter() - started_at, None
+
+
+class Readiness:
+    """
+    The latest readiness of this process. Requests that arrive while the
+    probes run wait for their result instead of starting their own.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.executor = None
+        # The future of every dependency's latest probe
+        self.probes = {}
+        self.result = None
+        self.checked_at = 0.0
+
+    def cached(self) -> dict | None:
+        """The latest result, while it is fresh."""
+        age = time.monotonic() - self.checked_at
+        if self.result is None or age >= settings.HEALTH_CHECK_CACHE_SECONDS:
+            return None
+        return {**self.result, "age": round(age, 3)}
+
+    def check(self) -> dict:
+        result = self.cached()
+        if result is not None:
+            return result
+        with self.lock:
+            result = self.cached()
+            if result is None:
+                self.result = self.run()
+                self.checked_at = time.monotonic()
+                result = {**self.result, "age": 0.0}
+        return result
+
+    def run(self) -> dict:
+        probes = get_probes()
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                len(probes), thread_name_prefix="readiness"
+            )
+        futures = {}
+        for name, (probe, *args) in probes.items():
+            future = self.probes.get(name)
+            # A probe that is still waiting is not started again, so a
+            # dependency that hangs holds one thread rather than one per check
+            if future is None or future.done():
+                future = self.executor.submit(run_probe, probe, *args)
+                self.probes[name] = future
+            futures[name] = future
+
+        timeout = settings.HEALTH_CHECK_TIMEOUT
+        wait(futures.values(), timeout)
+        checks = {}
+        for name, future in futures.items():
+            if not future.done():
+                logger.warning("Readiness probe %s timed out", name)
+                checks[name] = {
+                    "status": "timeout",
+                    "latency_ms": round(timeout * 1000, 3),
+                }
+                continue
+            seconds, error = future.result()
+            if error is not None:
+                logger.warning("Readiness probe %s failed: %r", name, error)
+            checks[name] = {
+                "status": "ok" if error is None else "error",
+                "latency_ms": round(seconds * 1000, 3),
+            }
+
+        ready = all(check["status"] == "ok" for check in checks.values())
+        return {"status": "ok" if ready else "unavailable", "checks": checks}
+
+
+readiness = Readiness()
+
+# The probe threads of the parent do not exist in a forked child
+os.register_at_fork(after_in_child=readiness.reset)
@@ -0,0 +1,444 @@
+"""
+Concurrent load generation, run by ``manage.py loadtest``.
+
+Every simulated client is an asyncio task with its own keep-alive
+connection, user, knox token and client IP. Requests go either to a running
+server over HTTP/1.1 or straight into the ASGI application of
+``conf/asgi.py``, so the middleware stack, throttling and the views are
+exercised without a server in between.
+"""
+
+import asyncio
+import json
+import random
+import ssl
+import statistics
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+from django.urls import reverse
+
+from apps.core.benchmarks import percentile
+
+DEFAULT_MIX = {"login": 1, "profile_get": 6, "profile_patch": 2, "ping": 1}
+
+STALE_CONNECTION_ERRORS = (ConnectionError, asyncio.IncompleteReadError)
+
+
+class LoadTestError(Exception):
+    """
+    Raised when the load test cannot start, e.g. when no client can log in.
+    """
+
+
+class HTTPTransport:
+    """
+    A minimal HTTP/1.1 client keeping one connection open per simulated
+    client, so connection setup is not part of the measured latency.
+    """
+
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise LoadTestError(f"Unsupported URL scheme: {parts.scheme!r}")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.prefix = parts.path.rstrip("/")
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port, ssl=self.ssl
+        )
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, headers: dict, body: bytes):
+        # A kept-alive connection may have been closed by the server meanwhile
+        for attempt in range(2):
+            reused = self.writer is not None
+            if not reused:
+                await self.connect()
+            try:
+                return await self.exchange(method, path, headers, body)
+            except STALE_CONNECTION_ERRORS:
+                await self.close()
+                if not reused or attempt:
+                    raise
+
+    async def exchange(self, method: str, path: str, headers: dict, body: bytes):
+        lines = [f"{method} {self.prefix}{path} HTTP/1.1", f"Host: {self.host}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        lines.append(f"Content-Length: {len(body)}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while (line := await self.reader.readuntil(b"\r\n")) != b"\r\n":
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while size := int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16):
+                chunks.append(await self.reader.readexactly(size + 2))
+            await self.reader.readuntil(b"\r\n")
+            content = b"".join(chunk[:-2] for chunk in chunks)
+        elif "content-length" in response_headers:
+            content = await self.reader.readexactly(
+                int(response_headers["content-length"])
+            )
+        else:
+            content = await self.reader.read()
+            response_headers["connection"] = "close"
+
+        if response_headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, content
+
+
+class ASGITransport:
+    """
+    Calls an ASGI application in-process, one HTTP scope per request.
+
+    Requests look like traffic forwarded by the TLS-terminating proxy, so
+    ``SECURE_SSL_REDIRECT`` does not answer them with redirects.
+    """
+
+    def __init__(self, app, host: str = "localhost"):
+        self.app = app
+        self.host = host
+
+    async def close(self):
+        pass
+
+    async def request(self, method: str, path: str, headers: dict, body: bytes):
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "https",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in {
+                    **headers,
+                    "Host": self.host,
+                    "Content-Length": str(len(body)),
+                }.items()
+            ],
+            "client": (headers.get("X-Forwarded-For", "127.0.0.1"), 0),
+            "server": (self.host, 443),
+        }
+        request_sent = False
+        response_done = asyncio.Event()
+        response = {"status": 500, "body": []}
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response_done.set()
+
+        await self.app(scope, receive, send)
+        return response["status"], b"".join(response["body"])
+
+
+class Stats:
+    """
+    Latencies and status codes per route, shared by all clients.
+    """
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.started_at = self.finished_at = time.perf_counter()
+
+    def record(self, route: str, status: int, elapsed: float):
+        self.timings[route].append(elapsed * 1000)
+        self.statuses[route][status] += 1
+
+    def summary(self) -> dict:
+        duration = max(self.finished_at - self.started_at, 1e-9)
+        results = {}
+        for route in sorted(self.timings):
+            timings = sorted(self.timings[route])
+            results[route] = {
+                "requests": len(timings),
+                "rps": round(len(timings) / duration, 1),
+                "p50_ms": round(percentile(timings, 0.50), 2),
+                "p95_ms": round(percentile(timings, 0.95), 2),
+                "p99_ms": round(percentile(timings, 0.99), 2),
+                "mean_ms": round(statistics.fmean(timings), 2),
+                "statuses": dict(sorted(self.statuses[route].items())),
+            }
+        return results
+
+
+class LoadClient:
+    """
+    One simulated user: a transport, credentials, a token and a client IP.
+    """
+
+    def __init__(self, transport, stats: Stats, email: str, password: str, ip: str):
+        self.transport = transport
+        self.stats = stats
+        self.email = email
+        self.password = password
+        self.ip = ip
+        self.token = None
+
+    async def request(
+        self, route: str, method: str, path: str, data=None, auth=True, raw=None
+    ):
+        headers = {"Accept": "application/json", "X-Forwarded-For": self.ip}
+        if auth and self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        body = raw if raw is not None else b""
+        if data is not None:
+            body = json.dumps(data).encode()
+        if body:
+            headers["Content-Type"] = "application/json"
+
+        started_at = time.perf_counter()
+        status, content = await self.transport.request(method, path, headers, body)
+        self.stats.record(route, status, time.perf_counter() - started_at)
+        return status, content
+
+    async def login(self, record=True) -> int:
+        credentials = {"email": self.email, "password": self.password}
+        path = reverse("v1:users:knox_login")
+        if record:
+            status, content = await self.request(
+                "login", "POST", path, credentials, False
+            )
+        else:
+            headers = {"Content-Type": "application/json", "X-Forwarded-For": self.ip}
+            body = json.dumps(credentials).encode()
+            status, content = await self.transport.request("POST", path, headers, body)
+        if status == 200:
+            self.token = json.loads(content)["token"]
+        return status
+
+
+async def scenario_login(client, rng, i):
+    await client.login()
+
+
+async def scenario_profile_get(client, rng, i):
+    await client.request("profile_get", "GET", reverse("v1:users:profile"))
+
+
+async def scenario_profile_patch(client, rng, i):
+    data = {"first_name": f"Load {rng.randrange(10_000)}"}
+    await client.request("profile_patch", "PATCH", reverse("v1:users:profile"), data)
+
+
+async def scenario_ping(client, rng, i):
+    await client.request("ping", "GET", reverse("v1:core:ping"), auth=False)
+
+
+SCENARIOS = {
+    "login": scenario_login,
+    "profile_get": scenario_profile_get,
+    "profile_patch": scenario_profile_patch,
+    "ping": scenario_ping,
+}
+
+
+def parse_mix(value: str) -> dict:
+    """Parses ``name=weight`` pairs, e.g. ``profile_get=6,ping=1``."""
+    mix = {}
+    for item in filter(None, value.split(",")):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}")
+        mix[name] = float(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f"Negative weight for {name!r}")
+    if not any(mix.values()):
+        raise ValueError("The scenario mix has no positive weight")
+    return mix
+
+
+def load_shapes(lines, sample: int | None = None, rng=None) -> list[dict]:
+    """
+    Extracts request shapes from JSON access log lines.
+
+    Lines that are not JSON or not written by the access logger are skipped.
+    With ``sample`` a uniform random sample of that many shapes is kept. The
+    ``sample_weight`` of sampled access logs is kept as the shape's weight.
+    """
+    shapes = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(record, dict) or not {"method", "path"} <= record.keys():
+            continue
+        shapes.append(
+            {
+                "method": record["method"],
+                "path": record["path"],
+                "request_size": int(record.get("request_size") or 0),
+                "auth": bool(record.get("auth")),
+                "weight": float(record.get("sample_weight") or 1),
+            }
+        )
+    if sample is not None and sample < len(shapes):
+        shapes = (rng or random).sample(shapes, sample)
+    return shapes
+
+
+def synthetic_body(size: int) -> bytes:
+    """A JSON object of exactly ``size`` bytes, or as close as allowed."""
+    if size <= 0:
+        return b""
+    return json.dumps({"_": "x" * max(size - 9, 0)}).encode()
+
+
+def replay_scenario(shapes: list[dict]):
+    weights = [shape.get("weight", 1) for shape in shapes]
+
+    async def scenario_replay(client, rng, i):
+        shape = rng.choices(shapes, weights)[0]
+        await client.request(
+            f"{shape['method']} {shape['path']}",
+            shape["method"],
+            shape["path"],
+            auth=shape["auth"],
+            raw=synthetic_body(shape["request_size"]),
+        )
+
+    return scenario_replay
+
+
+class LoadTest:
+    """
+    Runs ``clients`` concurrent clients until ``duration`` seconds pass or
+    ``requests`` requests were sent, whichever comes first.
+
+    Without replay shapes every iteration picks a scenario from ``mix`` by
+    weight; with them, every iteration replays a shape chosen by weight.
+    """
+
+    def __init__(
+        self,
+        make_transport,
+        users: list[str],
+        password: str,
+        clients: int = 10,
+        duration: float | None = 30,
+        requests: int | None = None,
+        mix: dict | None = None,
+        shapes: list[dict] | None = None,
+        seed: int | None = None,
+    ):
+        if not users:
+            raise LoadTestError("No users to log in with; run `manage.py seed` first.")
+        self.make_transport = make_transport
+        self.users = users
+        self.password = password
+        self.clients = clients
+        self.duration = duration
+        self.requests = requests
+        self.mix = mix or DEFAULT_MIX
+        self.shapes = shapes
+        self.seed = seed
+        self.stats = Stats()
+        self.sent = 0
+
+    def next_request(self, deadline: float | None) -> bool:
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+        if self.requests is not None and self.sent >= self.requests:
+            return False
+        self.sent += 1
+        return True
+
+    async def run_client(self, client, rng, deadline):
+        if self.shapes is not None:
+            scenarios, weights = [replay_scenario(self.shapes)], [1]
+        else:
+            scenarios = [SCENARIOS[name] for name in self.mix]
+            weights = list(self.mix.values())
+        i = 0
+        try:
+            while self.next_request(deadline):
+                scenario = rng.choices(scenarios, weights)[0]
+                await scenario(client, rng, i)
+                i += 1
+        finally:
+            await client.transport.close()
+
+    async def run(self) -> dict:
+        clients = []
+        for i in range(self.clients):
+            email = self.users[i % len(self.users)]
+            ip = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+            client = LoadClient(
+                self.make_transport(), self.stats, email, self.password, ip
+            )
+            clients.append(client)
+
+        # Tokens are obtained up front so the first requests are authenticated
+        statuses = await asyncio.gather(*(c.login(record=False) for c in clients))
+        logged_in = statuses.count(200)
+        if not logged_in:
+            for client in clients:
+                await client.transport.close()
+            raise LoadTestError(
+                "No client could log in (statuses: "
+                f"{', '.join(map(str, sorted(set(statuses))))}); "
+                "check the users, password and login throttle."
+            )
+
+        self.stats = Stats()
+        for client in clients:
+            client.stats = self.stats
+        deadline = None
+        if self.duration is not None:
+            deadline = time.perf_counter() + self.duration
+        seeds = [
+            None if self.seed is None else f"{self.seed}-{i}" for i in range(self.clients)
+        ]
+        await asyncio.gather(
+            *(
+                self.run_client(client, random.Random(seed), deadline)
+                for client, seed in zip(clients, seeds, strict=True)
+            )
+        )
+        self.stats.finished_at = time.perf_counter()
+        duration = self.stats.finished_at - self.stats.started_at
+        return {
+            "clients": self.clients,
+            "logged_in": logged_in,
+            "duration_s": round(duration, 3),
+            "requests": self.sent,
+            "rps": round(self.sent / max(duration, 1e-9), 1),
+            "routes": self.stats.summary(),
+        }
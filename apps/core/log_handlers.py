@@ -0,0 +1,167 @@
+"""
+Queued logging: request threads only put records on a bounded queue, and a
+background thread formats and writes them in batches, so a slow log
+consumer cannot block requests.
+"""
+
+import logging
+import os
+import queue
+import weakref
+from logging.handlers import QueueHandler, QueueListener
+
+from .metrics import LOG_RECORDS_DROPPED
+
+QUEUE_POLICIES = ("drop", "block")
+
+_queue_handlers = weakref.WeakSet()
+
+
+class BufferedQueueHandler(QueueHandler):
+    """
+    Puts records on a bounded queue for a ``BatchQueueListener``.
+
+    Configured through ``dictConfig`` with ``handlers`` and ``listener``
+    keys, the listener is started as soon as it is attached and stopped
+    (after writing every queued record) when the handler is closed at
+    shutdown.
+
+    When the queue is full, the ``drop`` policy discards the record, and
+    the ``block`` policy waits up to ``block_timeout`` seconds for room
+    before discarding it. The timeout is required, so a stalled listener can
+    never hang the request threads. Discarded records are counted in the
+    ``log_records_dropped_total`` metric.
+
+    Filters attached to this handler run on the calling thread, so they can
+    read request context variables.
+    """
+
+    def __init__(self, queue, policy: str = "drop", block_timeout: float | None = 1.0):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown logging queue policy {policy!r}")
+        if policy == "block" and (block_timeout is None or block_timeout <= 0):
+            raise ValueError("The block logging queue policy needs a positive timeout")
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._listener = None
+        super().__init__(queue)
+        _queue_handlers.add(self)
+
+    @property
+    def listener(self):
+        return self._listener
+
+    @listener.setter
+    def listener(self, listener):
+        self._listener = listener
+        if listener is not None:
+            listener.start()
+
+    def prepare(self, record):
+        # Only the message is rendered here. The JSON formatting and any
+        # traceback are left to the listener thread.
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self.policy == "block":
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+        super().close()
+
+
+class BatchQueueListener(QueueListener):
+    """
+    A QueueListener that takes every record already waiting on the queue, up
+    to ``batch_size``, and hands them to its handlers in one go. Handlers
+    with a ``handle_batch`` method write the whole batch at once.
+    """
+
+    batch_size = 512
+
+    def _monitor(self):
+        q = self.queue
+        while True:
+            batch = [q.get()]
+            while len(batch) < self.batch_size and batch[-1] is not self._sentinel:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = batch[-1] is self._sentinel
+            records = batch[:-1] if stop else batch
+            if records:
+                self.handle_batch(records)
+            for _ in batch:
+                q.task_done()
+            if stop:
+                break
+
+    def handle_batch(self, records):
+        records = [self.prepare(record) for record in records]
+        for handler in self.handlers:
+            if self.respect_handler_level:
+                selected = [r for r in records if r.levelno >= handler.level]
+            else:
+                selected = records
+            if hasattr(handler, "handle_batch"):
+                handler.handle_batch(selected)
+            else:
+                for record in selected:
+                    handler.handle(record)
+
+    def enqueue_sentinel(self):
+        # Waits for room, so the records queued before shutdown are written
+        self.queue.put(self._sentinel)
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """
+    StreamHandler that writes a batch of records with a single write and
+    flush.
+    """
+
+    def handle_batch(self, records):
+        lines = []
+        for record in records:
+            if not self.filter(record):
+                continue
+            try:
+                lines.append(self.format(record) + self.terminator)
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+
+        with self.lock:
+            try:
+                self.stream.write("".join(lines))
+                self.flush()
+            except Exception:
+                self.handleError(records[-1])
+
+
+def _restart_listeners_after_fork():
+    # Forked children have no listener thread, and the queue may have been
+    # locked by another thread of the parent at the time of the fork
+    for handler in list(_queue_handlers):
+        listener = handler.listener
+        if listener is None:
+            continue
+        handler.queue = listener.queue = queue.Queue(handler.queue.maxsize)
+        listener._thread = None
+        listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_listeners_after_fork)
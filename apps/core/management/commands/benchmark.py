@@ -0,0 +1,109 @@
+import json
+import platform
+from datetime import UTC, datetime
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from apps.core.benchmarks import SCENARIOS, compare_results, run_benchmarks
+
+COLUMNS = (
+    ("p50_ms", "p50 ms"),
+    ("p95_ms", "p95 ms"),
+    ("p99_ms", "p99 ms"),
+    ("queries", "queries"),
+    ("cache_calls", "cache"),
+    ("alloc_peak_kib", "alloc KiB"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API endpoints in-process against a temporary test database, "
+        "optionally saving or comparing against a JSON baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenarios",
+            nargs="*",
+            choices=[[], *SCENARIOS],
+            help="Scenarios to run (default: all)",
+        )
+        parser.add_argument("--iterations", type=int, help="Timed requests per scenario")
+        parser.add_argument("--save", help="Write the results to this JSON baseline")
+        parser.add_argument(
+            "--compare", help="Fail if the results regress from this JSON baseline"
+        )
+        parser.add_argument(
+            "--threshold",
+            default=0.25,
+            type=float,
+            help="Allowed relative growth of timings and allocations (default 0.25)",
+        )
+        parser.add_argument(
+            "--keepdb", action="store_true", help="Reuse the test database if it exists"
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)["results"]
+
+        if settings.DEBUG:
+            self.stdout.write(
+                self.style.WARNING("DEBUG is on; query logging will distort timings")
+            )
+
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options["keepdb"], serialize=False
+        )
+        try:
+            results = run_benchmarks(options["scenarios"], options["iterations"])
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"]
+            )
+            teardown_test_environment()
+
+        self.report(results)
+
+        if options["save"]:
+            with open(options["save"], "w") as f:
+                json.dump(self.baseline(results), f, indent=2)
+            self.stdout.write(
+                self.style.SUCCESS(f"Baseline written to {options['save']}")
+            )
+
+        if baseline is not None:
+            regressions = compare_results(baseline, results, options["threshold"])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(f"  {regression}"))
+                raise CommandError(f"{len(regressions)} metrics regressed.")
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def report(self, results):
+        header = f"{'scenario':<15}" + "".join(f"{label:>11}" for _, label in COLUMNS)
+        self.stdout.write(self.style.MIGRATE_HEADING(header))
+        for name, metrics in results.items():
+            self.stdout.write(
+                f"{name:<15}" + "".join(f"{metrics[key]:>11}" for key, _ in COLUMNS)
+            )
+
+    def baseline(self, results) -> dict:
+        return {
+            "meta": {
+                "created": datetime.now(UTC).isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+            },
+            "results": results,
+        }
@@ -0,0 +1,72 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.password_validation import (
+    get_password_validators,
+    validate_password,
+)
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+
+# Django's stock configuration, which AUTH_PASSWORD_VALIDATORS replaces
+STOCK_VALIDATORS = [
+    {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+        "OPTIONS": {"min_length": settings.MIN_PASSWORD_LENGTH},
+    },
+    {"NAME": "django.contrib.auth.password_validation.CommonPasswordValidator"},
+    {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
+]
+
+SAMPLE_PASSWORDS = [
+    "short",
+    "12345678901",
+    "password",
+    "jane.doe2024",
+    "correct-horse-battery-staple",
+    "Xk2!vR9#qLm7@wPz",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-call latency of the configured password validators "
+        "against Django's stock validators"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rounds", default=2000, type=int, help="Validation calls per password"
+        )
+
+    def handle(self, *args, **options):
+        user = get_user_model()(
+            email="jane.doe@example.com", first_name="Jane", last_name="Doe"
+        )
+        for label, config in (
+            ("stock", STOCK_VALIDATORS),
+            ("configured", settings.AUTH_PASSWORD_VALIDATORS),
+        ):
+            # The configured list was already loaded when the app registry was ready
+            started = time.perf_counter()
+            validators = get_password_validators(config)
+            build_time = time.perf_counter() - started
+
+            timings = []
+            for password in SAMPLE_PASSWORDS:
+                for _ in range(options["rounds"]):
+                    started = time.perf_counter()
+                    try:
+                        validate_password(password, user, validators)
+                    except ValidationError:
+                        pass
+                    timings.append(time.perf_counter() - started)
+
+            self.stdout.write(
+                f"{label:>10}: build {build_time * 1000:.1f} ms, "
+                f"median {statistics.median(timings) * 1e6:.1f} us/call, "
+                f"p99 {statistics.quantiles(timings, n=100)[-1] * 1e6:.1f} us/call"
+            )
@@ -0,0 +1,186 @@
+import resource
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+# Work factor attribute of each hasher and whether it is a log2 exponent
+COST_ATTRIBUTES = {
+    "scrypt": ("work_factor", False),
+    "pbkdf2_sha256": ("iterations", False),
+    "pbkdf2_sha1": ("iterations", False),
+    "argon2": ("time_cost", False),
+    "bcrypt_sha256": ("rounds", True),
+    "bcrypt": ("rounds", True),
+}
+
+BENCHMARK_PASSWORD = "calibration-password-123"
+
+
+def scale_cost(base: int, step: int, log_scale: bool) -> int:
+    if log_scale:
+        return max(base + step, 4)
+    return max(int(base * 2**step), 1)
+
+
+def benchmark_hasher(hasher_path: str, attribute: str, cost: int, rounds: int) -> dict:
+    """
+    Hashes a password ``rounds`` times with the given work factor.
+
+    Runs in a fresh child process so the peak RSS growth can be attributed to
+    this setting alone.
+    """
+    hasher_class = import_string(hasher_path)
+    hasher = type(hasher_class.__name__, (hasher_class,), {attribute: cost})()
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    wall_times, cpu_times = [], []
+    for _ in range(rounds):
+        salt = hasher.salt()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        hasher.encode(BENCHMARK_PASSWORD, salt)
+        wall_times.append(time.perf_counter() - wall_start)
+        cpu_times.append(time.process_time() - cpu_start)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        "wall": statistics.median(wall_times),
+        "cpu": statistics.median(cpu_times),
+        # ru_maxrss is reported in KiB on Linux
+        "peak_memory": max(peak_rss - baseline_rss, 0) * 1024,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the configured password hashers at several work factors and "
+        "optionally emit a hasher tuned to a latency budget"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hasher",
+            action="append",
+            dest="algorithms",
+            help="Only benchmark this algorithm (e.g. scrypt). Can be repeated",
+        )
+        parser.add_argument(
+            "--steps",
+            nargs="+",
+            type=int,
+            default=[-1, 0, 1, 2],
+            help="Work factor steps around the default, as powers of two",
+        )
+        parser.add_argument(
+            "--rounds", default=5, type=int, help="Hashes per work factor setting"
+        )
+        parser.add_argument(
+            "--target-ms",
+            type=float,
+            help="Emit a hasher subclass with the highest cost under this latency",
+        )
+        parser.add_argument("--output", help="Write the tuned hasher module to this file")
+
+    def handle(self, *args, **options):
+        hashers = [
+            hasher
+            for hasher in get_hashers()
+            if hasher.algorithm in COST_ATTRIBUTES
+            and (not options["algorithms"] or hasher.algorithm in options["algorithms"])
+        ]
+        if not hashers:
+            raise CommandError("No configured password hasher matches the selection.")
+
+        tuned = []
+        for hasher in hashers:
+            results = self.benchmark(hasher, sorted(set(options["steps"])), options)
+            if results and options["target_ms"] is not None:
+                choice = self.choose(hasher, results, options["target_ms"])
+                if choice:
+                    tuned.append(choice)
+
+        if options["target_ms"] is not None:
+            self.emit(tuned, options)
+
+    def benchmark(self, hasher, steps, options) -> list:
+        attribute, log_scale = COST_ATTRIBUTES[hasher.algorithm]
+        hasher_class = type(hasher)
+        hasher_path = f"{hasher_class.__module__}.{hasher_class.__qualname__}"
+        base = getattr(hasher, attribute)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{hasher.algorithm}"))
+        results = []
+        for step in steps:
+            cost = scale_cost(base, step, log_scale)
+            try:
+                with ProcessPoolExecutor(1, mp_context=get_context("fork")) as pool:
+                    result = pool.submit(
+                        benchmark_hasher, hasher_path, attribute, cost, options["rounds"]
+                    ).result()
+            except ValueError as e:
+                self.stdout.write(self.style.WARNING(f"  Skipped - {e}"))
+                return []
+
+            result["cost"] = cost
+            results.append(result)
+            default = " (default)" if cost == base else ""
+            self.stdout.write(
+                f"  {attribute}={cost}{default}: "
+                f"wall {result['wall'] * 1000:.1f} ms, "
+                f"cpu {result['cpu'] * 1000:.1f} ms, "
+                f"peak memory {result['peak_memory'] / 2**20:.1f} MiB, "
+                f"{1 / max(result['cpu'], 1e-9):.1f} logins/s/core"
+            )
+        return results
+
+    def choose(self, hasher, results, target_ms):
+        attribute, _ = COST_ATTRIBUTES[hasher.algorithm]
+        within_budget = [r for r in results if r["wall"] * 1000 <= target_ms]
+        if not within_budget:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"  No {attribute} setting fits {target_ms:.0f} ms for "
+                    f"{hasher.algorithm}"
+                )
+            )
+            return None
+        best = max(within_budget, key=lambda r: r["cost"])
+        return type(hasher), attribute, best
+
+    def emit(self, tuned, options):
+        if not tuned:
+            return
+
+        lines = [
+            '"""',
+            f"Password hashers tuned to {options['target_ms']:.0f} ms per hash by",
+            "`manage.py calibrate_hashers`. Add them at the top of PASSWORD_HASHERS;",
+            "existing hashes are upgraded on the next successful login.",
+            '"""',
+            "",
+        ]
+        for hasher_class, _, _ in tuned:
+            lines.append(f"from {hasher_class.__module__} import {hasher_class.__name__}")
+        for hasher_class, attribute, result in tuned:
+            lines += [
+                "",
+                "",
+                f"class Tuned{hasher_class.__name__}({hasher_class.__name__}):",
+                f"    # {result['wall'] * 1000:.1f} ms wall, "
+                f"{1 / max(result['cpu'], 1e-9):.1f} logins/s/core",
+                f"    {attribute} = {result['cost']}",
+            ]
+        module = "\n".join(lines) + "\n"
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(module)
+            self.stdout.write(
+                self.style.SUCCESS(f"Tuned hashers written to {options['output']}")
+            )
+        else:
+            self.stdout.write(module)
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.loadtest import (
+    DEFAULT_MIX,
+    ASGITransport,
+    HTTPTransport,
+    LoadTest,
+    LoadTestError,
+    load_shapes,
+    parse_mix,
+)
+from apps.users.models import CustomUser
+
+from .seed import SEED_PASSWORD
+
+COLUMNS = (
+    ("requests", "requests"),
+    ("rps", "req/s"),
+    ("p50_ms", "p50 ms"),
+    ("p95_ms", "p95 ms"),
+    ("p99_ms", "p99 ms"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate concurrent load with seeded users against a server or the "
+        "in-process ASGI application, or replay request shapes from the access log"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server (default: the in-process ASGI app)",
+        )
+        parser.add_argument(
+            "--clients", type=int, default=10, help="Concurrent clients (default 10)"
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=30,
+            help="Seconds to run for (default 30)",
+        )
+        parser.add_argument(
+            "--requests", type=int, help="Stop after this many requests instead"
+        )
+        parser.add_argument(
+            "--mix",
+            default=",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()),
+            help="Scenario weights (default %(default)s)",
+        )
+        parser.add_argument(
+            "--password",
+            default=SEED_PASSWORD,
+            help="Password of the users (default: the seed command's password)",
+        )
+        parser.add_argument(
+            "--replay", help="Replay request shapes from this JSON access log"
+        )
+        parser.add_argument(
+            "--sample", type=int, help="Replay a random sample of this many shapes"
+        )
+        parser.add_argument("--seed", type=int, help="Seed for repeatable runs")
+        parser.add_argument("--json", help="Also write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options["mix"])
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        shapes = None
+        if options["replay"]:
+            with open(options["replay"]) as f:
+                shapes = load_shapes(f, options["sample"], random.Random(options["seed"]))
+            if not shapes:
+                raise CommandError(f"No access log records in {options['replay']}")
+
+        if options["url"]:
+            url = options["url"]
+            HTTPTransport(url)  # Validate the URL before starting
+
+            def make_transport():
+                return HTTPTransport(url)
+        else:
+            from conf.asgi import application
+
+            host = next(
+                (host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"),
+                "localhost",
+            )
+
+            def make_transport():
+                return ASGITransport(application, host)
+
+        # Users are loaded up front; the event loop must not touch the ORM
+        users = list(
+            CustomUser.objects.filter(is_active=True, is_superuser=False)
+            .order_by("pk")
+            .values_list("email", flat=True)[: options["clients"]]
+        )
+        try:
+            loadtest = LoadTest(
+                make_transport,
+                users,
+                options["password"],
+                clients=options["clients"],
+                duration=None if options["requests"] else options["duration"],
+                requests=options["requests"],
+                mix=mix,
+                shapes=shapes,
+                seed=options["seed"],
+            )
+            results = asyncio.run(loadtest.run())
+        except (LoadTestError, OSError) as e:
+            raise CommandError(str(e)) from e
+
+        self.report(results)
+        if options["json"]:
+            with open(options["json"], "w") as f:
+                json.dump(results, f, indent=2)
+
+    def report(self, results):
+        self.stdout.write(
+            f"{results['requests']} requests from {results['clients']} clients "
+            f"({results['logged_in']} logged in) in {results['duration_s']}s, "
+            f"{results['rps']} req/s"
+        )
+        width = max([len("route"), *map(len, results["routes"])]) + 2
+        header = f"{'route':<{width}}" + "".join(f"{label:>10}" for _, label in COLUMNS)
+        self.stdout.write(self.style.MIGRATE_HEADING(header + "  statuses"))
+        for route, metrics in results["routes"].items():
+            statuses = " ".join(f"{k}:{v}" for k, v in metrics["statuses"].items())
+            self.stdout.write(
+                f"{route:<{width}}"
+                + "".join(f"{metrics[key]:>10}" for key, _ in COLUMNS)
+                + f"  {statuses}"
+            )
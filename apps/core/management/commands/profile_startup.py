@@ -0,0 +1,102 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.startup import (
+    ENTRYPOINT_PHASES,
+    StartupProfileError,
+    package_times,
+    profile_startup,
+    prune_tree,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the startup of an entry point in fresh processes: the phases of "
+        "django.setup() and the modules imported, as an -X importtime tree"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "entrypoint",
+            nargs="?",
+            default="web",
+            choices=ENTRYPOINT_PHASES,
+            help="The process to measure (default: web)",
+        )
+        parser.add_argument(
+            "--runs", default=5, type=int, help="Processes to take the median of"
+        )
+        parser.add_argument(
+            "--min-ms",
+            default=5.0,
+            type=float,
+            help="Hide imports faster than this, cumulative (default 5)",
+        )
+        parser.add_argument(
+            "--depth", default=4, type=int, help="Levels of the import tree to show"
+        )
+        parser.add_argument(
+            "--packages", default=15, type=int, help="Slowest packages to list"
+        )
+        parser.add_argument("--json", action="store_true", help="Print JSON instead")
+
+    def handle(self, *args, **options):
+        if options["runs"] < 1:
+            raise CommandError("--runs must be at least 1.")
+        try:
+            profile = profile_startup(options["entrypoint"], options["runs"])
+        except StartupProfileError as e:
+            raise CommandError(str(e)) from e
+
+        tree = prune_tree(
+            profile["imports"], int(options["min_ms"] * 1000), options["depth"]
+        )
+        packages = dict(
+            list(package_times(profile["imports"]).items())[: options["packages"]]
+        )
+
+        if options["json"]:
+            self.stdout.write(
+                json.dumps(
+                    {
+                        **profile,
+                        "imports": tree,
+                        "packages": {name: us / 1000 for name, us in packages.items()},
+                    },
+                    indent=2,
+                )
+            )
+            return
+
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f"Startup of {profile['entrypoint']}, median of {profile['runs']} runs"
+            )
+        )
+        for name, seconds in profile["phases"].items():
+            self.stdout.write(f"  {name:<24}{seconds * 1000:9.1f} ms")
+            if name == "ready":
+                for app, app_seconds in profile["ready"].items():
+                    self.stdout.write(f"    {app:<22}{app_seconds * 1000:9.1f} ms")
+        self.stdout.write(f"  {'total':<24}{profile['wall'] * 1000:9.1f} ms")
+
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f"Imports of at least {options['min_ms']:g} ms (cumulative, self)"
+            )
+        )
+        self.write_tree(tree)
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Slowest packages (self)"))
+        for name, us in packages.items():
+            self.stdout.write(f"  {name:<24}{us / 1000:9.1f} ms")
+
+    def write_tree(self, nodes, depth=0):
+        for node in nodes:
+            self.stdout.write(
+                f"  {node['cumulative_ms']:8.1f} {node['self_ms']:8.1f}  "
+                f"{'  ' * depth}{node['name']}"
+            )
+            self.write_tree(node["children"], depth + 1)
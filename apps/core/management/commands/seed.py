@@ -1,7 +1,75 @@
-from django.core.management.base import BaseCommand
-from django.db import IntegrityError, transaction
+import os
+import random
+import string
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, timedelta
+from importlib import import_module
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, models, transaction
+from django.utils import timezone
+from django_celery_beat.models import IntervalSchedule, PeriodicTask, PeriodicTasks
+from knox.crypto import hash_token
+from knox.models import AuthToken
+from knox.settings import CONSTANTS, knox_settings
 
 from apps.users.models import CustomUser
+from apps.users.tasks import DB_SESSION_ENGINES
+
+SEED_PASSWORD = "testpass123"
+
+# Seeded sessions and periodic tasks are recognisable so --clean can find them
+SEED_SESSION_PREFIX = "seed"
+SEED_TASK_PREFIX = "seed-"
+SEED_TASK = "apps.core.tasks.test_task"
+SEED_TASK_INTERVALS = (1, 5, 15, 60)
+
+# Expired rows are spread over the last 30 days, like an hourly purge backlog
+EXPIRED_WINDOW = timedelta(days=30)
+
+# Columns written by --fast, in the order produced by build_user_row()
+FAST_USER_COLUMNS = (
+    "email",
+    "password",
+    "first_name",
+    "last_name",
+    "date_joined",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+)
+
+
+def generate_users(start: int, count: int, seed: int) -> list[tuple]:
+    """
+    Generates ``count`` fake users. Runs in a worker process, so it only
+    returns plain tuples. The row number is part of the email so rows from
+    different workers can never collide.
+    """
+    from faker import Faker
+
+    fake = Faker()
+    fake.seed_instance(seed)
+    return [
+        (
+            f"{fake.user_name()}.{number}@{fake.free_email_domain()}",
+            fake.first_name(),
+            fake.last_name(),
+            fake.date_time_between("-2y", "now", tzinfo=UTC),
+        )
+        for number in range(start, start + count)
+    ]
+
+
+def build_user_row(user: tuple, password: str) -> tuple:
+    email, first_name, last_name, date_joined = user
+    return (email, password, first_name, last_name, date_joined, True, False, False)
 
 
 class Command(BaseCommand):
@@ -19,19 +87,119 @@ class Command(BaseCommand):
         parser.add_argument(
             "--clean", action="store_true", help="Delete all data before seeding"
         )
+        parser.add_argument(
+            "--fast",
+            action="store_true",
+            help="Hash the password once and insert users in batches (for load tests)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            default=5000,
+            type=int,
+            help="Users generated and inserted together in --fast mode",
+        )
+        parser.add_argument(
+            "--workers",
+            default=os.cpu_count() or 1,
+            type=int,
+            help="Processes generating fake data in --fast mode",
+        )
+        parser.add_argument(
+            "--seed", type=int, help="Seed the generated data to make runs repeatable"
+        )
+        parser.add_argument(
+            "--tokens-per-user",
+            default=0,
+            type=float,
+            help="Average number of knox tokens per user (e.g. 2.5)",
+        )
+        parser.add_argument(
+            "--sessions",
+            default=0,
+            type=float,
+            help="Average number of database sessions per user (e.g. 0.3)",
+        )
+        parser.add_argument(
+            "--periodic-tasks",
+            default=0,
+            type=int,
+            help="The number of Celery beat periodic tasks to create",
+        )
+        parser.add_argument(
+            "--expired-ratio",
+            default=0.2,
+            type=float,
+            help="Fraction of tokens, sessions and periodic tasks that are expired",
+        )
 
     def handle(self, *args, **options):
+        if not 0 <= options["expired_ratio"] <= 1:
+            raise CommandError("--expired-ratio must be between 0 and 1.")
+        rng = random.Random(options["seed"])
+
         if options["clean"]:
             self.stdout.write("Deleting old data...")
-            CustomUser.objects.filter(is_superuser=False).delete()
+            self.clean()
 
         if options["superuser"]:
             self.create_superuser()
 
-        self.create_users(options["users"])
+        batch_size = max(options["batch_size"], 1)
+        if options["fast"]:
+            self.fast_create_users(
+                options["users"], batch_size, options["workers"], options["seed"]
+            )
+        else:
+            self.create_users(options["users"], options["seed"])
+
+        if options["tokens_per_user"] or options["sessions"]:
+            self.create_tokens_and_sessions(
+                options["tokens_per_user"],
+                options["sessions"],
+                options["expired_ratio"],
+                batch_size,
+                rng,
+            )
+        if options["periodic_tasks"]:
+            self.create_periodic_tasks(
+                options["periodic_tasks"], options["expired_ratio"], batch_size, rng
+            )
 
         self.stdout.write(self.style.SUCCESS("Successfully seeded database"))
 
+    @transaction.atomic
+    def clean(self):
+        """
+        Deletes every non-superuser with one statement per table, instead of
+        loading the users and their related rows into Python.
+        """
+        users = CustomUser.objects.filter(is_superuser=False)
+        for field in CustomUser._meta.many_to_many:
+            through = field.remote_field.through
+            through._base_manager.filter(
+                **{f"{field.m2m_field_name()}__in": users}
+            ).delete()
+        for relation in CustomUser._meta.related_objects:
+            related = relation.related_model._base_manager.filter(
+                **{f"{relation.field.name}__in": users}
+            )
+            if relation.on_delete is models.CASCADE:
+                related.delete()
+            elif relation.on_delete is models.SET_NULL:
+                related.update(**{relation.field.name: None})
+
+        table = connection.ops.quote_name(CustomUser._meta.db_table)
+        column = connection.ops.quote_name("is_superuser")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE {column} = %s", [False])
+            self.stdout.write(f"Deleted {cursor.rowcount} users")
+
+        if settings.SESSION_ENGINE in DB_SESSION_ENGINES:
+            self.get_session_store().model.objects.filter(
+                session_key__startswith=SEED_SESSION_PREFIX
+            ).delete()
+        PeriodicTask.objects.filter(name__startswith=SEED_TASK_PREFIX).delete()
+
     def create_superuser(self):
         try:
             superuser = CustomUser.objects.create_superuser("admin@admin.com", "admin")
@@ -42,7 +210,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING(f"Superuser already exists - {e}"))
 
     @transaction.atomic
-    def create_users(self, count):
+    def create_users(self, count, seed=None):
         try:
             from faker import Faker
         except ImportError:
@@ -54,6 +222,8 @@ class Command(BaseCommand):
             return
 
         fake = Faker()
+        if seed is not None:
+            fake.seed_instance(seed)
         self.stdout.write(f"Creating {count} users...")
 
         for _ in range(count):
@@ -61,7 +231,7 @@ class Command(BaseCommand):
             try:
                 user = CustomUser.objects.create_user(
                     email=fake.email(),
-                    password="testpass123",
+                    password=SEED_PASSWORD,
                     first_name=fake.first_name(),
                     last_name=fake.last_name(),
                 )
@@ -70,3 +240,256 @@ class Command(BaseCommand):
             except IntegrityError as e:
                 transaction.savepoint_rollback(sid)
                 self.stdout.write(self.style.WARNING(f"Error creating user - {e}"))
+
+    def fast_create_users(self, count, batch_size, workers, seed=None):
+        try:
+            import faker  # noqa: F401
+        except ImportError:
+            self.stdout.write(
+                self.style.ERROR(
+                    "Faker is not installed. Please install it to seed users."
+                )
+            )
+            return
+
+        password = make_password(SEED_PASSWORD)
+        start = (CustomUser.objects.aggregate(models.Max("pk"))["pk__max"] or 0) + 1
+        use_copy = self.copy_supported()
+        self.stdout.write(
+            f"Creating {count} users in batches of {batch_size} "
+            f"with {'COPY' if use_copy else 'bulk_create'}..."
+        )
+
+        # bulk_create skips conflicting rows without saying how many
+        existing = CustomUser.objects.count()
+        started_at = time.perf_counter()
+        done = 0
+        for users in self.generate_batches(count, batch_size, workers, start, seed):
+            rows = [build_user_row(user, password) for user in users]
+            with transaction.atomic():
+                if use_copy:
+                    self.copy_users(rows)
+                else:
+                    CustomUser.objects.bulk_create(
+                        [
+                            CustomUser(**dict(zip(FAST_USER_COLUMNS, row, strict=True)))
+                            for row in rows
+                        ],
+                        ignore_conflicts=True,
+                    )
+            done += len(rows)
+            self.progress(done, count, time.perf_counter() - started_at)
+        if count:
+            self.stdout.write("")
+        created = CustomUser.objects.count() - existing
+        message = f"Created {created} users"
+        if created < count:
+            message += f", skipped {count - created} that already existed"
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def generate_batches(self, count, batch_size, workers, start, seed=None):
+        """
+        Yields lists of generated users in order. At most two batches per
+        worker are in flight, so memory stays flat however many users are
+        requested.
+        """
+        base_seed = random.randrange(2**32) if seed is None else seed
+        chunks = [
+            (start + offset, min(batch_size, count - offset), base_seed + offset)
+            for offset in range(0, count, batch_size)
+        ]
+        if workers <= 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                yield generate_users(*chunk)
+            return
+
+        with ProcessPoolExecutor(workers, mp_context=get_context("fork")) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(generate_users, *chunk))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def copy_supported(self) -> bool:
+        # COPY needs PostgreSQL through psycopg 3, whose cursors expose copy()
+        if connection.vendor != "postgresql":
+            return False
+        with connection.cursor() as cursor:
+            return hasattr(cursor.cursor, "copy")
+
+    def copy_users(self, rows):
+        table = connection.ops.quote_name(CustomUser._meta.db_table)
+        columns = ", ".join(connection.ops.quote_name(c) for c in FAST_USER_COLUMNS)
+        try:
+            with connection.cursor() as cursor:
+                with cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row(row)
+        except IntegrityError as e:
+            raise CommandError(
+                f"Generated users clash with existing rows, try --clean - {e}"
+            ) from e
+
+    def create_tokens_and_sessions(
+        self, tokens_per_user, sessions_per_user, expired_ratio, batch_size, rng
+    ):
+        """
+        Gives every non-superuser a random number of knox tokens and database
+        sessions around the requested averages, walking the users in primary
+        key batches.
+
+        Tokens carry real digests of generated token strings and sessions
+        decode to a logged in user, so lookups and purges behave as in
+        production. Active rows expire uniformly over their lifetime and
+        expired rows over the last ``EXPIRED_WINDOW``.
+        """
+        store = None
+        if sessions_per_user:
+            if settings.SESSION_ENGINE in DB_SESSION_ENGINES:
+                store = self.get_session_store()
+            else:
+                self.stdout.write(
+                    self.style.WARNING("Sessions are not stored in the database")
+                )
+
+        users = CustomUser.objects.filter(is_superuser=False).order_by("pk")
+        total = users.count()
+        now = timezone.now()
+        started_at = time.perf_counter()
+        counts = {"tokens": 0, "expired tokens": 0, "sessions": 0}
+        done, last_pk = 0, 0
+        while batch := list(
+            users.filter(pk__gt=last_pk).values_list("pk", "password")[:batch_size]
+        ):
+            last_pk = batch[-1][0]
+            tokens, sessions = [], []
+            for pk, password in batch:
+                for _ in range(self.pick_count(rng, tokens_per_user)):
+                    tokens.append(self.build_token(pk, now, rng, expired_ratio))
+                if store is not None:
+                    for _ in range(self.pick_count(rng, sessions_per_user)):
+                        sessions.append(
+                            self.build_session(
+                                store, pk, password, now, rng, expired_ratio
+                            )
+                        )
+
+            with transaction.atomic():
+                self.insert_tokens(tokens)
+                if store is not None:
+                    store.model.objects.bulk_create(sessions)
+
+            counts["tokens"] += len(tokens)
+            counts["expired tokens"] += sum(
+                1 for t in tokens if t.expiry and t.expiry < now
+            )
+            counts["sessions"] += len(sessions)
+            done += len(batch)
+            self.progress(done, total, time.perf_counter() - started_at)
+        if total:
+            self.stdout.write("")
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Created "
+                + ", ".join(f"{count} {name}" for name, count in counts.items())
+            )
+        )
+
+    def pick_count(self, rng, average) -> int:
+        # 2.5 gives every user 2 rows and half of them a third one
+        whole = int(average)
+        return whole + (rng.random() < average - whole)
+
+    def pick_expiry(self, now, lifetime, rng, expired_ratio):
+        if rng.random() < expired_ratio:
+            return now - EXPIRED_WINDOW * rng.random()
+        if lifetime is None:
+            return None
+        return now + lifetime * rng.random()
+
+    def build_token(self, user_pk, now, rng, expired_ratio) -> AuthToken:
+        length = knox_settings.AUTH_TOKEN_CHARACTER_LENGTH // 2
+        token = knox_settings.TOKEN_PREFIX + rng.randbytes(length).hex()
+        return AuthToken(
+            digest=hash_token(token),
+            token_key=token[: CONSTANTS.TOKEN_KEY_LENGTH],
+            user_id=user_pk,
+            expiry=self.pick_expiry(now, knox_settings.TOKEN_TTL, rng, expired_ratio),
+        )
+
+    def insert_tokens(self, tokens):
+        AuthToken.objects.bulk_create(tokens)
+        ttl = knox_settings.TOKEN_TTL
+        if ttl is None:
+            return
+        # created is auto_now_add, so derive it from the expiry afterwards
+        digests = [token.digest for token in tokens if token.expiry is not None]
+        for offset in range(0, len(digests), 1000):
+            AuthToken.objects.filter(digest__in=digests[offset : offset + 1000]).update(
+                created=models.F("expiry") - ttl
+            )
+
+    def get_session_store(self):
+        return import_module(settings.SESSION_ENGINE).SessionStore()
+
+    def build_session(self, store, user_pk, password, now, rng, expired_ratio):
+        user = CustomUser(pk=user_pk, password=password)
+        alphabet = string.ascii_lowercase + string.digits
+        key_length = 32 - len(SEED_SESSION_PREFIX)
+        data = {
+            SESSION_KEY: str(user_pk),
+            BACKEND_SESSION_KEY: settings.AUTHENTICATION_BACKENDS[0],
+            HASH_SESSION_KEY: user.get_session_auth_hash(),
+        }
+        lifetime = timedelta(seconds=settings.SESSION_COOKIE_AGE)
+        return store.model(
+            session_key=SEED_SESSION_PREFIX
+            + "".join(rng.choices(alphabet, k=key_length)),
+            session_data=store.encode(data),
+            expire_date=self.pick_expiry(now, lifetime, rng, expired_ratio),
+        )
+
+    def create_periodic_tasks(self, count, expired_ratio, batch_size, rng):
+        """
+        Creates enabled beat entries running ``SEED_TASK`` on a mix of
+        intervals. Expired entries have ``expires`` in the past, so the
+        scheduler loads them but no longer sends them.
+        """
+        intervals = [
+            IntervalSchedule.objects.get_or_create(
+                every=every, period=IntervalSchedule.MINUTES
+            )[0]
+            for every in SEED_TASK_INTERVALS
+        ]
+        now = timezone.now()
+        tasks = [
+            PeriodicTask(
+                name=f"{SEED_TASK_PREFIX}{rng.getrandbits(64):016x}",
+                task=SEED_TASK,
+                interval=rng.choice(intervals),
+                expires=self.pick_expiry(now, None, rng, expired_ratio),
+            )
+            for _ in range(count)
+        ]
+        seeded = PeriodicTask.objects.filter(name__startswith=SEED_TASK_PREFIX)
+        existing = seeded.count()
+        PeriodicTask.objects.bulk_create(
+            tasks, batch_size=batch_size, ignore_conflicts=True
+        )
+        # bulk_create skips the signal that tells beat to reload its schedule
+        PeriodicTasks.update_changed()
+        created = seeded.count() - existing
+        self.stdout.write(self.style.SUCCESS(f"Created {created} periodic tasks"))
+
+    def progress(self, done, total, elapsed):
+        width = 30
+        filled = width * done // max(total, 1)
+        rate = done / max(elapsed, 1e-9)
+        self.stdout.write(
+            f"\r[{'#' * filled}{'.' * (width - filled)}] {done}/{total} users "
+            f"({rate:.0f}/s)",
+            ending="",
+        )
+        self.stdout.flush()
@@ -0,0 +1,386 @@
+"""
+Counters and histograms shared by every server and Celery worker process,
+exposed in the Prometheus text format by the ``/metrics`` view.
+
+Every thread of every process writes its samples to its own memory-mapped
+file in ``METRICS_DIR``, so recording a sample takes no lock: it is a dict
+lookup and an 8-byte write into memory. ``/metrics`` sums the files of all
+processes, including those of workers that have exited, so counters never
+go backwards when a worker is recycled. Without ``METRICS_DIR`` the files
+are anonymous memory and only the current process is reported.
+"""
+
+import bisect
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+
+INITIAL_FILE_SIZE = 64 * 1024
+
+# File layout: the number of used bytes, then entries of a key length, the
+# key padded to 8 bytes and the value as a double
+HEADER = struct.Struct("<Q")
+KEY_LENGTH = struct.Struct("<I")
+VALUE = struct.Struct("<d")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REGISTRY = {}
+
+
+class ValuesFile:
+    """
+    An append-only map of sample keys to values backed by ``mmap``.
+
+    A file is only ever written by the thread that owns it. New entries are
+    written completely before the used size in the header is updated, so
+    readers in other processes never see a partial entry.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.fd = None
+        self.positions = {}
+        if path is not None:
+            self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            self.size = max(os.fstat(self.fd).st_size, INITIAL_FILE_SIZE)
+            os.ftruncate(self.fd, self.size)
+            self.map = mmap.mmap(self.fd, self.size)
+        else:
+            self.size = INITIAL_FILE_SIZE
+            self.map = mmap.mmap(-1, self.size)
+
+        # A file left by an exited thread with the same id is continued
+        (self.used,) = HEADER.unpack_from(self.map, 0)
+        if self.used == 0:
+            self.used = HEADER.size
+            HEADER.pack_into(self.map, 0, self.used)
+        for key, position in iter_entries(self.map, self.used):
+            self.positions[key] = position
+
+    def add(self, key: bytes, amount: float):
+        position = self.positions.get(key)
+        if position is None:
+            position = self.insert(key)
+        (value,) = VALUE.unpack_from(self.map, position)
+        VALUE.pack_into(self.map, position, value + amount)
+
+    def insert(self, key: bytes) -> int:
+        padded = (KEY_LENGTH.size + len(key) + 7) // 8 * 8
+        while self.used + padded + VALUE.size > self.size:
+            self.grow()
+        KEY_LENGTH.pack_into(self.map, self.used, len(key))
+        start = self.used + KEY_LENGTH.size
+        self.map[start : start + len(key)] = key
+        position = self.used + padded
+        VALUE.pack_into(self.map, position, 0.0)
+        self.used = position + VALUE.size
+        HEADER.pack_into(self.map, 0, self.used)
+        self.positions[key] = position
+        return position
+
+    def grow(self):
+        old = self.map
+        self.size *= 2
+        if self.fd is not None:
+            os.ftruncate(self.fd, self.size)
+            self.map = mmap.mmap(self.fd, self.size)
+        else:
+            self.map = mmap.mmap(-1, self.size)
+            self.map[: self.used] = old[: self.used]
+        old.close()
+
+    def read(self) -> bytes:
+        try:
+            return self.map[: self.used]
+        except ValueError:
+            # The owning thread replaced the map while growing it
+            return self.map[: self.used]
+
+
+def iter_entries(data, used: int | None = None):
+    """Yields ``(key, value position)`` for every entry of a values file."""
+    if used is None:
+        (used,) = HEADER.unpack_from(data, 0)
+    offset = HEADER.size
+    while offset < used:
+        (length,) = KEY_LENGTH.unpack_from(data, offset)
+        start = offset + KEY_LENGTH.size
+        key = bytes(data[start : start + length])
+        position = offset + (KEY_LENGTH.size + length + 7) // 8 * 8
+        yield key, position
+        offset = position + VALUE.size
+
+
+class ProcessFiles(threading.local):
+    """The values file of the current thread, created on first use."""
+
+    files = []
+    lock = threading.Lock()
+
+    def get(self) -> ValuesFile:
+        try:
+            return self.file
+        except AttributeError:
+            pass
+        directory = getattr(settings, "METRICS_DIR", None)
+        path = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(
+                directory, f"{os.getpid()}-{threading.get_native_id()}.db"
+            )
+        self.file = ValuesFile(path)
+        with self.lock:
+            self.files.append(self.file)
+        return self.file
+
+
+_process_files = ProcessFiles()
+
+
+def reset_values_files():
+    """
+    Forgets the values files of this process. Runs in forked children, which
+    must not write to the files of their parent.
+    """
+    global _process_files
+    ProcessFiles.files = []
+    ProcessFiles.lock = threading.Lock()
+    _process_files = ProcessFiles()
+
+
+os.register_at_fork(after_in_child=reset_values_files)
+
+
+def encode_key(name: str, kind: str, labels: tuple) -> bytes:
+    return json.dumps([name, kind, labels]).encode()
+
+
+class Metric:
+    """
+    Base class of the metric types. Metrics are registered by name when they
+    are created, and ``labels`` returns the child that records the samples
+    of one combination of label values.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        REGISTRY[name] = self
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            label_values = tuple(str(value) for value in values)
+            child = self.children.setdefault(values, self.make_child(label_values))
+        return child
+
+
+class CounterChild:
+    def __init__(self, metric, values: tuple):
+        self.key = encode_key(metric.name, "", values)
+
+    def inc(self, amount: float = 1):
+        _process_files.get().add(self.key, amount)
+
+
+class Counter(Metric):
+    """A value that only goes up, like a number of requests."""
+
+    type = "counter"
+
+    def make_child(self, values):
+        return CounterChild(self, values)
+
+    def inc(self, amount: float = 1):
+        """Increments a counter without labels."""
+        self.labels().inc(amount)
+
+
+class HistogramChild:
+    def __init__(self, metric, values: tuple):
+        self.bounds = metric.buckets
+        self.bucket_keys = [
+            encode_key(metric.name, format_bound(bound), values) for bound in self.bounds
+        ]
+        self.sum_key = encode_key(metric.name, "sum", values)
+
+    def observe(self, value: float):
+        values_file = _process_files.get()
+        values_file.add(self.bucket_keys[bisect.bisect_left(self.bounds, value)], 1)
+        values_file.add(self.sum_key, value)
+
+
+class Histogram(Metric):
+    """
+    Observations counted in buckets, like request latencies. Buckets are
+    stored individually and made cumulative when exposed.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets)) + (math.inf,)
+
+    def make_child(self, values):
+        return HistogramChild(self, values)
+
+    def observe(self, value: float):
+        """Observes a value of a histogram without labels."""
+        self.labels().observe(value)
+
+
+def format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else repr(bound)
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = (
+        '{}="{}"'.format(
+            name, value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+        )
+        for name, value in zip(names, values, strict=True)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def collect() -> dict:
+    """
+    Sums the samples of every values file, keyed by ``(name, kind, labels)``.
+    """
+    directory = getattr(settings, "METRICS_DIR", None)
+    if directory:
+        contents = []
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            with open(path, "rb") as f:
+                contents.append(f.read())
+    else:
+        with ProcessFiles.lock:
+            contents = [values_file.read() for values_file in ProcessFiles.files]
+
+    totals = {}
+    for data in contents:
+        if len(data) < HEADER.size:
+            continue
+        for key, position in iter_entries(data):
+            if position + VALUE.size > len(data):
+                break
+            name, kind, labels = json.loads(key)
+            sample = (name, kind, tuple(labels))
+            totals[sample] = (
+                totals.get(sample, 0.0) + VALUE.unpack_from(data, position)[0]
+            )
+    return totals
+
+
+def generate_latest() -> str:
+    """Renders every registered metric in the Prometheus text format."""
+    samples = {}
+    for (name, kind, labels), value in collect().items():
+        samples.setdefault(name, {}).setdefault(labels, {})[kind] = value
+
+    lines = []
+    for name, metric in sorted(REGISTRY.items()):
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.type}")
+        for labels, values in sorted(samples.get(name, {}).items()):
+            if metric.type == "counter":
+                lines.append(
+                    f"{name}{format_labels(metric.labelnames, labels)} "
+                    f"{format_value(values[''])}"
+                )
+                continue
+
+            count = 0.0
+            for bound in metric.buckets:
+                count += values.get(format_bound(bound), 0.0)
+                bucket_labels = format_labels(
+                    (*metric.labelnames, "le"), (*labels, format_bound(bound))
+                )
+                lines.append(f"{name}_bucket{bucket_labels} {format_value(count)}")
+            label_text = format_labels(metric.labelnames, labels)
+            lines.append(f"{name}_sum{label_text} {format_value(values.get('sum', 0.0))}")
+            lines.append(f"{name}_count{label_text} {format_value(count)}")
+    return "\n".join(lines) + "\n"
+
+
+def clear_metrics_dir():
+    """
+    Removes the values files of earlier runs. Call it once when the server
+    starts, before any worker records a sample.
+    """
+    directory = getattr(settings, "METRICS_DIR", None)
+    if directory:
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            os.remove(path)
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by resolved route, method and status code.",
+    ("route", "method", "status"),
+)
+THROTTLE_REJECTIONS = Counter(
+    "throttle_rejections_total",
+    "Requests rejected by a throttle, by throttle scope.",
+    ("scope",),
+)
+LOGIN_ATTEMPTS = Counter(
+    "login_attempts_total",
+    "Login attempts by outcome: success, failure, locked or unavailable.",
+    ("outcome",),
+)
+LOGIN_POOL_QUEUE_TIME = Histogram(
+    "login_pool_queue_seconds",
+    "Seconds a password check waited for a free login hashing thread.",
+)
+LOGIN_POOL_HASH_TIME = Histogram(
+    "login_pool_hash_seconds",
+    "Seconds spent hashing a password on the login hashing pool.",
+)
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task runtime by task name and final state.",
+    ("task", "state"),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the logging queue was full.",
+)
+BATCH_SIZE = Histogram(
+    "celery_batch_size",
+    "Items processed per batch by batching tasks, by task name.",
+    ("task",),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+BATCH_FLUSH_LATENCY = Histogram(
+    "celery_batch_flush_latency_seconds",
+    "Seconds the oldest item of a batch waited in the buffer, by task name.",
+    ("task",),
+)
+BATCH_ITEMS_DROPPED = Counter(
+    "celery_batch_items_dropped_total",
+    "Items dropped because the buffer of a batching task was full.",
+    ("task",),
+)
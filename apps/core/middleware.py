@@ -1,8 +1,25 @@
+import functools
+import ipaddress
 import logging
+import random
+import socket
 import time
 import uuid
 from contextvars import ContextVar
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.functional import LazyObject, empty
+from rest_framework.settings import api_settings
+
+from .metrics import REQUEST_LATENCY
+from .queries import QueryStats, explain, query_stats_var
+from .timing import RequestTimings, timings_var
+from .tracing import slow_routes
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("apps.access")
+
 # ContextVars to replace threading.local for async safety
 request_id_var = ContextVar("request_id", default="none")
 client_ip_var = ContextVar("client_ip", default="")
@@ -22,11 +39,141 @@ def get_client_ip(request):
     return ip
 
 
+def get_resolved_user(request):
+    """
+    The user of a request if authentication already looked it up, else
+    ``None``. ``request.user`` is lazy: reading it here would query the
+    session, which is not allowed on the event loop under ASGI.
+    """
+    user = getattr(request, "user", None)
+    if isinstance(user, LazyObject) and user._wrapped is empty:
+        return getattr(request, "_cached_user", None) or getattr(
+            request, "_acached_user", None
+        )
+    return user
+
+
+def get_trusted_client_ip(request) -> str:
+    """
+    The client address for decisions a client must not be able to spoof,
+    such as lockouts. It reads ``REMOTE_ADDR``, or behind ``NUM_PROXIES``
+    trusted proxies the ``X-Forwarded-For`` entry the outermost one added,
+    like DRF's throttles. A client can only prepend entries to the header.
+    """
+    return trusted_client_ip(
+        request.META.get("HTTP_X_FORWARDED_FOR"), request.META.get("REMOTE_ADDR")
+    )
+
+
+def trusted_client_ip(x_forwarded_for: str | None, remote_addr: str | None) -> str:
+    num_proxies = api_settings.NUM_PROXIES
+    if not num_proxies or not x_forwarded_for:
+        return remote_addr or ""
+    addrs = x_forwarded_for.split(",")
+    return addrs[-min(num_proxies, len(addrs))].strip()
+
+
+# Any other method is recorded as "other" to bound the metric's label values
+METRIC_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE")
+)
+
+
+def get_route(request) -> str:
+    """The URL pattern that handled the request, e.g. ``api/v1/auth/profile/``."""
+    match = getattr(request, "resolver_match", None)
+    return match.route if match is not None else "<unmatched>"
+
+
+def observe_request(request, status_code: int, response_time: float):
+    method = request.method if request.method in METRIC_METHODS else "other"
+    REQUEST_LATENCY.labels(get_route(request), method, status_code).observe(response_time)
+
+
+def is_internal_ip(ip: str, networks) -> bool:
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+@functools.cache
+def docker_gateway_ips() -> frozenset[str]:
+    """
+    The gateways of this host's networks, through which Docker forwards the
+    requests of the machine it runs on.
+    """
+    try:
+        ips = socket.gethostbyname_ex(socket.gethostname())[2]
+    except OSError:
+        return frozenset()
+    return frozenset(ip.rsplit(".", 1)[0] + ".1" for ip in ips)
+
+
+def show_debug_toolbar(request) -> bool:
+    """
+    ``SHOW_TOOLBAR_CALLBACK`` of the debug toolbar: shown to ``INTERNAL_IPS``
+    and to the Docker host, whose address is looked up on the first request
+    instead of when the settings are loaded.
+    """
+    if not settings.DEBUG:
+        return False
+    client = request.META.get("REMOTE_ADDR")
+    return client in settings.INTERNAL_IPS or client in docker_gateway_ips()
+
+
 class RequestIDMiddleware:
+    """
+    Tags every request with an ID, measures it, and writes its access log
+    line. Works in sync and async mode, so it never makes ASGI requests
+    switch to a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.internal_networks = [
+            ipaddress.ip_network(network, strict=False)
+            for network in getattr(settings, "SERVER_TIMING_INTERNAL_IPS", [])
+        ]
+        self.slow_threshold = getattr(settings, "SENTRY_TRACES_SLOW_THRESHOLD", 1.0)
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        timings = self.start(request)
+        timings_token = timings_var.set(timings)
+        start_time = time.time()
+        try:
+            response = self.get_response(request)
+            return self.finish(request, response, timings, start_time)
+        except Exception:
+            self.fail(request, start_time)
+            raise
+        finally:
+            timings_var.reset(timings_token)
+
+    async def __acall__(self, request):
+        timings = self.start(request)
+        timings_token = timings_var.set(timings)
+        start_time = time.time()
+        try:
+            response = await self.get_response(request)
+            return self.finish(request, response, timings, start_time)
+        except Exception:
+            self.fail(request, start_time)
+            raise
+        finally:
+            timings_var.reset(timings_token)
+
+    def start(self, request) -> RequestTimings:
         request_id = str(uuid.uuid4())
         request.id = request_id
 
@@ -38,26 +185,146 @@ class RequestIDMiddleware:
             user_id_var.set(str(getattr(request.user, "pk", "anonymous")))
         else:
             user_id_var.set("anonymous")
+        return RequestTimings()
 
-        start_time = time.time()
+    def finish(self, request, response, timings: RequestTimings, start_time: float):
+        response_time = time.time() - start_time
+        response_time_var.set(response_time)
+        status_code_var.set(response.status_code)
+        observe_request(request, response.status_code, response_time)
+        self.flag_slow(request, response_time)
+
+        response["X-Request-ID"] = request.id
+        response["X-Response-Time"] = f"{response_time:.3f}s"
+        if self.show_server_timing(request):
+            response["Server-Timing"] = timings.header(response_time)
+
+        # The request shape recorded here can be replayed by `loadtest --replay`
+        access_logger.info(
+            "%s %s %s",
+            request.method,
+            request.path,
+            response.status_code,
+            extra={
+                "route": get_route(request),
+                "method": request.method,
+                "request_size": int(request.META.get("CONTENT_LENGTH") or 0),
+                "auth": "HTTP_AUTHORIZATION" in request.META,
+                **timings.fields(),
+            },
+        )
+        return response
+
+    def fail(self, request, start_time: float):
+        response_time = time.time() - start_time
+        response_time_var.set(response_time)
+        status_code_var.set(500)
+        observe_request(request, 500, response_time)
+        self.flag_slow(request, response_time)
+
+    def flag_slow(self, request, response_time: float):
+        """Slow routes have more of their next requests traced by Sentry."""
+        if response_time >= self.slow_threshold:
+            slow_routes.flag(get_route(request))
+
+    def show_server_timing(self, request) -> bool:
+        """
+        The timings reveal how a request was handled, so they are only sent
+        to staff users and clients from ``SERVER_TIMING_INTERNAL_IPS``, by
+        an address the client cannot spoof.
+        """
+        user = get_resolved_user(request)
+        if user is not None and user.is_staff:
+            return True
+        return is_internal_ip(get_trusted_client_ip(request), self.internal_networks)
+
+
+class QueryInspectorMiddleware:
+    """
+    Watches the database queries of a sample of requests and logs a warning
+    when a request goes over one of the query budgets: too many queries, too
+    much database time, the same SQL shape repeated (an N+1 pattern), or a
+    single slow query. The warning is tagged with the request ID, so it must
+    come after ``RequestIDMiddleware``. Works in sync and async mode.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.sample_rate = getattr(settings, "QUERY_INSPECTOR_SAMPLE_RATE", 0.0)
+        self.budgets = {
+            "max_queries": getattr(settings, "QUERY_BUDGET_COUNT", 30),
+            "max_db_time": getattr(settings, "QUERY_BUDGET_DB_TIME", 0.5),
+            "max_duplicates": getattr(settings, "QUERY_BUDGET_DUPLICATES", 5),
+            "slow_query": getattr(settings, "QUERY_BUDGET_SLOW_QUERY", 0.1),
+        }
+        self.explain = getattr(settings, "QUERY_EXPLAIN", False)
 
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        stats = QueryStats()
+        token = query_stats_var.set(stats)
         try:
             response = self.get_response(request)
+        finally:
+            query_stats_var.reset(token)
+        self.check(request, stats)
+        return response
 
-            response_time = time.time() - start_time
-            response_time_var.set(response_time)
-            status_code_var.set(response.status_code)
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
 
-            response["X-Request-ID"] = request_id
-            response["X-Response-Time"] = f"{response_time:.3f}s"
+        stats = QueryStats()
+        token = query_stats_var.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            query_stats_var.reset(token)
+        if self.explain:
+            # Explaining runs a query, which must not block the event loop
+            await sync_to_async(self.check)(request, stats)
+        else:
+            self.check(request, stats)
+        return response
 
-            return response
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
 
-        except Exception:
-            response_time = time.time() - start_time
-            response_time_var.set(response_time)
-            status_code_var.set(500)
-            raise
+    def check(self, request, stats: QueryStats):
+        exceeded = stats.exceeded(**self.budgets)
+        if exceeded:
+            self.report(request, stats, exceeded)
+
+    def report(self, request, stats: QueryStats, exceeded: list[str]):
+        slowest = stats.slowest
+        route = get_route(request)
+        logger.warning(
+            "Query budget exceeded on %s %s: %s",
+            request.method,
+            route,
+            ", ".join(exceeded),
+            extra={
+                "route": route,
+                "budgets_exceeded": exceeded,
+                "query_count": stats.count,
+                "db_ms": round(stats.seconds * 1000, 3),
+                "duplicate_queries": stats.duplicates(),
+                # Only the SQL: the parameters may hold personal data
+                "slowest_query": slowest.sql,
+                "slowest_query_ms": round(slowest.seconds * 1000, 3),
+                "explain": explain(slowest) if self.explain else None,
+            },
+        )
 
 
 class TimeLogFilter(logging.Filter):
@@ -70,6 +337,79 @@ class TimeLogFilter(logging.Filter):
         return response_time_var.get() != 0.0
 
 
+class AccessLogSamplingFilter(logging.Filter):
+    """
+    Samples the access log before records are queued or formatted.
+
+    Server errors and requests slower than ``slow_threshold`` seconds are
+    always kept. Otherwise, the fraction kept is looked up in ``rates`` by
+    route and status class (``rates[route]["2xx"]``, then
+    ``rates["*"]["2xx"]``), falling back to ``default_rate`` for
+    informational, successful and redirect responses and to 1 for client
+    errors.
+
+    The first ``burst`` records of each route and status class in every
+    second are kept regardless, so quiet routes are logged in full and only
+    busy ones are sampled. Kept records get a ``sample_weight``: the number
+    of requests each one stands for, so counts can be estimated by summing
+    the weights.
+    """
+
+    def __init__(
+        self,
+        rates: dict | None = None,
+        default_rate: float = 1.0,
+        slow_threshold: float | None = None,
+        burst: int = 0,
+    ):
+        super().__init__()
+        self.rates = rates or {}
+        self.default_rate = default_rate
+        self.slow_threshold = slow_threshold
+        self.burst = burst
+        self.windows = {}
+
+    def filter(self, record):
+        status_code = status_code_var.get()
+        if status_code >= 500 or (
+            self.slow_threshold is not None
+            and response_time_var.get() >= self.slow_threshold
+        ):
+            record.sample_weight = 1
+            return True
+
+        route = getattr(record, "route", "<unmatched>")
+        status_class = f"{status_code // 100}xx"
+        rate = self.get_rate(route, status_class)
+        if rate >= 1 or self.within_burst(route, status_class):
+            record.sample_weight = 1
+            return True
+        if rate <= 0 or random.random() >= rate:
+            return False
+        record.sample_weight = 1 / rate
+        return True
+
+    def get_rate(self, route: str, status_class: str) -> float:
+        for key in (route, "*"):
+            rate = self.rates.get(key, {}).get(status_class)
+            if rate is not None:
+                return rate
+        return 1.0 if status_class == "4xx" else self.default_rate
+
+    def within_burst(self, route: str, status_class: str) -> bool:
+        if self.burst <= 0:
+            return False
+        # Racing threads may keep a few more records than the burst, which
+        # only makes the weights of that second slightly too high
+        second = int(time.monotonic())
+        window = self.windows.get((route, status_class))
+        if window is None or window[0] != second:
+            self.windows[(route, status_class)] = [second, 1]
+            return True
+        window[1] += 1
+        return window[1] <= self.burst
+
+
 class RequestIDFilter(logging.Filter):
     """
     Injects context variables into the log record.
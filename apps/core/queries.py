@@ -0,0 +1,120 @@
+"""
+Per-request query inspection for ``QueryInspectorMiddleware``: counts the
+queries of a request, groups them by SQL shape to spot N+1 patterns, and
+keeps the slowest statement so it can be explained.
+"""
+
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.db import DatabaseError, connections
+
+# "IN (%s, %s, %s)" and "VALUES (%s, %s), (%s, %s)" have the same shape for
+# any number of values
+PLACEHOLDER_LIST = re.compile(r"%s(?:, %s)+")
+REPEATED_ROWS = re.compile(r"(\([^()]*\))(?:, \1)+")
+
+
+def sql_shape(sql: str) -> str:
+    """The SQL of a query with its lists of placeholders collapsed."""
+    return REPEATED_ROWS.sub(r"\1, ...", PLACEHOLDER_LIST.sub("%s, ...", sql))
+
+
+@dataclass
+class SlowQuery:
+    seconds: float
+    alias: str
+    sql: str
+    params: object
+    many: bool
+
+
+class QueryStats:
+    """
+    A ``connection.execute_wrapper`` counting the queries of one request,
+    their total time and how many times each SQL shape was executed.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = {}
+        self.slowest = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = time.perf_counter() - started_at
+            self.count += 1
+            self.seconds += seconds
+            shape = sql_shape(sql)
+            self.shapes[shape] = self.shapes.get(shape, 0) + 1
+            if self.slowest is None or seconds > self.slowest.seconds:
+                self.slowest = SlowQuery(
+                    seconds, context["connection"].alias, sql, params, many
+                )
+
+    def duplicates(self, limit: int = 5) -> list[dict]:
+        """The shapes executed more than once, most repeated first."""
+        repeated = sorted(
+            ((count, shape) for shape, count in self.shapes.items() if count > 1),
+            reverse=True,
+        )
+        return [{"sql": shape, "count": count} for count, shape in repeated[:limit]]
+
+    def exceeded(
+        self,
+        max_queries: int,
+        max_db_time: float,
+        max_duplicates: int,
+        slow_query: float,
+    ) -> list[str]:
+        """The names of the budgets this request went over."""
+        exceeded = []
+        if self.count > max_queries:
+            exceeded.append("query_count")
+        if self.seconds > max_db_time:
+            exceeded.append("db_time")
+        if self.shapes and max(self.shapes.values()) > max_duplicates:
+            exceeded.append("duplicate_queries")
+        if self.slowest is not None and self.slowest.seconds > slow_query:
+            exceeded.append("slow_query")
+        return exceeded
+
+
+query_stats_var: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def inspect_query(execute, sql, params, many, context):
+    """
+    A ``connection.execute_wrapper`` recording queries in the ``QueryStats``
+    of the current request, if it is inspected.
+    """
+    stats = query_stats_var.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def explain(query: SlowQuery) -> str | None:
+    """
+    The query plan of a ``SELECT``, or ``None`` for other statements and
+    when the database cannot explain it. Only the plan is asked for: the
+    statement is not run again.
+    """
+    if query.many or not query.sql.lstrip().upper().startswith("SELECT"):
+        return None
+    connection = connections[query.alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"{connection.ops.explain_query_prefix()} {query.sql}", query.params
+            )
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    return "\n".join(" ".join(str(column) for column in row) for row in rows)
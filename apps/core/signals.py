@@ -0,0 +1,19 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .queries import inspect_query
+from .timing import time_query
+
+
+@receiver(connection_created)
+def install_query_wrappers(sender, connection, **kwargs):
+    """
+    Installs the query timing and inspection wrappers on every connection.
+    They find the request they record for in context variables, which also
+    reach the threads running the sync code of an async request, where
+    wrappers installed by the middleware would not (connections belong to
+    a thread).
+    """
+    for wrapper in (time_query, inspect_query):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
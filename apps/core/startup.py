@@ -0,0 +1,267 @@
+"""
+Startup profiling, run by ``manage.py profile_startup``.
+
+A process that has already called ``django.setup()`` cannot measure its own
+startup, so every measurement runs in a fresh interpreter. The child times
+the phases of ``django.setup()`` and what the entry point loads after it,
+and the parent reads the ``-X importtime`` report of one more run to build
+the import tree.
+
+Nothing here may import Django at module level: the child imports this
+module before the first phase starts.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from importlib import import_module
+
+# What each entry point loads, in order. "apps" imports the app configs and
+# models, and "ready" runs their ready() hooks.
+ENTRYPOINT_PHASES = {
+    "web": ("settings", "logging", "apps", "ready", "middleware", "urlconf"),
+    "worker": ("celery", "settings", "logging", "apps", "ready", "tasks"),
+    "beat": ("celery", "settings", "logging", "apps", "ready", "tasks", "scheduler"),
+    "command": ("settings", "logging", "apps", "ready", "commands"),
+}
+
+# Prefixes the child's report on stdout, which logging may also write to
+RESULT_MARKER = "STARTUP_PROFILE="
+
+CHILD_CODE = (
+    "import sys; from apps.core.startup import child_main; child_main(sys.argv[1])"
+)
+
+
+class StartupProfileError(Exception):
+    """
+    Raised when the profiled process exits with an error.
+    """
+
+
+@dataclass
+class ImportNode:
+    """A module in the ``-X importtime`` report, with the times in microseconds."""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    children: list["ImportNode"] = field(default_factory=list)
+
+
+def parse_importtime(lines) -> list[ImportNode]:
+    """
+    Builds the import tree from ``-X importtime`` output. A module is reported
+    after the modules it imported, indented one level deeper than itself.
+    """
+    pending: dict[int, list[ImportNode]] = {}
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            # The header line
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        node = ImportNode(
+            name.strip(),
+            int(self_us),
+            int(cumulative_us),
+            pending.pop(depth + 1, []),
+        )
+        pending.setdefault(depth, []).append(node)
+    return pending.get(0, [])
+
+
+def iter_nodes(nodes):
+    for node in nodes:
+        yield node
+        yield from iter_nodes(node.children)
+
+
+def package_times(nodes) -> dict[str, int]:
+    """
+    The self time of every top-level package, in microseconds, largest first.
+    Unlike the cumulative times of the tree, which charge a module to the
+    first module that imported it, these add up to the total import time.
+    """
+    totals: dict[str, int] = {}
+    for node in iter_nodes(nodes):
+        package = node.name.partition(".")[0]
+        totals[package] = totals.get(package, 0) + node.self_us
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def prune_tree(nodes, min_us: int, max_depth: int, depth: int = 0) -> list[dict]:
+    """The nodes of at least ``min_us`` up to ``max_depth``, slowest first."""
+    if depth >= max_depth:
+        return []
+    return [
+        {
+            "name": node.name,
+            "self_ms": node.self_us / 1000,
+            "cumulative_ms": node.cumulative_us / 1000,
+            "children": prune_tree(node.children, min_us, max_depth, depth + 1),
+        }
+        for node in sorted(nodes, key=lambda node: node.cumulative_us, reverse=True)
+        if node.cumulative_us >= min_us
+    ]
+
+
+def measure_phases(entrypoint: str) -> dict:
+    """
+    Loads what ``entrypoint`` loads, one phase at a time, and returns the
+    seconds each phase took and the seconds of each app's ready() hook.
+    """
+    phases: dict[str, float] = {}
+    ready: dict[str, float] = {}
+
+    def timed(name, func, *args):
+        started_at = time.perf_counter()
+        result = func(*args)
+        phases[name] = time.perf_counter() - started_at
+        return result
+
+    if entrypoint == "web":
+        # Like conf/wsgi.py
+        os.environ.setdefault("DEBUG_TOOLBAR", "True")
+    if "celery" in ENTRYPOINT_PHASES[entrypoint]:
+        # Like `celery -A conf`, which imports the app before Django is set up
+        celery_app = timed("celery", import_module, "conf.celery").app
+
+    settings = timed("settings", load_settings)
+
+    from django.utils.log import configure_logging
+
+    timed("logging", configure_logging, settings.LOGGING_CONFIG, settings.LOGGING)
+    timed("apps", populate_apps, settings.INSTALLED_APPS, ready)
+    phases["ready"] = sum(ready.values())
+    phases["apps"] -= phases["ready"]
+
+    if entrypoint == "web":
+        from django.core.handlers.wsgi import WSGIHandler
+        from django.urls import get_resolver
+
+        timed("middleware", WSGIHandler)
+        timed("urlconf", lambda: get_resolver().url_patterns)
+    elif entrypoint == "command":
+        from django.core.management import get_commands
+
+        timed("commands", get_commands)
+    else:
+        timed("tasks", celery_app.loader.import_default_modules)
+        if entrypoint == "beat":
+            from django.utils.module_loading import import_string
+
+            timed("scheduler", import_string, celery_app.conf.beat_scheduler)
+
+    return {"phases": phases, "ready": ready}
+
+
+def load_settings():
+    from django.conf import settings
+
+    # Imports the settings module
+    settings.INSTALLED_APPS  # noqa: B018
+    return settings
+
+
+def populate_apps(installed_apps, ready: dict[str, float]):
+    """``apps.populate()``, recording the seconds of every ready() hook."""
+    from django.apps import AppConfig, apps
+
+    import_models = AppConfig.import_models
+
+    def timed_ready(app_config):
+        def ready_hook():
+            started_at = time.perf_counter()
+            type(app_config).ready(app_config)
+            ready[app_config.name] = time.perf_counter() - started_at
+
+        return ready_hook
+
+    def import_models_and_time_ready(app_config):
+        import_models(app_config)
+        # populate() calls ready() on every app once all models are imported
+        app_config.ready = timed_ready(app_config)
+
+    AppConfig.import_models = import_models_and_time_ready
+    try:
+        apps.populate(installed_apps)
+    finally:
+        AppConfig.import_models = import_models
+        for app_config in apps.get_app_configs():
+            app_config.__dict__.pop("ready", None)
+
+
+def child_main(entrypoint: str):
+    result = measure_phases(entrypoint)
+    sys.stdout.write(RESULT_MARKER + json.dumps(result) + "\n")
+    sys.stdout.flush()
+    # Shutting the interpreter down is not part of starting it
+    os._exit(0)
+
+
+def run_child(entrypoint: str, importtime: bool = False) -> dict:
+    """Starts a fresh interpreter that measures ``entrypoint``."""
+    from django.conf import settings
+
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", CHILD_CODE, entrypoint]
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE}
+
+    started_at = time.perf_counter()
+    process = subprocess.run(
+        command, capture_output=True, text=True, env=env, cwd=settings.BASE_DIR
+    )
+    wall = time.perf_counter() - started_at
+    if process.returncode:
+        raise StartupProfileError(
+            f"The {entrypoint} startup exited with {process.returncode}:\n"
+            + process.stderr[-2000:]
+        )
+
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            result = json.loads(line[len(RESULT_MARKER) :])
+            break
+    else:
+        raise StartupProfileError(f"The {entrypoint} startup reported no phases")
+    result["wall"] = wall
+    if importtime:
+        result["imports"] = parse_importtime(process.stderr.splitlines())
+    return result
+
+
+def profile_startup(entrypoint: str, runs: int = 5) -> dict:
+    """
+    The median seconds of every phase over ``runs`` fresh processes, the
+    rest of the wall time spent starting and stopping the interpreter, and
+    the import tree of one more run under ``-X importtime``, which slows
+    imports down and so is not part of the timings.
+    """
+    results = [run_child(entrypoint) for _ in range(runs)]
+    phases = {
+        name: statistics.median(result["phases"][name] for result in results)
+        for name in ENTRYPOINT_PHASES[entrypoint]
+    }
+    ready = {
+        name: statistics.median(result["ready"][name] for result in results)
+        for name in results[0]["ready"]
+    }
+    wall = statistics.median(result["wall"] for result in results)
+    phases["interpreter"] = max(wall - sum(phases.values()), 0.0)
+    return {
+        "entrypoint": entrypoint,
+        "runs": runs,
+        "wall": wall,
+        "phases": phases,
+        "ready": ready,
+        "imports": run_child(entrypoint, importtime=True)["imports"],
+    }
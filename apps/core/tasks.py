@@ -3,8 +3,25 @@ Celery tasks documentation:
 https://docs.celeryq.dev/en/stable/userguide/tasks.html
 """
 
+import json
+import logging
+import time
+
 import celery
 from celery import shared_task
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.core.cache import caches
+
+# Makes the project's app the current app, which shared_task binds to, in
+# every process that uses a task
+import conf.celery  # noqa: F401
+
+from .metrics import BATCH_FLUSH_LATENCY, BATCH_ITEMS_DROPPED, BATCH_SIZE, TASK_DURATION
+from .throttles import get_redis_client
+from .tracing import slow_routes
+
+logger = logging.getLogger(__name__)
 
 
 class BaseTaskWithRetry(celery.Task):
@@ -37,6 +54,160 @@ class BaseTaskWithRetry(celery.Task):
     retry_jitter = True
 
 
+# Appends an item unless the buffer is full. Returns 0 when it was dropped, 3
+# when it completed a batch, 2 when it is the first item since the last flush
+# (the flush marker was not set) and 1 otherwise.
+BATCH_APPEND_SCRIPT = """
+if redis.call("LLEN", KEYS[1]) >= tonumber(ARGV[2]) then
+    return 0
+end
+local length = redis.call("RPUSH", KEYS[1], ARGV[1])
+if length % tonumber(ARGV[3]) == 0 then
+    return 3
+end
+if redis.call("SET", KEYS[2], 1, "NX", "PX", ARGV[4]) then
+    return 2
+end
+return 1
+"""
+
+# Takes up to a batch off the buffer. While items remain, the flush marker is
+# kept, as the caller flushes again right away; otherwise it is cleared, so
+# the next item schedules a flush.
+BATCH_DRAIN_SCRIPT = """
+local items = redis.call("LRANGE", KEYS[1], 0, tonumber(ARGV[1]) - 1)
+redis.call("LTRIM", KEYS[1], #items, -1)
+local remaining = redis.call("LLEN", KEYS[1])
+if remaining > 0 then
+    redis.call("SET", KEYS[2], 1, "PX", ARGV[2])
+else
+    redis.call("DEL", KEYS[2])
+end
+return {items, remaining}
+"""
+
+_batch_scripts = {}
+
+
+def get_batch_script(client, source: str):
+    """Registers a batch script once, to be called with an explicit ``client``."""
+    if source not in _batch_scripts:
+        _batch_scripts[source] = client.register_script(source)
+    return _batch_scripts[source]
+
+
+class BatchTask(BaseTaskWithRetry):
+    """
+    Coalesces calls into batches. ``enqueue(item)`` appends a JSON-serializable
+    item to a Redis list, and a single run of the task takes up to
+    ``batch_size`` items off it and receives them as a list:
+
+        @shared_task(bind=True, base=BatchTask, batch_size=100)
+        def send_notifications(self, items: list) -> None: ...
+
+        send_notifications.enqueue({"user": 1})
+
+    Only one message is published per ``flush_after`` seconds and per full
+    batch, however many items are enqueued. Items that arrive while the
+    buffer holds ``max_buffered`` are dropped, and ``enqueue`` returns
+    ``False``. A batch that fails is retried like any ``BaseTaskWithRetry``:
+    the retry carries its items. Items taken off the buffer by a worker that
+    dies before finishing the batch are lost.
+
+    Without a django-redis ``batch_cache`` (e.g. the local memory cache used
+    in tests), every item is published as a batch of its own.
+
+    Attributes:
+        batch_size (int): The most items processed by one run of the task.
+        flush_after (float): Seconds the first item of a batch waits for more.
+        max_buffered (int): The most items waiting in the buffer.
+        batch_cache (str): The alias of the cache that holds the buffer.
+    """
+
+    batch_size = 100
+    flush_after = 1.0
+    max_buffered = 10000
+    batch_cache = "default"
+
+    def buffer_keys(self, cache) -> list:
+        return [
+            cache.make_key(f"batch:{self.name}"),
+            cache.make_key(f"batch:{self.name}:flush"),
+        ]
+
+    def enqueue(self, item) -> bool:
+        """Adds ``item`` to the next batch, returning ``False`` if it was dropped."""
+        cache = caches[self.batch_cache]
+        client = get_redis_client(cache)
+        if client is None:
+            self.apply_async(([item],))
+            return True
+
+        flush_after_ms = max(int(self.flush_after * 1000), 1)
+        result = get_batch_script(client, BATCH_APPEND_SCRIPT)(
+            keys=self.buffer_keys(cache),
+            args=[
+                json.dumps([time.time(), item]),
+                self.max_buffered,
+                self.batch_size,
+                flush_after_ms,
+            ],
+            client=client,
+        )
+        if result == 0:
+            BATCH_ITEMS_DROPPED.labels(self.name).inc()
+            logger.warning("Batch buffer of %s is full, item dropped", self.name)
+            return False
+        if result == 3:
+            self.flush()
+        elif result == 2:
+            self.flush(countdown=self.flush_after)
+        return True
+
+    def flush(self, **options):
+        """Publishes a message for the task to run on the buffered items."""
+        # Without items, the task takes them off the buffer when it runs
+        return self.apply_async((None,), **options)
+
+    def drain(self) -> list:
+        """Takes up to ``batch_size`` items off the buffer."""
+        cache = caches[self.batch_cache]
+        client = get_redis_client(cache)
+        if client is None:
+            return []
+
+        flush_after_ms = max(int(self.flush_after * 1000), 1)
+        entries, remaining = get_batch_script(client, BATCH_DRAIN_SCRIPT)(
+            keys=self.buffer_keys(cache),
+            args=[self.batch_size, flush_after_ms],
+            client=client,
+        )
+        if remaining:
+            self.flush()
+        if not entries:
+            return []
+
+        entries = [json.loads(entry) for entry in entries]
+        BATCH_FLUSH_LATENCY.labels(self.name).observe(
+            max(time.time() - entries[0][0], 0.0)
+        )
+        return [item for _, item in entries]
+
+    def __call__(self, items=None):
+        # A flush message carries no items, a retried batch carries its own
+        if items is None:
+            items = self.drain()
+            if not items:
+                return None
+            if not self.request.called_directly:
+                # Retries are published with the arguments of the request
+                self.request.args = [items]
+        BATCH_SIZE.labels(self.name).observe(len(items))
+        # Not Task.__call__, which would push a request without the id and
+        # retries the worker's request has
+        return self.run(items)
+
+
 @shared_task(bind=True, base=BaseTaskWithRetry)
 def test_task(self) -> None:
     """
@@ -67,3 +238,31 @@ def test_task(self) -> None:
     # raise KeyError("This is a test error")
 
     print("Hello World from Celery")
+
+
+# Task metrics are recorded here rather than in signals.py, so that only the
+# processes that use tasks import Celery.
+
+# Start times of the tasks running in this worker process, by task id
+_task_started_at = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id, task, **kwargs):
+    _task_started_at[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task_duration(task_id, task, state=None, **kwargs):
+    """
+    Records the runtime of every task, labelled with its final state
+    (e.g. ``SUCCESS``, ``FAILURE`` or ``RETRY``), and flags slow tasks for
+    Sentry tracing.
+    """
+    started_at = _task_started_at.pop(task_id, None)
+    if started_at is None:
+        return
+    duration = time.perf_counter() - started_at
+    TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(duration)
+    if duration >= getattr(settings, "SENTRY_TRACES_SLOW_TASK_THRESHOLD", 60.0):
+        slow_routes.flag(task.name)
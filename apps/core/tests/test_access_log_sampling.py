@@ -0,0 +1,83 @@
+import logging
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from apps.core.middleware import (
+    AccessLogSamplingFilter,
+    response_time_var,
+    status_code_var,
+)
+
+PING_ROUTE = "api/v1/core/ping/"
+
+
+def make_record(route=PING_ROUTE):
+    record = logging.LogRecord("apps.access", logging.INFO, __file__, 1, "", (), None)
+    record.route = route
+    return record
+
+
+class AccessLogSamplingTests(SimpleTestCase):
+    """Test suite for the access log sampling filter"""
+
+    def sample(self, sampling_filter, status_code, response_time=0.01, **kwargs):
+        status_token = status_code_var.set(status_code)
+        time_token = response_time_var.set(response_time)
+        try:
+            record = make_record(**kwargs)
+            return record if sampling_filter.filter(record) else None
+        finally:
+            status_code_var.reset(status_token)
+            response_time_var.reset(time_token)
+
+    def test_errors_and_slow_requests_are_always_kept(self):
+        """Test server errors and slow requests ignore the sample rates"""
+        sampling_filter = AccessLogSamplingFilter(
+            rates={"*": {"5xx": 0, "2xx": 0}}, slow_threshold=0.5
+        )
+        self.assertIsNone(self.sample(sampling_filter, 200))
+        self.assertEqual(self.sample(sampling_filter, 503).sample_weight, 1)
+        self.assertEqual(self.sample(sampling_filter, 200, 0.7).sample_weight, 1)
+
+    def test_rates_by_route_and_status_class(self):
+        """Test route rates override wildcard rates, which override the default"""
+        sampling_filter = AccessLogSamplingFilter(
+            rates={PING_ROUTE: {"2xx": 0.25}, "*": {"2xx": 0, "4xx": 0}},
+            default_rate=0.5,
+        )
+        with mock.patch("apps.core.middleware.random.random", return_value=0.2):
+            self.assertEqual(self.sample(sampling_filter, 200).sample_weight, 4)
+            self.assertIsNone(self.sample(sampling_filter, 200, route="other/"))
+            self.assertIsNone(self.sample(sampling_filter, 404))
+            self.assertEqual(
+                self.sample(sampling_filter, 302, route="other/").sample_weight, 2
+            )
+
+        with mock.patch("apps.core.middleware.random.random", return_value=0.3):
+            self.assertIsNone(self.sample(sampling_filter, 200))
+
+    def test_burst_is_kept_in_full(self):
+        """Test the first records of a route in every second are all kept"""
+        sampling_filter = AccessLogSamplingFilter(default_rate=0, burst=3)
+        with mock.patch("apps.core.middleware.time.monotonic", return_value=100.0):
+            kept = [self.sample(sampling_filter, 200) for _ in range(5)]
+            self.assertIsNotNone(self.sample(sampling_filter, 201, route="other/"))
+        self.assertEqual(
+            [record is not None for record in kept], [True] * 3 + [False] * 2
+        )
+
+        with mock.patch("apps.core.middleware.time.monotonic", return_value=101.0):
+            self.assertIsNotNone(self.sample(sampling_filter, 200))
+
+    def test_access_logger_is_sampled(self):
+        """Test access log records carry their route and sample weight"""
+        filters = logging.getLogger("apps.access").filters
+        self.assertTrue(any(isinstance(f, AccessLogSamplingFilter) for f in filters))
+
+        with self.assertLogs("apps.access") as logs:
+            self.client.get(reverse("v1:core:ping"))
+        (record,) = logs.records
+        self.assertEqual(record.route, PING_ROUTE)
+        self.assertEqual(record.sample_weight, 1)
@@ -0,0 +1,120 @@
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django_redis.cache import RedisCache
+from knox.models import AuthToken
+from redis.exceptions import ConnectionError
+from rest_framework.request import Request
+
+from apps.core.cache import get_async_redis_client
+from apps.core.throttles import get_redis_client
+from apps.core.views import PingRateThrottle, aping
+from apps.users.models import CustomUser as User
+
+
+class AsyncMiddlewareTests(TestCase):
+    """Test suite for the middleware stack in async mode"""
+
+    async def test_access_log_in_async_mode(self):
+        """Test requests keep their ID, timings and access log under ASGI"""
+        user = await User.objects.acreate(email="user@example.com")
+        _, token = await sync_to_async(AuthToken.objects.create)(user=user)
+
+        with self.assertLogs("apps.access") as logs:
+            response = await self.async_client.get(
+                reverse("v1:users:profile"), headers={"Authorization": f"Bearer {token}"}
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("X-Request-ID", response)
+        (record,) = logs.records
+        self.assertEqual(record.route, "api/v1/auth/profile/")
+        # Queries run in a thread are still recorded
+        self.assertGreater(record.db_count, 0)
+
+    async def test_session_user_is_not_looked_up(self):
+        """Test a session user is not looked up on the event loop after the view"""
+        staff = await User.objects.acreate(email="staff@example.com", is_staff=True)
+        await self.async_client.aforce_login(staff)
+
+        response = await self.async_client.get(reverse("health_live"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("X-Request-ID", response)
+
+
+class AsyncWhiteNoiseMiddlewareTests(TestCase):
+    """Test suite for the async-capable WhiteNoise middleware"""
+
+    async def test_requests_stay_on_the_event_loop(self):
+        """Test requests for other paths than static files do not go to a thread"""
+        with mock.patch(
+            "apps.core.async_middleware.sync_to_async", wraps=sync_to_async
+        ) as to_thread:
+            response = await self.async_client.get(reverse("v1:core:ping"))
+
+        self.assertEqual(response.status_code, 200)
+        to_thread.assert_not_called()
+
+    def test_deploy_checks(self):
+        """Test Django's deployment checks still find its middleware"""
+        with override_settings(SECURE_SSL_REDIRECT=False, X_FRAME_OPTIONS="SAMEORIGIN"):
+            ids = [message.id for message in run_checks(include_deployment_checks=True)]
+        self.assertIn("security.W008", ids)
+        self.assertIn("security.W019", ids)
+        for missing in ("security.W001", "security.W002", "security.W003"):
+            self.assertNotIn(missing, ids)
+
+
+class AsyncViewTests(SimpleTestCase):
+    """Test suite for the async core views"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+
+    async def test_ping(self):
+        """Test the async ping answers like ping and applies the same throttle"""
+        expected = await sync_to_async(self.client.get)("/api/v1/core/ping/")
+        for _ in range(9):
+            response = await aping(self.factory.get("/api/v1/core/ping/"))
+            self.assertEqual(response.content, expected.content)
+            self.assertEqual(response["Allow"], expected["Allow"])
+
+        response = await aping(self.factory.get("/api/v1/core/ping/"))
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        self.assertTrue(json.loads(response.content)["detail"].startswith("Request was"))
+
+    async def test_throttle_on_the_event_loop(self):
+        """Test the async throttle counts in Redis like the sync one"""
+        redis_cache = RedisCache(settings.REDIS_URL, {})
+        try:
+            get_redis_client(redis_cache).ping()
+        except ConnectionError:
+            self.skipTest("Redis is not available")
+        client = get_async_redis_client(redis_cache)
+        self.assertIs(get_async_redis_client(redis_cache), client)
+
+        request = self.factory.get("/")
+        request.META["REMOTE_ADDR"] = "198.51.100.20"
+        request = Request(request)
+        try:
+            allowed = []
+            for _ in range(11):
+                throttle = PingRateThrottle()
+                throttle.cache = redis_cache
+                allowed.append(await throttle.aallow_request(request, None))
+            self.assertEqual(allowed, [True] * 10 + [False])
+            self.assertGreater(throttle.wait(), 0)
+        finally:
+            keys = await client.keys("*throttle_anon_198.51.100.20*")
+            if keys:
+                await client.delete(*keys)
+            await client.aclose()
@@ -0,0 +1,35 @@
+from django.test import TestCase
+
+from apps.core.benchmarks import SCENARIOS, compare_results, run_benchmarks
+
+
+class BenchmarkSuiteTests(TestCase):
+    """Test suite for the in-process endpoint benchmarks"""
+
+    def test_run_benchmarks_records_metrics(self):
+        """Test every scenario runs and reports its metrics"""
+        results = run_benchmarks(iterations=2)
+
+        self.assertEqual(set(results), set(SCENARIOS))
+        for metrics in results.values():
+            self.assertLessEqual(metrics["p50_ms"], metrics["p99_ms"])
+            self.assertGreater(metrics["alloc_peak_kib"], 0)
+        self.assertEqual(results["ping"]["queries"], 0)
+        self.assertGreater(results["ping"]["cache_calls"], 0)
+        self.assertGreater(results["login"]["queries"], 0)
+
+    def test_compare_results(self):
+        """Test timings regress past the threshold and counts on any increase"""
+        baseline = {
+            "ping": {"p50_ms": 1.0, "p95_ms": 2.0, "queries": 0, "cache_calls": 1},
+            "login": {"p50_ms": 100.0, "queries": 3, "cache_calls": 4},
+        }
+        current = {
+            "ping": {"p50_ms": 1.2, "p95_ms": 3.0, "queries": 1, "cache_calls": 1},
+            "login": {"p50_ms": 90.0, "queries": 3, "cache_calls": 4},
+            "profile_get": {"p50_ms": 5.0, "queries": 1, "cache_calls": 2},
+        }
+        regressions = compare_results(baseline, current, threshold=0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("ping.p95_ms"))
+        self.assertTrue(regressions[1].startswith("ping.queries"))
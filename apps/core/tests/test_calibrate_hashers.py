@@ -0,0 +1,34 @@
+import warnings
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+
+class CalibrateHashersCommandTests(SimpleTestCase):
+    """Test suite for the calibrate_hashers management command"""
+
+    def test_reports_timings_and_emits_tuned_hasher(self):
+        """Test the command benchmarks a hasher and emits a tuned subclass"""
+        out = StringIO()
+        # Other tests leave the login pool threads running in this process
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", "This process .* is multi-threaded")
+            call_command(
+                "calibrate_hashers",
+                "--hasher=pbkdf2_sha256",
+                "--steps=-6",
+                "--rounds=1",
+                "--target-ms=10000",
+                stdout=out,
+            )
+        output = out.getvalue()
+        self.assertIn("iterations=18750", output)
+        self.assertIn("logins/s/core", output)
+        self.assertIn("class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):", output)
+        self.assertIn("    iterations = 18750", output)
+
+    def test_unknown_hasher(self):
+        """Test selecting a hasher that is not configured fails"""
+        with self.assertRaises(CommandError):
+            call_command("calibrate_hashers", "--hasher=md5", stdout=StringIO())
@@ -0,0 +1,230 @@
+import json
+import time
+from unittest.mock import Mock, patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from apps.core.fastpath import ASGIFastPaths, RateLimiter, WSGIFastPaths
+
+FAST_PATHS = {
+    "/api/v1/core/ping/": {"body": {"ping": "pong"}, "rate": "3/minute"},
+    "/health/live/": {"body": {"status": "ok"}},
+}
+
+
+def django_application(environ, start_response):
+    start_response("418 I'm a Teapot", [])
+    return [b"django"]
+
+
+async def django_asgi_application(scope, receive, send):
+    await send({"type": "http.response.start", "status": 418, "headers": []})
+    await send({"type": "http.response.body", "body": b"django"})
+
+
+# Mid-window, so the sliding windows cannot roll over during a test
+FROZEN_TIME = Mock(wraps=time, monotonic=Mock(return_value=30.0))
+
+
+class RateLimiterTests(SimpleTestCase):
+    """Test suite for the in-process sliding window"""
+
+    def test_limit(self):
+        """Test a client is limited to the rate and told how long to wait"""
+        limiter = RateLimiter("3/minute")
+
+        self.assertEqual([limiter.allow("a", 60) for _ in range(3)], [None] * 3)
+        self.assertAlmostEqual(limiter.allow("a", 90), 30)
+        self.assertIsNone(limiter.allow("b", 90))
+
+    def test_sliding_window(self):
+        """Test the previous window counts for the part that still overlaps"""
+        limiter = RateLimiter("3/minute")
+        for _ in range(3):
+            limiter.allow("a", 60)
+
+        # Five sixths of the previous window overlap: 3 * 5/6 = 2.5 requests
+        self.assertIsNone(limiter.allow("a", 130))
+        self.assertAlmostEqual(limiter.allow("a", 130), 10)
+        self.assertIsNone(limiter.allow("a", 150))
+        # Windows older than the previous one are forgotten
+        self.assertIsNone(limiter.allow("a", 300))
+
+    def test_max_clients(self):
+        """Test the least recently seen clients are dropped"""
+        limiter = RateLimiter("1/minute", max_clients=2)
+        limiter.allow("a", 0)
+        limiter.allow("b", 0)
+        limiter.allow("a", 0)
+        limiter.allow("c", 0)
+
+        self.assertEqual(list(limiter.clients), ["a", "c"])
+
+
+@override_settings(FAST_PATHS=FAST_PATHS)
+class FastPathsTests(SimpleTestCase):
+    """Test suite for the fast paths of conf/wsgi.py and conf/asgi.py"""
+
+    def wsgi(self, path="/api/v1/core/ping/", method="GET", **environ):
+        # Built on first use, so it reads the settings the test overrides
+        if not hasattr(self, "application"):
+            self.application = WSGIFastPaths(django_application)
+        response = {}
+
+        def start_response(status, headers):
+            response["status"] = int(status.split()[0])
+            response["headers"] = dict(headers)
+
+        body = b"".join(
+            self.application(
+                {
+                    "REQUEST_METHOD": method,
+                    "PATH_INFO": path,
+                    "REMOTE_ADDR": "192.0.2.1",
+                    "HTTP_HOST": "testserver",
+                    "wsgi.url_scheme": "http",
+                    **environ,
+                },
+                start_response,
+            )
+        )
+        return response["status"], response["headers"], body
+
+    def test_ping(self):
+        """Test ping is answered with the body and headers Django gives it"""
+        expected = self.client.get("/api/v1/core/ping/")
+        status, headers, body = self.wsgi()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), expected.json())
+        for name in (
+            "Content-Type",
+            "X-Content-Type-Options",
+            "Referrer-Policy",
+            "Cross-Origin-Opener-Policy",
+            "X-Frame-Options",
+        ):
+            with self.subTest(header=name):
+                self.assertEqual(headers[name], expected[name])
+        self.assertEqual(headers["Content-Length"], str(len(body)))
+
+    def test_head(self):
+        """Test a HEAD gets the headers without the body"""
+        status, headers, body = self.wsgi(method="HEAD")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Length"], "16")
+        self.assertEqual(body, b"")
+
+    @patch("apps.core.fastpath.time", FROZEN_TIME)
+    def test_throttled(self):
+        """Test clients over the rate get DRF's throttled response"""
+        for _ in range(3):
+            self.assertEqual(self.wsgi()[0], 200)
+        status, headers, body = self.wsgi()
+
+        self.assertEqual(status, 429)
+        self.assertGreater(int(headers["Retry-After"]), 0)
+        self.assertTrue(json.loads(body)["detail"].startswith("Request was throttled"))
+        # X-Forwarded-For is not trusted without proxies
+        self.assertEqual(self.wsgi(HTTP_X_FORWARDED_FOR="198.51.100.1")[0], 429)
+        self.assertEqual(self.wsgi(REMOTE_ADDR="192.0.2.2")[0], 200)
+        # Paths without a rate are never limited
+        self.assertEqual(self.wsgi("/health/live/")[0], 200)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1})
+    @patch("apps.core.fastpath.time", FROZEN_TIME)
+    def test_throttled_behind_proxy(self):
+        """Test clients behind a trusted proxy are told apart by the address it saw"""
+        for _ in range(3):
+            self.wsgi(HTTP_X_FORWARDED_FOR="198.51.100.1")
+
+        self.assertEqual(self.wsgi(HTTP_X_FORWARDED_FOR="198.51.100.1")[0], 429)
+        spoofed = self.wsgi(HTTP_X_FORWARDED_FOR="203.0.113.9, 198.51.100.1")
+        self.assertEqual(spoofed[0], 429)
+        self.assertEqual(self.wsgi(HTTP_X_FORWARDED_FOR="198.51.100.2")[0], 200)
+
+    def test_handled_by_django(self):
+        """Test requests the fast paths cannot answer like Django go to Django"""
+        cases = {
+            "other path": {"path": "/api/v1/core/fire-task/"},
+            "no trailing slash": {"path": "/api/v1/core/ping"},
+            "other method": {"method": "POST"},
+            "cross-origin": {"HTTP_ORIGIN": "https://app.example.com"},
+        }
+        for name, request in cases.items():
+            with self.subTest(name):
+                self.assertEqual(self.wsgi(**request), (418, {}, b"django"))
+
+    @override_settings(ALLOWED_HOSTS=["api.example.com"])
+    def test_allowed_hosts(self):
+        """Test hosts Django would reject go to Django"""
+        self.assertEqual(self.wsgi(HTTP_HOST="api.example.com")[0], 200)
+        self.assertEqual(self.wsgi(HTTP_HOST="evil.example.com")[0], 418)
+
+    @override_settings(
+        SECURE_SSL_REDIRECT=True,
+        SECURE_REDIRECT_EXEMPT=[r"^health/"],
+        SECURE_PROXY_SSL_HEADER=("HTTP_X_FORWARDED_PROTO", "https"),
+        SECURE_HSTS_SECONDS=60,
+    )
+    def test_ssl_redirect(self):
+        """Test plain HTTP is redirected by Django unless the path is exempt"""
+        self.assertEqual(self.wsgi()[0], 418)
+        status, headers, _ = self.wsgi(HTTP_X_FORWARDED_PROTO="https")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Strict-Transport-Security"], "max-age=60")
+
+        status, headers, _ = self.wsgi("/health/live/")
+        self.assertEqual(status, 200)
+        self.assertNotIn("Strict-Transport-Security", headers)
+
+    @override_settings(FAST_PATHS={})
+    def test_disabled(self):
+        """Test every request goes to Django without fast paths"""
+        self.assertEqual(self.wsgi()[0], 418)
+
+    def test_asgi(self):
+        """Test the ASGI application answers like the WSGI one"""
+        application = ASGIFastPaths(django_asgi_application)
+
+        def request(path, scope_type="http", **headers):
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {
+                "type": scope_type,
+                "method": "GET",
+                "path": path,
+                "scheme": "http",
+                "client": ("192.0.2.1", 0),
+                "headers": [
+                    (name.encode(), value.encode())
+                    for name, value in {"host": "testserver", **headers}.items()
+                ],
+            }
+            async_to_sync(application)(scope, None, send)
+            return messages
+
+        start, body = request("/api/v1/core/ping/")
+        self.assertEqual(start["status"], 200)
+        self.assertIn(
+            (b"content-type", b"application/json"),
+            [(name.lower(), value) for name, value in start["headers"]],
+        )
+        self.assertEqual(json.loads(body["body"]), {"ping": "pong"})
+
+        for _ in range(2):
+            request("/api/v1/core/ping/")
+        self.assertEqual(request("/api/v1/core/ping/")[0]["status"], 429)
+        forwarded = request("/api/v1/core/ping/", **{"x-forwarded-for": "198.51.100.1"})
+        self.assertEqual(forwarded[0]["status"], 429)
+        cross_origin = request("/api/v1/core/ping/", origin="https://app.example.com")
+        self.assertEqual(cross_origin[0]["status"], 418)
+
+        self.assertEqual(request("/api/v1/core/fire-task/")[0]["status"], 418)
+        self.assertEqual(request("/", scope_type="websocket")[0]["status"], 418)
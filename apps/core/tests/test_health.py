@@ -0,0 +1,142 @@
+import json
+import threading
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from apps.core.health import readiness
+from apps.core.views import aready
+
+BROKER_PROBE = "apps.core.health.probe_broker"
+
+
+@override_settings(HEALTH_CHECK_TIMEOUT=1.0, HEALTH_CHECK_CACHE_SECONDS=5.0)
+class HealthViewsTests(TestCase):
+    """Test suite for the liveness and readiness endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.live_url = reverse("health_live")
+        cls.ready_url = reverse("health_ready")
+
+    def setUp(self):
+        readiness.reset()
+        self.addCleanup(self.shutdown_probes)
+
+    def shutdown_probes(self):
+        if readiness.executor is not None:
+            readiness.executor.shutdown(wait=True, cancel_futures=True)
+        readiness.reset()
+
+    def test_live(self):
+        """Test liveness is answered without probing anything"""
+        with patch("apps.core.health.run_probe") as run_probe:
+            response = self.client.get(self.live_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"status": "ok"})
+        run_probe.assert_not_called()
+        self.assertEqual(self.client.post(self.live_url).status_code, 405)
+
+    def test_ready(self):
+        """Test every dependency is reported with its latency"""
+        with patch(BROKER_PROBE):
+            response = self.client.get(self.ready_url)
+
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual(result["status"], "ok")
+        self.assertEqual(
+            set(result["checks"]), {"database:default", "cache:default", "broker"}
+        )
+        for name, check in result["checks"].items():
+            with self.subTest(name=name):
+                self.assertEqual(check["status"], "ok")
+                self.assertGreaterEqual(check["latency_ms"], 0)
+
+    def test_unavailable_dependency(self):
+        """Test a failing dependency makes the process unready"""
+        with (
+            patch(BROKER_PROBE, side_effect=ConnectionRefusedError),
+            self.assertLogs("apps.core.health", "WARNING"),
+        ):
+            response = self.client.get(self.ready_url)
+
+        self.assertEqual(response.status_code, 503)
+        result = response.json()
+        self.assertEqual(result["status"], "unavailable")
+        self.assertEqual(result["checks"]["broker"]["status"], "error")
+        self.assertEqual(result["checks"]["database:default"]["status"], "ok")
+
+    @override_settings(HEALTH_CHECK_TIMEOUT=0.05, HEALTH_CHECK_CACHE_SECONDS=0)
+    def test_probe_timeout(self):
+        """Test a hanging probe times out and is not started again until it ends"""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        with (
+            patch(BROKER_PROBE, side_effect=release.wait) as probe_broker,
+            self.assertLogs("apps.core.health", "WARNING"),
+        ):
+            first = readiness.check()
+            second = readiness.check()
+
+        self.assertEqual(first["status"], "unavailable")
+        self.assertEqual(
+            first["checks"]["broker"], {"status": "timeout", "latency_ms": 50}
+        )
+        self.assertEqual(second["checks"]["broker"]["status"], "timeout")
+        self.assertEqual(probe_broker.call_count, 1)
+
+    def test_result_is_cached(self):
+        """Test checks within the cache period reuse the result"""
+        with patch(BROKER_PROBE) as probe_broker:
+            first = readiness.check()
+            second = self.client.get(self.ready_url).json()
+            with override_settings(HEALTH_CHECK_CACHE_SECONDS=0):
+                readiness.check()
+
+        self.assertEqual(first["checks"], second["checks"])
+        self.assertEqual(first["age"], 0)
+        self.assertGreaterEqual(second["age"], 0)
+        self.assertEqual(probe_broker.call_count, 2)
+
+    def test_concurrent_checks(self):
+        """Test concurrent checks wait for a single run of the probes"""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_broker():
+            started.set()
+            release.wait(1)
+
+        results = []
+        with patch(BROKER_PROBE, side_effect=slow_broker) as probe_broker:
+            threads = [
+                threading.Thread(target=lambda: results.append(readiness.check()))
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            started.wait(1)
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(probe_broker.call_count, 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result["status"] == "ok" for result in results))
+
+    def test_async_ready(self):
+        """Test the async view serves a fresh result from the event loop"""
+        with patch(BROKER_PROBE):
+            readiness.check()
+        request = AsyncRequestFactory().get(self.ready_url)
+
+        with patch.object(readiness, "check") as check:
+            response = async_to_sync(aready)(request)
+
+        check.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["status"], "ok")
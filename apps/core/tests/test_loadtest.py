@@ -0,0 +1,111 @@
+import json
+import random
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from apps.core.loadtest import load_shapes, parse_mix, synthetic_body
+from apps.users.models import CustomUser as User
+
+PASSWORD = "loadtest-pass-123"
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    """Test suite for the loadtest management command"""
+
+    def setUp(self):
+        cache.clear()
+        for i in range(2):
+            User.objects.create_user(f"load{i}@example.com", PASSWORD)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def call(self, *args) -> dict:
+        results = self.tmp / "results.json"
+        call_command(
+            "loadtest",
+            "--password",
+            PASSWORD,
+            "--json",
+            results,
+            *args,
+            stdout=StringIO(),
+        )
+        return json.loads(results.read_text())
+
+    def test_in_process_scenario_mix(self):
+        """Test clients log in and report every route of the mix"""
+        results = self.call(
+            "--clients",
+            "2",
+            "--requests",
+            "12",
+            "--seed",
+            "1",
+            "--mix",
+            "profile_get=3,ping=1",
+        )
+
+        self.assertEqual((results["requests"], results["logged_in"]), (12, 2))
+        self.assertEqual(set(results["routes"]), {"profile_get", "ping"})
+        for metrics in results["routes"].values():
+            self.assertEqual(list(metrics["statuses"]), ["200"])
+            self.assertLessEqual(metrics["p50_ms"], metrics["p99_ms"])
+
+    def test_replay_access_log(self):
+        """Test request shapes recorded by the access log can be replayed"""
+        with self.assertLogs("apps.access") as logs:
+            self.client.get(reverse("v1:core:ping"))
+        record = logs.records[0]
+        self.assertEqual(
+            (record.method, record.request_size, record.auth), ("GET", 0, False)
+        )
+
+        path = reverse("v1:users:profile")
+        log = self.tmp / "access.log"
+        log.write_text(
+            "not json\n" + json.dumps({"method": "GET", "path": path, "auth": True})
+        )
+
+        results = self.call("--clients", "1", "--requests", "3", "--replay", str(log))
+        self.assertEqual(results["routes"][f"GET {path}"]["statuses"], {"200": 3})
+
+    def test_invalid_options(self):
+        """Test unknown scenarios and missing users are reported"""
+        with self.assertRaisesMessage(CommandError, "Unknown scenario"):
+            self.call("--mix", "unknown=1")
+
+        User.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, "No users"):
+            self.call("--requests", "1")
+
+    def test_load_shapes(self):
+        """Test only access log records are parsed and sampling is repeatable"""
+        lines = ["{}", "[]", "plain text"] + [
+            json.dumps({"method": "POST", "path": f"/p{i}/", "request_size": i})
+            for i in range(10)
+        ]
+        shapes = load_shapes(lines)
+        self.assertEqual(len(shapes), 10)
+        self.assertEqual(
+            shapes[3],
+            {
+                "method": "POST",
+                "path": "/p3/",
+                "request_size": 3,
+                "auth": False,
+                "weight": 1.0,
+            },
+        )
+        self.assertEqual(
+            load_shapes(lines, 4, random.Random(5)),
+            load_shapes(lines, 4, random.Random(5)),
+        )
+        self.assertEqual(len(synthetic_body(40)), 40)
+        self.assertEqual(parse_mix("ping=2,login"), {"ping": 2.0, "login": 1.0})
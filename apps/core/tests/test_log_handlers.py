@@ -0,0 +1,101 @@
+import io
+import logging
+import queue
+
+from django.test import SimpleTestCase
+
+from apps.core.log_handlers import (
+    BatchQueueListener,
+    BatchStreamHandler,
+    BufferedQueueHandler,
+)
+from apps.core.metrics import LOG_RECORDS_DROPPED, collect
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def make_record(message, *args, level=logging.INFO):
+    return logging.LogRecord("test", level, __file__, 1, message, args, None)
+
+
+class QueuedLoggingTests(SimpleTestCase):
+    """Test suite for the queued logging handlers"""
+
+    def configure(self, stream):
+        console = BatchStreamHandler(stream)
+        console.setLevel(logging.INFO)
+        console.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+
+        # Attached the same way as by dictConfig, which starts the listener
+        handler = BufferedQueueHandler(queue.Queue())
+        handler.listener = BatchQueueListener(
+            handler.queue, console, respect_handler_level=True
+        )
+        self.addCleanup(handler.close)
+
+        logger = logging.getLogger("queued")
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        return logger, handler
+
+    def test_records_are_written_in_batches_and_flushed_on_close(self):
+        """Test queued records are all written, in fewer writes, by close()"""
+        stream = CountingStream()
+        logger, handler = self.configure(stream)
+        self.assertIsNotNone(handler.listener._thread)
+
+        for i in range(1000):
+            logger.info("record %s", i)
+        logger.debug("below the console level")
+        handler.close()
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 1000)
+        self.assertEqual(lines[-1], "INFO record 999")
+        self.assertLess(stream.writes, 1000)
+
+    def test_drop_policy_counts_dropped_records(self):
+        """Test a full queue drops records instead of blocking the caller"""
+        handler = BufferedQueueHandler(queue.Queue(maxsize=2))
+        before = collect().get(("log_records_dropped_total", "", ()), 0)
+
+        for i in range(5):
+            handler.handle(make_record("message %s", i))
+
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertEqual(collect()[("log_records_dropped_total", "", ())], before + 3)
+        self.assertIs(LOG_RECORDS_DROPPED.labels(), LOG_RECORDS_DROPPED.labels())
+
+    def test_block_policy_waits_for_room(self):
+        """Test the block policy gives up after its timeout"""
+        handler = BufferedQueueHandler(
+            queue.Queue(maxsize=1), policy="block", block_timeout=0.01
+        )
+        before = collect().get(("log_records_dropped_total", "", ()), 0)
+        handler.handle(make_record("first"))
+        handler.handle(make_record("second"))
+        self.assertEqual(collect()[("log_records_dropped_total", "", ())], before + 1)
+
+        record = handler.queue.get_nowait()
+        self.assertEqual((record.msg, record.args), ("first", None))
+
+        with self.assertRaises(ValueError):
+            BufferedQueueHandler(queue.Queue(), policy="wait")
+
+    def test_block_policy_requires_timeout(self):
+        """Test the block policy cannot be configured to wait forever"""
+        for timeout in (None, 0):
+            with self.subTest(timeout=timeout), self.assertRaises(ValueError):
+                BufferedQueueHandler(queue.Queue(), policy="block", block_timeout=timeout)
+        # The drop policy never waits, so it does not need one
+        BufferedQueueHandler(queue.Queue(), policy="drop", block_timeout=None).close()
@@ -0,0 +1,115 @@
+import multiprocessing
+import tempfile
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from apps.core.metrics import (
+    REGISTRY,
+    VALUE,
+    Counter,
+    Histogram,
+    ValuesFile,
+    collect,
+    generate_latest,
+    reset_values_files,
+)
+from apps.users.models import CustomUser as User
+
+
+def record_in_child(counter):
+    counter.labels("child").inc(2)
+
+
+class MetricsTests(SimpleTestCase):
+    """Test suite for the multiprocess metrics store"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.enterContext(override_settings(METRICS_DIR=self.directory))
+        reset_values_files()
+        self.addCleanup(reset_values_files)
+
+    def make(self, metric_class, name, *args, **kwargs):
+        self.addCleanup(REGISTRY.pop, name)
+        return metric_class(name, f"{name} help", *args, **kwargs)
+
+    def test_counters_are_summed_across_processes(self):
+        """Test samples written by a forked worker are read by the parent"""
+        counter = self.make(Counter, "test_jobs_total", ("source",))
+        counter.labels("parent").inc()
+
+        process = multiprocessing.get_context("fork").Process(
+            target=record_in_child, args=(counter,)
+        )
+        process.start()
+        process.join()
+        counter.labels("child").inc()
+
+        totals = collect()
+        self.assertEqual(totals[("test_jobs_total", "", ("parent",))], 1)
+        self.assertEqual(totals[("test_jobs_total", "", ("child",))], 3)
+
+    def test_histogram_exposition(self):
+        """Test buckets are cumulative and the count matches the observations"""
+        histogram = self.make(Histogram, "test_seconds", ("route",), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.labels('a"b').observe(value)
+
+        output = generate_latest()
+        self.assertIn("# TYPE test_seconds histogram", output)
+        self.assertIn('test_seconds_bucket{route="a\\"b",le="0.1"} 2', output)
+        self.assertIn('test_seconds_bucket{route="a\\"b",le="1.0"} 3', output)
+        self.assertIn('test_seconds_bucket{route="a\\"b",le="+Inf"} 4', output)
+        self.assertIn('test_seconds_count{route="a\\"b"} 4', output)
+        self.assertIn('test_seconds_sum{route="a\\"b"} 3.65', output)
+
+    def test_values_file_grows_and_reopens(self):
+        """Test a file keeps its values when it grows and when it is reopened"""
+        path = f"{self.directory}/test.db"
+        values_file = ValuesFile(path)
+        keys = [f"key-{i}".encode() * 50 for i in range(500)]
+        for key in keys:
+            values_file.add(key, 1.5)
+        self.assertGreater(values_file.size, 64 * 1024)
+
+        reopened = ValuesFile(path)
+        reopened.add(keys[0], 1)
+        self.assertEqual(len(reopened.positions), 500)
+        (value,) = VALUE.unpack_from(reopened.map, reopened.positions[keys[0]])
+        self.assertEqual(value, 2.5)
+
+
+@override_settings(METRICS_DIR=None, METRICS_INTERNAL_IPS=["127.0.0.1/32"])
+class MetricsViewTests(TestCase):
+    """Test suite for the internal /metrics endpoint"""
+
+    def test_request_and_login_metrics(self):
+        """Test requests are recorded by route and logins by outcome"""
+        User.objects.create_user("user@example.com", "testpass123")
+        self.client.post(
+            reverse("v1:users:knox_login"),
+            {"email": "user@example.com", "password": "wrong-password"},
+            content_type="application/json",
+        )
+
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        content = response.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{route="api/v1/auth/login/",'
+            'method="POST",status="400"}',
+            content,
+        )
+        self.assertIn('login_attempts_total{outcome="failure"}', content)
+
+    def test_metrics_internal_only(self):
+        """Test external and proxied clients cannot read the metrics"""
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR="203.0.113.7")
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(reverse("metrics"), HTTP_X_FORWARDED_FOR="127.0.0.1")
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,86 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from apps.core.middleware import QueryInspectorMiddleware
+from apps.core.queries import sql_shape
+from apps.users.models import CustomUser as User
+
+BUDGETS = {
+    "QUERY_INSPECTOR_SAMPLE_RATE": 1.0,
+    "QUERY_BUDGET_COUNT": 30,
+    "QUERY_BUDGET_DB_TIME": 10,
+    "QUERY_BUDGET_DUPLICATES": 5,
+    "QUERY_BUDGET_SLOW_QUERY": 10,
+    "QUERY_EXPLAIN": False,
+}
+
+
+def n_plus_one_view(request):
+    for user in User.objects.all():
+        User.objects.filter(pk=user.pk).exists()
+    return HttpResponse()
+
+
+def single_query_view(request):
+    list(User.objects.filter(email__in=["a@example.com", "b@example.com"]))
+    return HttpResponse()
+
+
+@override_settings(**BUDGETS)
+class QueryInspectorTests(TestCase):
+    """Test suite for the per-request query budgets"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(8):
+            User.objects.create_user(f"user{i}@example.com", "testpass123")
+
+    def run_view(self, view):
+        middleware = QueryInspectorMiddleware(view)
+        return middleware(RequestFactory().get("/"))
+
+    def test_repeated_queries_are_reported(self):
+        """Test an N+1 pattern is logged with its shape and count"""
+        with self.assertLogs("apps.core.middleware", "WARNING") as logs:
+            self.run_view(n_plus_one_view)
+
+        (record,) = logs.records
+        self.assertEqual(record.budgets_exceeded, ["duplicate_queries"])
+        self.assertEqual(record.query_count, 9)
+        self.assertEqual(record.duplicate_queries[0]["count"], 8)
+        self.assertIsNone(record.explain)
+
+    def test_slowest_query_is_explained(self):
+        """Test the plan of the slowest SELECT is logged without its parameters"""
+        with (
+            override_settings(QUERY_BUDGET_SLOW_QUERY=0, QUERY_EXPLAIN=True),
+            self.assertLogs("apps.core.middleware", "WARNING") as logs,
+        ):
+            self.run_view(single_query_view)
+
+        (record,) = logs.records
+        self.assertEqual(record.budgets_exceeded, ["slow_query"])
+        self.assertNotIn("a@example.com", record.slowest_query)
+        self.assertTrue(record.explain)
+
+    def test_within_budget_or_not_sampled(self):
+        """Test nothing is logged under budget or when the request is not sampled"""
+        with self.assertNoLogs("apps.core.middleware"):
+            self.run_view(single_query_view)
+
+        with (
+            override_settings(QUERY_INSPECTOR_SAMPLE_RATE=0, QUERY_BUDGET_COUNT=0),
+            self.assertNoLogs("apps.core.middleware"),
+        ):
+            self.run_view(n_plus_one_view)
+
+    def test_sql_shape(self):
+        """Test lists of values do not make different shapes"""
+        self.assertEqual(
+            sql_shape('SELECT 1 FROM "t" WHERE "id" IN (%s, %s, %s)'),
+            'SELECT 1 FROM "t" WHERE "id" IN (%s, ...)',
+        )
+        self.assertEqual(
+            sql_shape('INSERT INTO "t" ("a", "b") VALUES (%s, %s), (%s, %s), (%s, %s)'),
+            'INSERT INTO "t" ("a", "b") VALUES (%s, ...), ...',
+        )
@@ -0,0 +1,126 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import Group
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from django_celery_beat.models import PeriodicTask
+from knox.models import AuthToken
+from knox.settings import CONSTANTS, knox_settings
+
+from apps.core.management.commands.seed import Command
+from apps.users.models import CustomUser as User
+
+
+class SeedCommandTests(TestCase):
+    """Test suite for the seed management command"""
+
+    def call(self, *args) -> str:
+        out = StringIO()
+        call_command("seed", *args, stdout=out)
+        return out.getvalue()
+
+    def test_fast_mode_creates_users_in_batches(self):
+        """Test --fast creates every user with the shared password hash"""
+        output = self.call(
+            "--fast", "--users", "25", "--batch-size", "10", "--workers", "1"
+        )
+
+        self.assertIn("25/25 users", output)
+        self.assertIn("Created 25 users", output)
+        self.assertEqual(User.objects.count(), 25)
+        passwords = set(User.objects.values_list("password", flat=True))
+        self.assertEqual(len(passwords), 1)
+        self.assertTrue(check_password("testpass123", passwords.pop()))
+
+    def test_fast_mode_can_run_twice(self):
+        """Test emails from a second --fast run do not clash with the first"""
+        self.call("--fast", "--users", "5", "--workers", "1")
+        self.call("--fast", "--users", "5", "--workers", "1")
+        self.assertEqual(User.objects.count(), 10)
+
+    def test_fast_mode_counts_inserted_users(self):
+        """Test users skipped as conflicts are not reported as created"""
+        User.objects.create_user("taken@example.com", "userpass123")
+        now = timezone.now()
+        batch = [
+            ("taken@example.com", "Taken", "User", now),
+            ("new@example.com", "New", "User", now),
+        ]
+
+        with mock.patch.object(Command, "generate_batches", return_value=[batch]):
+            output = self.call("--fast", "--users", "2", "--workers", "1")
+
+        self.assertIn("Created 1 users, skipped 1 that already existed", output)
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_clean_keeps_superusers(self):
+        """Test --clean deletes users and their related rows set-wise"""
+        admin = User.objects.create_superuser("admin@example.com", "adminpass123")
+        user = User.objects.create_user("user@example.com", "userpass123")
+        user.groups.add(Group.objects.create(name="staff"))
+        AuthToken.objects.create(user=user)
+        AuthToken.objects.create(user=admin)
+
+        output = self.call("--clean", "--users", "0")
+
+        self.assertIn("Deleted 1 users", output)
+        self.assertEqual(list(User.objects.all()), [admin])
+        self.assertEqual(AuthToken.objects.get().user, admin)
+        self.assertFalse(User.groups.through.objects.exists())
+
+    def test_seed_authentication_state(self):
+        """Test tokens, sessions and beat entries are generated consistently"""
+        self.call(
+            "--fast",
+            "--users",
+            "20",
+            "--workers",
+            "1",
+            "--seed",
+            "7",
+            "--tokens-per-user",
+            "2",
+            "--sessions",
+            "0.5",
+            "--periodic-tasks",
+            "4",
+            "--expired-ratio",
+            "0.25",
+        )
+
+        now = timezone.now()
+        tokens = AuthToken.objects.all()
+        self.assertEqual(tokens.count(), 40)
+        self.assertTrue(0 < tokens.filter(expiry__lt=now).count() < 40)
+        token = tokens.first()
+        self.assertEqual(len(token.digest), CONSTANTS.DIGEST_LENGTH)
+        self.assertEqual(token.created, token.expiry - knox_settings.TOKEN_TTL)
+
+        session = Session.objects.first()
+        self.assertTrue(session.session_key.startswith("seed"))
+        user_id = session.get_decoded()[SESSION_KEY]
+        self.assertTrue(User.objects.filter(pk=user_id).exists())
+
+        self.assertEqual(PeriodicTask.objects.filter(name__startswith="seed-").count(), 4)
+
+    def test_seed_is_repeatable(self):
+        """Test the same --seed reproduces the same users and tokens"""
+        options = ("--fast", "--users", "5", "--workers", "1", "--seed", "42")
+        options += ("--tokens-per-user", "1.5", "--sessions", "1", "--clean")
+        snapshots = []
+        for _ in range(2):
+            self.call(*options)
+            snapshots.append(
+                (
+                    sorted(User.objects.values_list("email", flat=True)),
+                    sorted(AuthToken.objects.values_list("digest", flat=True)),
+                    sorted(Session.objects.values_list("session_key", flat=True)),
+                )
+            )
+        self.assertEqual(snapshots[0], snapshots[1])
+        self.assertEqual(len(snapshots[0][2]), 5)
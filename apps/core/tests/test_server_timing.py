@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.test import override_settings
+from django.urls import reverse
+from django_redis.cache import RedisCache
+from knox.models import AuthToken
+from redis.exceptions import ConnectionError
+from rest_framework.test import APITestCase
+
+from apps.core.throttles import get_redis_client
+from apps.core.timing import RequestTimings, record_timing, timings_var
+from apps.users.models import CustomUser as User
+
+EXTERNAL_IP = "203.0.113.7"
+
+
+class ServerTimingTests(APITestCase):
+    """Test suite for the per-phase timings of RequestIDMiddleware"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("v1:users:profile")
+        cls.user = User.objects.create_user("user@example.com", "testpass123")
+        cls.staff = User.objects.create_user(
+            "staff@example.com", "testpass123", is_staff=True
+        )
+
+    def get_profile(self, user, **extra):
+        _, token = AuthToken.objects.create(user=user)
+        return self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {token}", **extra)
+
+    def test_internal_ip_gets_phases(self):
+        """Test requests from internal IPs get every phase in the header"""
+        with self.assertLogs("apps.access") as logs:
+            response = self.get_profile(self.user)
+
+        header = response["Server-Timing"]
+        for phase in ("db", "auth", "throttle", "serialize", "total"):
+            self.assertIn(f"{phase};dur=", header)
+
+        record = logs.records[0]
+        self.assertGreater(record.db_count, 0)
+        self.assertGreaterEqual(record.auth_ms, 0)
+
+    def test_header_gated_to_staff_and_internal_ips(self):
+        """Test other clients get no header while the access log keeps the fields"""
+        response = self.get_profile(self.user, REMOTE_ADDR=EXTERNAL_IP)
+        self.assertNotIn("Server-Timing", response)
+
+        response = self.get_profile(self.staff, REMOTE_ADDR=EXTERNAL_IP)
+        self.assertIn("Server-Timing", response)
+
+        # An internal address in X-Forwarded-For is not trusted by default
+        response = self.get_profile(
+            self.user, REMOTE_ADDR=EXTERNAL_IP, HTTP_X_FORWARDED_FOR="127.0.0.1"
+        )
+        self.assertNotIn("Server-Timing", response)
+
+        with override_settings(SERVER_TIMING_INTERNAL_IPS=["203.0.113.0/24"]):
+            self.client = self.client_class()
+            response = self.get_profile(self.user, REMOTE_ADDR=EXTERNAL_IP)
+        self.assertIn("Server-Timing", response)
+
+    def test_record_timing(self):
+        """Test nested phases are counted once and nothing is recorded outside requests"""
+        with record_timing("db"):
+            pass
+
+        timings = RequestTimings()
+        token = timings_var.set(timings)
+        try:
+            with record_timing("serialize"), record_timing("serialize"):
+                with record_timing("db"):
+                    pass
+        finally:
+            timings_var.reset(token)
+
+        self.assertEqual(timings.phases["serialize"][1], 1)
+        self.assertEqual(timings.fields()["db_count"], 1)
+        self.assertTrue(timings.header(0.01).endswith("total;dur=10.00"))
+
+    def test_timed_redis_client(self):
+        """Test cache API calls through the timed client land in the cache phase"""
+        cache = RedisCache(
+            settings.REDIS_URL,
+            {"OPTIONS": {"CLIENT_CLASS": "apps.core.cache.TimedRedisClient"}},
+        )
+        try:
+            get_redis_client(cache).ping()
+        except ConnectionError:
+            self.skipTest("Redis is not available")
+
+        timings = RequestTimings()
+        token = timings_var.set(timings)
+        try:
+            cache.set("server-timing-test", 1)
+            cache.get_many(["server-timing-test"])
+            cache.delete("server-timing-test")
+        finally:
+            timings_var.reset(token)
+        self.assertEqual(timings.fields()["cache_count"], 3)
@@ -0,0 +1,59 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from apps.core.startup import iter_nodes, package_times, parse_importtime, run_child
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   encodings.utf_8
+import time:        50 |        150 | encodings
+import time:        20 |         20 |     django.utils.version
+import time:        30 |         50 |   django.utils
+import time:        40 |         40 |   django.conf
+import time:        10 |        100 | django
+"""
+
+
+class StartupProfileTests(SimpleTestCase):
+    """Test suite for the startup profiler"""
+
+    def test_parse_importtime(self):
+        """Test the report is parsed into a tree of modules"""
+        roots = parse_importtime(IMPORTTIME.splitlines())
+
+        self.assertEqual([node.name for node in roots], ["encodings", "django"])
+        django = roots[1]
+        self.assertEqual(
+            [node.name for node in django.children], ["django.utils", "django.conf"]
+        )
+        self.assertEqual(django.children[0].children[0].name, "django.utils.version")
+        self.assertEqual(django.cumulative_us, 100)
+        self.assertEqual(package_times(roots), {"encodings": 150, "django": 100})
+
+    def test_command_is_lazy(self):
+        """Test one-off commands do not load what only servers and workers use"""
+        imported = {
+            node.name
+            for node in iter_nodes(run_child("command", importtime=True)["imports"])
+        }
+
+        for module in ("conf.celery", "sentry_sdk", "redis.asyncio", "debug_toolbar"):
+            with self.subTest(module=module):
+                self.assertNotIn(module, imported)
+        self.assertIn("django.apps.registry", imported)
+
+    def test_profile_startup_command(self):
+        """Test the command reports the phases of the entry point"""
+        out = StringIO()
+        call_command("profile_startup", "command", "--runs=1", "--json", stdout=out)
+        profile = json.loads(out.getvalue())
+
+        self.assertEqual(
+            list(profile["phases"]),
+            ["settings", "logging", "apps", "ready", "commands", "interpreter"],
+        )
+        self.assertIn("apps.users", profile["ready"])
+        self.assertTrue(profile["imports"])
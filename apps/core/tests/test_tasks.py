@@ -0,0 +1,133 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from redis.exceptions import ConnectionError
+
+from apps.core.metrics import collect
+from apps.core.tasks import BaseTaskWithRetry, BatchTask
+from apps.core.throttles import get_redis_client
+from conf.celery import app
+
+BATCH_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "batch": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": settings.REDIS_URL,
+        "KEY_PREFIX": "test-batch",
+    },
+}
+
+batches = []
+
+
+@app.task(
+    bind=True,
+    base=BatchTask,
+    name="tests.collect_batch",
+    batch_size=3,
+    flush_after=0.5,
+    max_buffered=7,
+    batch_cache="batch",
+)
+def collect_batch(self, items):
+    batches.append((items, self.request.args))
+
+
+def metric(name: str) -> float:
+    """The value of a counter, or the number of observations of a histogram."""
+    return sum(
+        value
+        for (metric_name, suffix, labels), value in collect().items()
+        if metric_name == name and labels == ("tests.collect_batch",) and suffix != "sum"
+    )
+
+
+@override_settings(CACHES=BATCH_CACHES)
+class BatchTaskTests(SimpleTestCase):
+    """Test suite for the batching task base class"""
+
+    def setUp(self):
+        cache = caches["batch"]
+        try:
+            get_redis_client(cache).ping()
+        except ConnectionError:
+            self.skipTest("Redis is not available")
+        self.addCleanup(
+            cache.delete_many,
+            ["batch:tests.collect_batch", "batch:tests.collect_batch:flush"],
+        )
+        batches.clear()
+        patcher = mock.patch.object(collect_batch, "apply_async")
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_is_retried(self):
+        """Test batching tasks keep the retries of BaseTaskWithRetry"""
+        self.assertIsInstance(collect_batch, BaseTaskWithRetry)
+        self.assertEqual(collect_batch.autoretry_for, (Exception,))
+
+    def test_coalesces_calls(self):
+        """Test one message is published per flush period and per full batch"""
+        for item in range(7):
+            self.assertTrue(collect_batch.enqueue({"item": item}))
+
+        self.assertEqual(
+            self.apply_async.call_args_list,
+            [
+                mock.call((None,), countdown=0.5),
+                mock.call((None,)),
+                mock.call((None,)),
+            ],
+        )
+
+    def test_drains_batches(self):
+        """Test a run takes up to a batch off the buffer and flushes the rest"""
+        size_count = metric("celery_batch_size")
+        latency_count = metric("celery_batch_flush_latency_seconds")
+        for item in range(4):
+            collect_batch.enqueue(item)
+        self.apply_async.reset_mock()
+
+        collect_batch.push_request(id="flush", args=[None], called_directly=False)
+        try:
+            collect_batch(None)
+        finally:
+            collect_batch.pop_request()
+        # The remaining item is flushed right away
+        self.apply_async.assert_called_once_with((None,))
+        collect_batch(None)
+        # An empty buffer runs nothing
+        collect_batch(None)
+
+        # Retries of the first batch would carry its items
+        self.assertEqual(batches, [([0, 1, 2], [[0, 1, 2]]), ([3], None)])
+        self.assertEqual(metric("celery_batch_size"), size_count + 2)
+        self.assertEqual(metric("celery_batch_flush_latency_seconds"), latency_count + 2)
+
+    def test_retried_batch(self):
+        """Test a message with items processes them without draining"""
+        collect_batch.enqueue("buffered")
+
+        collect_batch(["retried"])
+
+        self.assertEqual(batches[0][0], ["retried"])
+        self.assertEqual(collect_batch.drain(), ["buffered"])
+
+    def test_drops_when_full(self):
+        """Test items are dropped and counted once the buffer is full"""
+        dropped = metric("celery_batch_items_dropped_total")
+        for item in range(7):
+            self.assertTrue(collect_batch.enqueue(item))
+
+        with self.assertLogs("apps.core.tasks", "WARNING"):
+            self.assertFalse(collect_batch.enqueue(7))
+        self.assertEqual(metric("celery_batch_items_dropped_total"), dropped + 1)
+
+    @override_settings(CACHES={"batch": BATCH_CACHES["default"]})
+    def test_without_redis(self):
+        """Test every item is published as its own batch without Redis"""
+        self.assertTrue(collect_batch.enqueue("item"))
+
+        self.apply_async.assert_called_once_with((["item"],))
@@ -0,0 +1,135 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+from django_redis.cache import RedisCache
+from redis.exceptions import ConnectionError
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from apps.core.throttles import (
+    PipelinedThrottleMixin,
+    RedisRateThrottle,
+    get_redis_client,
+)
+
+
+def get_test_redis_cache():
+    cache = RedisCache(
+        settings.REDIS_URL,
+        {"OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"}},
+    )
+    try:
+        get_redis_client(cache).ping()
+    except ConnectionError:
+        return None
+    return cache
+
+
+class RedisRateThrottleTests(SimpleTestCase):
+    """Test suite for the atomic Redis sliding window throttle"""
+
+    def setUp(self):
+        self.cache = get_test_redis_cache()
+        if self.cache is None:
+            self.skipTest("Redis is not available")
+        self.factory = APIRequestFactory()
+        self.timer = mock.Mock(return_value=1_000_000.0)
+
+        cache, timer = self.cache, self.timer
+
+        class MinuteThrottle(RedisRateThrottle):
+            rate = "3/minute"
+
+            def get_cache_key(self, request, view):
+                return "throttle_test_minute"
+
+        MinuteThrottle.cache = cache
+        MinuteThrottle.timer = timer
+
+        class HourThrottle(MinuteThrottle):
+            rate = "4/hour"
+
+            def get_cache_key(self, request, view):
+                return "throttle_test_hour"
+
+        self.minute_throttle = MinuteThrottle
+        self.hour_throttle = HourThrottle
+        cache.delete_pattern("throttle_test_*")
+        self.addCleanup(cache.delete_pattern, "throttle_test_*")
+
+    def make_view(self, *throttle_classes):
+        class ThrottledView(PipelinedThrottleMixin, APIView):
+            authentication_classes = ()
+            permission_classes = ()
+
+            def get(self, request):
+                return Response({"ok": True})
+
+        ThrottledView.throttle_classes = list(throttle_classes)
+        return ThrottledView.as_view()
+
+    def test_throttle_denies_after_limit(self):
+        """Test the throttle allows the rate and then reports a wait"""
+        throttle = self.minute_throttle()
+        request = self.factory.get("/")
+        for _ in range(3):
+            self.assertTrue(throttle.allow_request(request, None))
+        self.assertFalse(throttle.allow_request(request, None))
+        self.assertGreater(throttle.wait(), 0)
+
+    def test_sliding_window_counts_previous_window(self):
+        """Test requests from the previous window still count while it overlaps"""
+        throttle = self.minute_throttle()
+        request = self.factory.get("/")
+        self.timer.return_value = 1_000_000.0 - 10
+        for _ in range(3):
+            self.assertTrue(throttle.allow_request(request, None))
+
+        # A quarter into the next window, 3 * 0.75 of the old requests remain
+        self.timer.return_value = 1_000_000.0 + 15
+        self.assertFalse(throttle.allow_request(request, None))
+
+        # Most of the previous window has slid out
+        self.timer.return_value = 1_000_000.0 + 50
+        self.assertTrue(throttle.allow_request(request, None))
+
+    def test_view_throttles_share_one_pipeline(self):
+        """Test all Redis throttles of a view run in one round-trip"""
+        view = self.make_view(self.minute_throttle, self.hour_throttle)
+        client = get_redis_client(self.cache)
+
+        with mock.patch.object(
+            type(client), "pipeline", autospec=True, side_effect=type(client).pipeline
+        ) as pipeline:
+            for _ in range(3):
+                response = view(self.factory.get("/"))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = view(self.factory.get("/"))
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(pipeline.call_count, 4)
+
+
+class FallbackThrottleTests(SimpleTestCase):
+    """Test suite for the throttle running on a non-Redis cache"""
+
+    def test_falls_back_to_simple_rate_throttle(self):
+        """Test the throttle keeps working on the local memory cache"""
+
+        class LocalThrottle(RedisRateThrottle):
+            rate = "2/minute"
+            cache = LocMemCache("throttle-fallback", {})
+
+            def get_cache_key(self, request, view):
+                return "throttle_test_fallback"
+
+        request = APIRequestFactory().get("/")
+        throttle = LocalThrottle()
+        self.assertTrue(throttle.allow_request(request, None))
+        self.assertTrue(throttle.allow_request(request, None))
+        self.assertFalse(throttle.allow_request(request, None))
+        self.assertIsNotNone(throttle.wait())
@@ -0,0 +1,97 @@
+from unittest import mock
+
+import sentry_sdk
+from django.test import SimpleTestCase
+from sentry_sdk.transport import Transport
+
+from apps.core.tracing import SlowRoutes, TracesSampler
+
+PING = {"wsgi_environ": {"PATH_INFO": "/api/v1/core/ping/"}}
+PROFILE = {"wsgi_environ": {"PATH_INFO": "/api/v1/auth/profile/"}}
+
+
+class StubTransport(Transport):
+    """Keeps the envelopes instead of sending them to Sentry."""
+
+    def __init__(self, options=None):
+        super().__init__(options)
+        self.envelopes = []
+
+    def capture_envelope(self, envelope):
+        self.envelopes.append(envelope)
+
+    def transactions(self):
+        return [
+            item.payload.json
+            for envelope in self.envelopes
+            for item in envelope.items
+            if item.type == "transaction"
+        ]
+
+
+class TracesSamplerTests(SimpleTestCase):
+    """Test suite for the Sentry traces sampler"""
+
+    def setUp(self):
+        self.slow_routes = SlowRoutes()
+        self.enterContext(mock.patch("apps.core.tracing.slow_routes", self.slow_routes))
+
+    def sampler(self, **kwargs):
+        options = {
+            "rates": {"api/v1/core/ping/": 0.0, "cleanup": 0.5},
+            "default_rate": 0.1,
+            "per_second": 1000,
+        }
+        return TracesSampler(**(options | kwargs))
+
+    def test_rates_by_route_and_task(self):
+        """Test requests and tasks get the rate of their route or task name"""
+        sampler = self.sampler()
+        self.assertEqual(sampler(PING), 0)
+        self.assertEqual(sampler(PROFILE), 0.1)
+        self.assertEqual(sampler({"asgi_scope": {"path": "/no/such/url/"}}), 0.1)
+        self.assertEqual(sampler({"celery_job": {"task": "cleanup"}}), 0.5)
+        self.assertEqual(sampler(PING | {"parent_sampled": True}), 1)
+
+    def test_slow_routes_are_traced(self):
+        """Test a route flagged as slow is traced at the slow rate for a while"""
+        sampler = self.sampler(slow_window=30)
+        self.slow_routes.flag("api/v1/auth/profile/")
+        self.assertEqual(sampler(PROFILE), 1)
+
+        with mock.patch("apps.core.tracing.time.monotonic", return_value=1e12):
+            self.assertEqual(sampler(PROFILE), 0.1)
+
+    def test_budget(self):
+        """Test the expected number of traces a second stays within the budget"""
+        sampler = self.sampler(per_second=2, default_rate=0.5)
+        with mock.patch("apps.core.tracing.time.monotonic", return_value=100.0):
+            sampler.updated_at = 100.0
+            rates = [sampler(PROFILE) for _ in range(6)]
+        self.assertEqual(rates, [0.5] * 4 + [0.0] * 2)
+
+        with mock.patch("apps.core.tracing.time.monotonic", return_value=101.0):
+            self.assertEqual(sampler(PROFILE), 0.5)
+
+    def test_sentry_uses_the_sampler(self):
+        """Test transactions are sent according to the sampler's rates"""
+        transport = StubTransport()
+        sentry_sdk.init(
+            dsn="https://key@sentry.invalid/1",
+            transport=transport,
+            traces_sampler=self.sampler(),
+            default_integrations=False,
+            auto_enabling_integrations=False,
+        )
+        self.addCleanup(sentry_sdk.get_global_scope().set_client, None)
+        self.slow_routes.flag("api/v1/auth/profile/")
+
+        for context in (PING, PROFILE):
+            for _ in range(5):
+                with sentry_sdk.start_transaction(
+                    name="request", custom_sampling_context=context
+                ):
+                    pass
+        sentry_sdk.flush()
+
+        self.assertEqual(len(transport.transactions()), 5)
@@ -0,0 +1,36 @@
+from unittest import mock
+
+from django.db import OperationalError, connection, connections
+from django.test import TransactionTestCase
+
+from apps.core.warmup import warm_up, warm_up_connections, warm_up_urls
+from apps.users.views import UserProfileView
+
+
+class WarmUpTests(TransactionTestCase):
+    """Test suite for the pre-fork warm-up"""
+
+    def test_warm_up(self):
+        """Test the URLconf, views and serializers are loaded"""
+        with self.assertLogs("apps.core.warmup", "INFO") as logs:
+            summary = warm_up()
+
+        self.assertIn(UserProfileView, warm_up_urls())
+        self.assertGreater(summary["serializers"], 0)
+        self.assertIn("Warmed up", logs.output[0])
+
+    def test_connections_are_closed(self):
+        """Test no connection is left open to be shared with forked workers"""
+        with mock.patch.object(connections, "close_all") as close_all:
+            self.assertNotIn("default", warm_up_connections())
+        close_all.assert_called_once()
+
+    def test_unreachable_database(self):
+        """Test a database that cannot be reached does not stop the warm-up"""
+        with (
+            mock.patch.object(
+                connection, "ensure_connection", side_effect=OperationalError
+            ),
+            self.assertLogs("apps.core.warmup", "WARNING"),
+        ):
+            self.assertIn("default", warm_up_connections())
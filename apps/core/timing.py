@@ -0,0 +1,117 @@
+"""
+Per-request phase timings, collected while ``RequestIDMiddleware`` handles a
+request and reported in the ``Server-Timing`` header and the access log.
+
+Phases are measured independently, so they can overlap: ``auth`` includes
+the database and cache calls made to authenticate, and ``serialize``
+includes password hashing during login. A phase entered again while it is
+already running (e.g. a nested serializer) is only counted once.
+"""
+
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+PHASE_DESCRIPTIONS = {
+    "db": "Database",
+    "cache": "Cache",
+    "throttle": "Throttling",
+    "auth": "Authentication",
+    "hash": "Password hashing",
+    "serialize": "Serializers",
+}
+
+
+class RequestTimings:
+    """
+    Accumulated time and number of calls per phase of one request.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.active = set()
+
+    def add(self, name: str, seconds: float):
+        phase = self.phases.setdefault(name, [0.0, 0])
+        phase[0] += seconds
+        phase[1] += 1
+
+    def header(self, total: float) -> str:
+        """Formats the phases and the total time as a ``Server-Timing`` value."""
+        metrics = [
+            f'{name};dur={seconds * 1000:.2f};desc="{PHASE_DESCRIPTIONS.get(name, name)}'
+            f' ({count})"'
+            for name, (seconds, count) in self.phases.items()
+        ]
+        metrics.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(metrics)
+
+    def fields(self) -> dict:
+        """Returns ``<phase>_ms`` and ``<phase>_count`` log fields."""
+        fields = {}
+        for name, (seconds, count) in self.phases.items():
+            fields[f"{name}_ms"] = round(seconds * 1000, 3)
+            fields[f"{name}_count"] = count
+        return fields
+
+
+timings_var: ContextVar[RequestTimings | None] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def record_timing(name: str):
+    """
+    Adds the time spent in the block to the phase ``name`` of the current
+    request. Outside of a request this does nothing.
+    """
+    timings = timings_var.get()
+    if timings is None or name in timings.active:
+        yield
+        return
+
+    timings.active.add(name)
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started_at)
+        timings.active.discard(name)
+
+
+def timed(name: str):
+    """Decorator recording every call of the function in the phase ``name``."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with record_timing(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    A ``connection.execute_wrapper`` recording queries in the ``db`` phase.
+    It is installed on every connection (see ``apps.core.signals``).
+    """
+    with record_timing("db"):
+        return execute(sql, params, many, context)
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin recording validation and representation in the
+    ``serialize`` phase.
+    """
+
+    def is_valid(self, *, raise_exception=False):
+        with record_timing("serialize"):
+            return super().is_valid(raise_exception=raise_exception)
+
+    def to_representation(self, instance):
+        with record_timing("serialize"):
+            return super().to_representation(instance)
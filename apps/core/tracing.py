@@ -0,0 +1,114 @@
+"""
+Dynamic trace sampling for Sentry. ``TracesSampler`` picks the sample rate
+of every transaction from its route (or Celery task), raises it for routes
+that were recently slow, and keeps the expected number of traces of the
+process under a per-second budget.
+"""
+
+import functools
+import threading
+import time
+
+from django.urls import Resolver404, resolve
+
+
+class SlowRoutes:
+    """
+    The routes and tasks of this process that recently took longer than
+    their threshold, flagged by ``RequestIDMiddleware`` and the Celery task
+    signals.
+    """
+
+    def __init__(self):
+        self.flagged_at = {}
+
+    def flag(self, route: str):
+        self.flagged_at[route] = time.monotonic()
+
+    def is_slow(self, route: str, window: float) -> bool:
+        flagged_at = self.flagged_at.get(route)
+        return flagged_at is not None and time.monotonic() - flagged_at < window
+
+
+slow_routes = SlowRoutes()
+
+
+@functools.lru_cache(maxsize=1024)
+def resolve_route(path: str) -> str:
+    """The URL pattern matching ``path``, like ``get_route`` does for requests."""
+    try:
+        return resolve(path).route
+    except Resolver404:
+        return "<unmatched>"
+
+
+def get_sampling_route(sampling_context: dict) -> str | None:
+    """The route or Celery task name of the transaction being sampled."""
+    if "wsgi_environ" in sampling_context:
+        return resolve_route(sampling_context["wsgi_environ"].get("PATH_INFO", "/"))
+    if "asgi_scope" in sampling_context:
+        return resolve_route(sampling_context["asgi_scope"].get("path", "/"))
+    if "celery_job" in sampling_context:
+        return sampling_context["celery_job"].get("task")
+    return None
+
+
+class TracesSampler:
+    """
+    A Sentry ``traces_sampler``.
+
+    The rate of a transaction is ``rates[route]`` (a URL pattern like
+    ``api/v1/auth/login/`` or a Celery task name), or ``default_rate``. It
+    is raised to ``slow_rate`` while the route is flagged as slow, for
+    ``slow_window`` seconds after a slow request. Transactions continuing a
+    sampled trace from another service keep the parent's decision.
+
+    Every transaction given a rate uses up that many tokens of a bucket
+    refilled with ``per_second`` tokens a second, so the process sends at
+    most about ``per_second`` traces a second. When the bucket is empty,
+    transactions are not sampled. The rates returned are the real sampling
+    probabilities, so Sentry's extrapolated counts stay correct.
+    """
+
+    def __init__(
+        self,
+        rates: dict | None = None,
+        default_rate: float = 0.1,
+        slow_rate: float = 1.0,
+        slow_window: float = 60.0,
+        per_second: float = 10.0,
+    ):
+        self.rates = rates or {}
+        self.default_rate = default_rate
+        self.slow_rate = slow_rate
+        self.slow_window = slow_window
+        self.per_second = per_second
+        # Room for at least one trace, even with a budget under one a second
+        self.capacity = max(per_second, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def __call__(self, sampling_context: dict) -> float:
+        if sampling_context.get("parent_sampled") is not None:
+            return float(sampling_context["parent_sampled"])
+
+        route = get_sampling_route(sampling_context)
+        rate = self.rates.get(route, self.default_rate)
+        if route is not None and slow_routes.is_slow(route, self.slow_window):
+            rate = max(rate, self.slow_rate)
+        if rate <= 0 or not self.take(rate):
+            return 0.0
+        return rate
+
+    def take(self, tokens: float) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.per_second
+            )
+            self.updated_at = now
+            if self.tokens < tokens:
+                return False
+            self.tokens -= tokens
+            return True
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
@@ -5,7 +6,11 @@ from . import views
 app_name = "core"
 
 urlpatterns = [
-    path("ping/", views.ping, name="ping"),
+    path("ping/", views.aping if settings.ASYNC_VIEWS else views.ping, name="ping"),
     # TODO 🚫 Remove the route bellow, the view, and the task.
-    path("fire-task/", views.fire_task, name="fire_task"),
+    path(
+        "fire-task/",
+        views.afire_task if settings.ASYNC_VIEWS else views.fire_task,
+        name="fire_task",
+    ),
 ]
@@ -1,12 +1,24 @@
-from django.http import JsonResponse
+import ipaddress
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_GET
 from drf_spectacular.utils import extend_schema
 from rest_framework.decorators import api_view, throttle_classes
-from rest_framework.throttling import AnonRateThrottle
+from rest_framework.exceptions import Throttled
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 
+from .health import readiness
+from .metrics import generate_latest
+from .middleware import is_internal_ip
 from .tasks import test_task
+from .throttles import RedisAnonRateThrottle
 
 
-class PingRateThrottle(AnonRateThrottle):
+class PingRateThrottle(RedisAnonRateThrottle):
     rate = "10/minute"
 
 
@@ -31,6 +43,67 @@ def ping(request):
     return JsonResponse({"ping": "pong"})
 
 
+def stands_in_for(drf_view):
+    """
+    Marks an async view as standing in for a DRF view under ASGI. Like the
+    DRF view, it is exempt from ``CsrfViewMiddleware`` (DRF checks CSRF for
+    session authentication itself), and drf-spectacular documents it with
+    the DRF view's schema.
+    """
+
+    def decorator(view):
+        view.csrf_exempt = drf_view.csrf_exempt
+        view.cls = drf_view.cls
+        view.initkwargs = drf_view.initkwargs
+        return view
+
+    return decorator
+
+
+def add_api_headers(view, response):
+    """Adds the headers ``APIView.finalize_response`` adds for ``view``."""
+    headers = view.default_response_headers
+    vary = headers.pop("Vary", None)
+    if vary is not None:
+        patch_vary_headers(response, (vary,))
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def throttled_response(wait: float | None) -> HttpResponse:
+    """The response DRF gives to a request rejected by a throttle."""
+    exc = Throttled(wait)
+    response = HttpResponse(
+        JSONRenderer().render({"detail": exc.detail}),
+        status=exc.status_code,
+        content_type="application/json",
+    )
+    if exc.wait:
+        response["Retry-After"] = "%d" % exc.wait
+    return response
+
+
+@stands_in_for(ping)
+async def aping(request):
+    """
+    ``ping`` for ASGI: a GET is answered and throttled without leaving the
+    event loop. Other methods are handled by ``ping`` in a thread. Callers
+    are always throttled by IP address, as their token is not checked.
+    """
+    if request.method != "GET":
+        return await sync_to_async(ping)(request)
+
+    view = ping.cls(**ping.initkwargs)
+    view.setup(Request(request))
+    throttle = PingRateThrottle()
+    if await throttle.aallow_request(view.request, view):
+        response = JsonResponse({"ping": "pong"})
+    else:
+        response = throttled_response(throttle.wait())
+    return add_api_headers(view, response)
+
+
 def fire_task(request):
     """
     TODO 🚫 After testing the view, remove it with the task and the route.
@@ -44,3 +117,81 @@ def fire_task(request):
         return JsonResponse({"task": "Task fired"})
 
     return JsonResponse({"error": "Method Not Allowed"}, status=405)
+
+
+async def afire_task(request):
+    """
+    ``fire_task`` for ASGI. Publishing the task blocks on the broker, so it
+    runs in a worker thread while the event loop serves other requests.
+    """
+    if request.method == "GET":
+        await sync_to_async(test_task.delay, thread_sensitive=False)()
+        return JsonResponse({"task": "Task fired"})
+
+    return JsonResponse({"error": "Method Not Allowed"}, status=405)
+
+
+@require_GET
+def live(request):
+    """
+    Liveness: the process is serving requests. Nothing else is checked, so
+    a failing dependency does not get every server restarted.
+    """
+    return JsonResponse({"status": "ok"})
+
+
+@require_GET
+async def alive(request):
+    """``live`` for ASGI."""
+    return JsonResponse({"status": "ok"})
+
+
+def readiness_response(result: dict) -> JsonResponse:
+    return JsonResponse(result, status=200 if result["status"] == "ok" else 503)
+
+
+@require_GET
+def ready(request):
+    """
+    Readiness: the database, the cache and the broker answer, with the
+    latency of each. Unavailable dependencies give a 503, so the load
+    balancer stops sending traffic until they are back. The result is
+    shared by every request to the process for ``HEALTH_CHECK_CACHE_SECONDS``.
+    """
+    return readiness_response(readiness.check())
+
+
+@require_GET
+async def aready(request):
+    """
+    ``ready`` for ASGI. A fresh result is served without leaving the event
+    loop; otherwise the probes are awaited in a worker thread.
+    """
+    result = readiness.cached()
+    if result is None:
+        result = await sync_to_async(readiness.check, thread_sensitive=False)()
+    return readiness_response(result)
+
+
+@require_GET
+def metrics(request):
+    """
+    Serves the metrics of every server and Celery worker process in the
+    Prometheus text format.
+
+    Only scrapers connecting directly from ``METRICS_INTERNAL_IPS`` are
+    served. Requests that came through a proxy (with ``X-Forwarded-For``)
+    and other clients get a 404, so the endpoint cannot be found from the
+    outside.
+    """
+    networks = [
+        ipaddress.ip_network(network, strict=False)
+        for network in getattr(settings, "METRICS_INTERNAL_IPS", [])
+    ]
+    if "HTTP_X_FORWARDED_FOR" in request.META or not is_internal_ip(
+        request.META.get("REMOTE_ADDR", ""), networks
+    ):
+        raise Http404()
+    return HttpResponse(
+        generate_latest(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
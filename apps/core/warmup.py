@@ -0,0 +1,128 @@
+"""
+Warms up a process before it serves requests. With ``preload_app``, the
+gunicorn master runs ``warm_up`` once before forking, so the workers share
+the imported modules, compiled URL patterns and loaded validators instead
+of building them on their first request.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth import hashers, password_validation
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from django.urls import Resolver404, URLResolver, get_resolver, resolve
+from redis.exceptions import RedisError
+from rest_framework.views import APIView
+
+from .throttles import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def iter_url_patterns(patterns, prefix: str = ""):
+    """Every ``(route, URLPattern)`` of the URLconf, with its full route."""
+    for pattern in patterns:
+        # Compiles the pattern's regular expression
+        pattern.pattern.regex  # noqa: B018
+        if isinstance(pattern, URLResolver):
+            yield from iter_url_patterns(
+                pattern.url_patterns, prefix + str(pattern.pattern)
+            )
+        else:
+            yield prefix + str(pattern.pattern), pattern
+
+
+def warm_up_urls() -> list[type[APIView]]:
+    """
+    Builds the URL resolver, compiles every pattern and resolves the routes
+    without parameters. Returns the DRF views found in the URLconf.
+    """
+    resolver = get_resolver()
+    resolver.reverse_dict  # noqa: B018
+    views = []
+    for route, pattern in iter_url_patterns(resolver.url_patterns):
+        if "<" not in route and not route.startswith("^"):
+            try:
+                resolve("/" + route)
+            except Resolver404:
+                pass
+        view_class = getattr(pattern.callback, "cls", None)
+        if isinstance(view_class, type) and issubclass(view_class, APIView):
+            if view_class not in views:
+                views.append(view_class)
+    return views
+
+
+def warm_up_views(views: list[type[APIView]]) -> int:
+    """
+    Loads the renderers, parsers, authentication, permission and throttle
+    classes of every view, and builds the fields of their serializers.
+    Returns the number of serializers built.
+    """
+    serializers = 0
+    for view_class in views:
+        view = view_class()
+        view.get_renderers()
+        view.get_parsers()
+        view.get_authenticators()
+        view.get_permissions()
+        view.get_throttles()
+        serializer_class = getattr(view_class, "serializer_class", None)
+        if serializer_class is not None:
+            serializer_class().fields  # noqa: B018
+            serializers += 1
+    return serializers
+
+
+def warm_up_connections() -> list[str]:
+    """
+    Opens a connection to every database and Redis cache, so drivers are
+    loaded and DNS is resolved, then closes them: connections must not be
+    shared with forked workers. Returns the names of those that failed.
+    """
+    failed = []
+    for alias in connections:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            logger.warning("Could not connect to database %r while warming up", alias)
+            failed.append(alias)
+    connections.close_all()
+
+    for alias in settings.CACHES:
+        client = get_redis_client(caches[alias])
+        if client is None:
+            continue
+        try:
+            client.ping()
+        except RedisError:
+            logger.warning("Could not connect to cache %r while warming up", alias)
+            failed.append(alias)
+        client.connection_pool.disconnect()
+    return failed
+
+
+def warm_up() -> dict:
+    """Runs every warm-up step and logs what was done."""
+    started_at = time.perf_counter()
+    views = warm_up_urls()
+    serializers = warm_up_views(views)
+    password_validation.get_default_password_validators()
+    hashers.get_hasher()
+    failed = warm_up_connections()
+    summary = {
+        "views": len(views),
+        "serializers": serializers,
+        "failed_connections": failed,
+        "seconds": time.perf_counter() - started_at,
+    }
+    logger.info(
+        "Warmed up %d views and %d serializers in %.2fs",
+        summary["views"],
+        summary["serializers"],
+        summary["seconds"],
+        extra=summary,
+    )
+    return summary
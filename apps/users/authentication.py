@@ -0,0 +1,179 @@
+import binascii
+import logging
+import time
+from collections.abc import Iterable
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
+from knox.models import get_token_model
+from knox.settings import CONSTANTS, knox_settings
+from rest_framework import exceptions
+from rest_framework.authentication import get_authorization_header
+
+from apps.core.cache import aget
+from apps.core.timing import record_timing
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_KEY_PREFIX = "knox_auth"
+
+# Raised by decoding and hashing a malformed token
+INVALID_TOKEN_ERRORS = (UnicodeError, TypeError, binascii.Error)
+
+
+def get_token_cache_key(digest: str) -> str:
+    return f"{TOKEN_CACHE_KEY_PREFIX}:{digest}"
+
+
+def invalidate_cached_tokens(digests: Iterable[str]) -> None:
+    """
+    Removes the cached authentication entries for the given token digests.
+    """
+    keys = [get_token_cache_key(digest) for digest in digests]
+    if keys:
+        cache.delete_many(keys)
+
+
+def invalidate_cached_user_tokens(user) -> None:
+    """
+    Removes the cached authentication entries for every token owned by a user.
+    """
+    digests = get_token_model().objects.filter(user=user).values_list("digest", flat=True)
+    invalidate_cached_tokens(digests)
+
+
+def evict_oldest_tokens(user, keep: int) -> int:
+    """
+    Deletes all but the ``keep`` most recent tokens of a user, or all of them
+    when ``keep`` is not positive, and drops their cached entries. The
+    digests are selected first, so their cache entries can be removed, then
+    deleted in one statement. Returns the number of evicted tokens.
+    """
+    started_at = time.perf_counter()
+    digests = list(
+        get_token_model()
+        .objects.filter(user=user)
+        .order_by("-created")
+        .values_list("digest", flat=True)[max(keep, 0) :]
+    )
+    if not digests:
+        return 0
+
+    evicted = get_token_model().objects.filter(pk__in=digests).delete()[0]
+    invalidate_cached_tokens(digests)
+    logger.info(
+        "Evicted %d tokens for user %s in %.3fs",
+        evicted,
+        user.pk,
+        time.perf_counter() - started_at,
+    )
+    return evicted
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Knox token authentication with a cache in front of the token lookup.
+
+    Verified tokens are stored in the default cache as
+    ``digest -> (user id, expiry)`` so subsequent requests skip the token
+    query, the cleanup of the user's other tokens and the digest comparison.
+    The user row is still fetched on every request, so ``is_active`` is always
+    checked against the database.
+
+    Entries live for at most ``AUTH_TOKEN_CACHE_TIMEOUT`` seconds and never
+    beyond the token expiry. They are removed explicitly on logout, logout-all
+    and user deactivation. Tokens deleted any other way (e.g. from the admin)
+    stay valid until their cache entry times out.
+
+    The cache is bypassed when knox ``AUTO_REFRESH`` is enabled, because the
+    expiry has to be renewed in the database on every request.
+    """
+
+    def authenticate(self, request):
+        with record_timing("auth"):
+            return super().authenticate(request)
+
+    def authenticate_credentials(self, token: bytes):
+        timeout = getattr(settings, "AUTH_TOKEN_CACHE_TIMEOUT", 300)
+        if knox_settings.AUTO_REFRESH or timeout <= 0:
+            return super().authenticate_credentials(token)
+
+        token_string = token.decode("utf-8")
+        try:
+            digest = hash_token(token_string)
+        except (TypeError, binascii.Error) as e:
+            raise exceptions.AuthenticationFailed(_("Invalid token.")) from e
+
+        cache_key = get_token_cache_key(digest)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            user_id, expiry = cached
+            if expiry is None or expiry > timezone.now():
+                user = get_user_model()._default_manager.filter(pk=user_id).first()
+                if user is not None:
+                    return self.validate_user(
+                        self.make_cached_token(token_string, digest, user, expiry)
+                    )
+            cache.delete(cache_key)
+
+        user, auth_token = super().authenticate_credentials(token)
+
+        if auth_token.expiry is not None:
+            remaining = (auth_token.expiry - timezone.now()).total_seconds()
+            timeout = min(timeout, int(remaining))
+        if timeout > 0:
+            cache.set(cache_key, (user.pk, auth_token.expiry), timeout)
+
+        return user, auth_token
+
+    async def aauthenticate_cached(self, request):
+        """
+        The cached path of ``authenticate`` for async views, reading the
+        cache on the event loop and the user with the async ORM.
+
+        Returns ``None`` whenever the sync ``authenticate`` has to decide:
+        no token, a token that is not cached, an expired token or an
+        inactive user.
+        """
+        timeout = getattr(settings, "AUTH_TOKEN_CACHE_TIMEOUT", 300)
+        if knox_settings.AUTO_REFRESH or timeout <= 0:
+            return None
+
+        auth = get_authorization_header(request).split()
+        prefix = self.authenticate_header(request).encode()
+        if len(auth) != 2 or auth[0].lower() != prefix.lower():
+            return None
+
+        with record_timing("auth"):
+            try:
+                token_string = auth[1].decode("utf-8")
+                digest = hash_token(token_string)
+            except INVALID_TOKEN_ERRORS:
+                return None
+
+            cached = await aget(cache, get_token_cache_key(digest))
+            if cached is None:
+                return None
+            user_id, expiry = cached
+            if expiry is not None and expiry <= timezone.now():
+                return None
+            user = await get_user_model()._default_manager.filter(pk=user_id).afirst()
+            if user is None or not user.is_active:
+                return None
+            return user, self.make_cached_token(token_string, digest, user, expiry)
+
+    def make_cached_token(self, token_string: str, digest: str, user, expiry):
+        """An unsaved AuthToken standing for a token found in the cache."""
+        auth_token = get_token_model()(
+            digest=digest,
+            token_key=token_string[: CONSTANTS.TOKEN_KEY_LENGTH],
+            user=user,
+            expiry=expiry,
+        )
+        auth_token._state.adding = False
+        return auth_token
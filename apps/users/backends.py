@@ -0,0 +1,95 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+from django.core.exceptions import PermissionDenied
+
+from .login_pool import LoginPoolSaturated, get_login_pool
+
+logger = logging.getLogger(__name__)
+UserModel = get_user_model()
+
+# Set on a request to have a saturated pool raise ``LoginPoolSaturated``
+RAISE_POOL_SATURATED = "raise_login_pool_saturated"
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend that runs the password hash on the bounded login pool.
+
+    Only the hashing is offloaded; the user lookup and any hash upgrade are
+    saved from the calling thread so database connections and transactions
+    behave exactly as with the default backend.
+
+    When the pool is full, the login is refused with ``PermissionDenied``,
+    which ``authenticate()`` reports as failed credentials, so the admin and
+    the session and basic authentication classes keep working. Callers that
+    answer with a 503 instead set ``RAISE_POOL_SATURATED`` on the request to
+    get ``LoginPoolSaturated``.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        try:
+            return self._authenticate(request, username, password, **kwargs)
+        except LoginPoolSaturated as e:
+            if getattr(request, RAISE_POOL_SATURATED, False):
+                raise
+            logger.warning("Login hashing pool saturated, rejecting login")
+            raise PermissionDenied() from e
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        try:
+            return await self._aauthenticate(request, username, password, **kwargs)
+        except LoginPoolSaturated as e:
+            if getattr(request, RAISE_POOL_SATURATED, False):
+                raise
+            logger.warning("Login hashing pool saturated, rejecting login")
+            raise PermissionDenied() from e
+
+    def _authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        pool = get_login_pool()
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user.
+            pool.run(make_password, password)
+            return None
+
+        is_correct, must_update = pool.run(verify_password, password, user.password)
+        if is_correct and must_update:
+            # Password hash upgrades shouldn't be considered password changes.
+            user.password = pool.run(make_password, password)
+            user.save(update_fields=["password"])
+        if is_correct and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def _aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        pool = get_login_pool()
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            await pool.arun(make_password, password)
+            return None
+
+        is_correct, must_update = await pool.arun(
+            verify_password, password, user.password
+        )
+        if is_correct and must_update:
+            user.password = await pool.arun(make_password, password)
+            await user.asave(update_fields=["password"])
+        if is_correct and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,325 @@
+import codecs
+import json
+import logging
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext as _
+from rest_framework.utils.field_mapping import get_unique_error_message
+
+from .models import CustomUser
+from .serializers import BulkCreateUserSerializer
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+NUMBER_CHARS = "-+.eE0123456789"
+LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+
+
+class MalformedPayload(ValueError):
+    """
+    Raised when a JSON array payload cannot be parsed any further.
+    """
+
+
+class MalformedRow(ValueError):
+    """
+    Yielded in place of an NDJSON line that is not valid JSON, so the
+    remaining lines can still be processed.
+    """
+
+
+def get_max_item_size() -> int:
+    return getattr(settings, "USER_BULK_CREATE_MAX_ITEM_BYTES", 64 * 1024)
+
+
+def iter_ndjson(stream, max_item_size: int | None = None) -> Iterator:
+    """
+    Yields one decoded value per non-blank line of an NDJSON stream.
+    """
+    max_item_size = max_item_size or get_max_item_size()
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        if len(line) > max_item_size:
+            yield MalformedRow(_("Item exceeds %d bytes.") % max_item_size)
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield MalformedRow(_("Invalid JSON: %s") % e)
+
+
+def is_truncated(error: json.JSONDecodeError) -> bool:
+    """
+    Returns True if decoding failed only because the value runs past the end
+    of the buffer, so reading more of the stream could complete it.
+    """
+    rest = error.doc[error.pos :]
+    if not rest or error.msg.startswith("Unterminated string"):
+        return True
+    if error.msg.startswith("Invalid \\uXXXX escape"):
+        # A surrogate pair is only decoded once both escapes are read
+        return len(rest) < len("u0000\\u0000")
+    return not rest.strip(NUMBER_CHARS) or any(
+        literal.startswith(rest) for literal in LITERALS
+    )
+
+
+def iter_json_array(
+    stream, chunk_size: int = READ_CHUNK_SIZE, max_item_size: int | None = None
+) -> Iterator:
+    """
+    Yields the items of a top-level JSON array, reading ``chunk_size`` bytes
+    at a time so only the item being decoded is held in memory.
+
+    An item is only decoded again after a read when it was cut by the end of
+    the buffer, and items longer than ``max_item_size`` decoded characters
+    (``USER_BULK_CREATE_MAX_ITEM_BYTES`` by default) are rejected, so a
+    malformed or oversized item cannot make the parser buffer the rest of the
+    stream.
+    """
+    max_item_size = max_item_size or get_max_item_size()
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer, position, eof = "", 0, False
+    expect = "["
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + text.decode(chunk or b"", final=eof)
+        position = 0
+
+    def fill_item():
+        if len(buffer) - position > max_item_size:
+            raise MalformedPayload(_("Item exceeds %d bytes.") % max_item_size)
+        fill()
+
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+        if position == len(buffer):
+            if eof:
+                raise MalformedPayload(_("Unexpected end of JSON array."))
+            fill()
+            continue
+
+        char = buffer[position]
+        if expect == "[":
+            if char != "[":
+                raise MalformedPayload(_("Expected a JSON array."))
+            position += 1
+            expect = "item"
+        elif char == "]" and expect in ("item", ","):
+            return
+        elif expect == ",":
+            if char != ",":
+                raise MalformedPayload(_("Expected ',' or ']' in JSON array."))
+            position += 1
+            expect = "next"
+        else:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if eof or not is_truncated(e):
+                    raise MalformedPayload(_("Invalid JSON: %s") % e) from e
+                fill_item()
+                continue
+            # A number cut by the end of a read looks complete; only trust a
+            # value once something other than a digit has been read after it
+            if not eof and not buffer[end:].strip(NUMBER_CHARS):
+                fill_item()
+                continue
+            position = end
+            expect = ","
+            yield value
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool() -> ProcessPoolExecutor | None:
+    """
+    Returns the process-wide pool used to hash bulk passwords, or ``None``
+    when ``USER_BULK_CREATE_HASH_WORKERS`` is 0 and hashing runs inline.
+
+    Workers are spawned rather than forked so they do not inherit the
+    request threads, and only need the settings module to hash.
+    """
+    global _pool
+    workers = getattr(settings, "USER_BULK_CREATE_HASH_WORKERS", 2)
+    if workers <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(workers, mp_context=get_context("spawn"))
+    return _pool
+
+
+def discard_hashing_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Drops a broken pool so the next bulk request starts a new one.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    pool = get_hashing_pool() if passwords else None
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    workers = getattr(settings, "USER_BULK_CREATE_HASH_WORKERS", 2)
+    chunksize = max(len(passwords) // (workers * 4), 1)
+    try:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        # A worker died, e.g. killed for memory; finish this batch inline
+        logger.warning("Password hashing pool is broken, hashing inline")
+        discard_hashing_pool(pool)
+        return [make_password(password) for password in passwords]
+
+
+class BulkUserCreator:
+    """
+    Validates and inserts users in batches, yielding one result per row.
+
+    Rows are validated with ``BulkCreateUserSerializer``, email uniqueness is
+    checked with one query per batch, passwords are hashed on the hashing
+    pool and each batch is saved with a single ``bulk_create``. Only one batch
+    is held in memory at a time.
+
+    Attributes:
+        batch_size (int): The number of rows validated and inserted together.
+    """
+
+    def __init__(self, batch_size: int | None = None):
+        self.batch_size = batch_size or getattr(
+            settings, "USER_BULK_CREATE_BATCH_SIZE", 500
+        )
+        self.created = 0
+        self.failed = 0
+
+    def run(self, rows: Iterable) -> Iterator[dict]:
+        started_at = time.perf_counter()
+        batch = []
+        index = 0
+        try:
+            for row in rows:
+                batch.append((index, row))
+                index += 1
+                if len(batch) >= self.batch_size:
+                    yield from self.create_batch(batch)
+                    batch = []
+        except MalformedPayload as e:
+            # Nothing after this point can be parsed; report it as the next row
+            yield from self.create_batch(batch)
+            batch = []
+            self.failed += 1
+            yield self.error(index, [str(e)])
+        yield from self.create_batch(batch)
+
+        logger.info(
+            "Bulk created %d users, %d rows failed in %.3fs",
+            self.created,
+            self.failed,
+            time.perf_counter() - started_at,
+        )
+
+    def create_batch(self, batch: list) -> Iterator[dict]:
+        if not batch:
+            return
+
+        results = {}
+        passwords = {}
+        emails = {}
+        seen = set()
+        for index, row in batch:
+            if isinstance(row, MalformedRow):
+                results[index] = self.error(index, [str(row)])
+                continue
+            serializer = BulkCreateUserSerializer(data=row)
+            if not serializer.is_valid():
+                results[index] = self.error(index, serializer.errors)
+                continue
+            email = CustomUser.objects.normalize_email(serializer.validated_data["email"])
+            if email in seen:
+                results[index] = self.duplicate(index)
+                continue
+            seen.add(email)
+            emails[index] = email
+            passwords[index] = serializer.validated_data["password"]
+
+        existing = set(
+            CustomUser.objects.filter(email__in=emails.values()).values_list(
+                "email", flat=True
+            )
+        )
+        for index, email in list(emails.items()):
+            if email in existing:
+                results[index] = self.duplicate(index)
+                del emails[index]
+
+        hashed = hash_passwords([passwords[index] for index in emails])
+        users = {
+            index: CustomUser(email=email, password=password)
+            for (index, email), password in zip(emails.items(), hashed, strict=True)
+        }
+        if users:
+            results.update(self.insert(users))
+
+        for index, _row in batch:
+            if results[index]["status"] == "created":
+                self.created += 1
+            else:
+                self.failed += 1
+            yield results[index]
+
+    def insert(self, users: dict) -> dict:
+        try:
+            with transaction.atomic():
+                CustomUser.objects.bulk_create(users.values())
+        except IntegrityError:
+            # Another request created one of the emails since the batch was
+            # checked; fall back to one savepoint per row to find it.
+            return self.insert_one_by_one(users)
+        return {index: self.success(index, user) for index, user in users.items()}
+
+    def insert_one_by_one(self, users: dict) -> dict:
+        results = {}
+        for index, user in users.items():
+            try:
+                with transaction.atomic():
+                    user.save(force_insert=True)
+            except IntegrityError:
+                results[index] = self.duplicate(index)
+            else:
+                results[index] = self.success(index, user)
+        return results
+
+    def success(self, index: int, user: CustomUser) -> dict:
+        return {"index": index, "status": "created", "email": user.email}
+
+    def error(self, index: int, errors) -> dict:
+        if isinstance(errors, list):
+            errors = {"non_field_errors": errors}
+        return {"index": index, "status": "error", "errors": errors}
+
+    def duplicate(self, index: int) -> dict:
+        message = get_unique_error_message(CustomUser._meta.get_field("email"))
+        return self.error(index, {"email": [message]})
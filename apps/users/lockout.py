@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import Throttled
+from rest_framework.settings import api_settings
+
+from apps.core.middleware import get_trusted_client_ip
+
+logger = logging.getLogger(__name__)
+
+FAILURES_KEY = "login_failures:%(kind)s:%(ident)s"
+LOCKOUT_KEY = "login_lockout:%(kind)s:%(ident)s"
+
+_warned_untrusted_proxy = False
+
+
+class LockedOut(Throttled):
+    default_detail = _("Too many failed login attempts.")
+
+
+class LoginLockout:
+    """
+    Tracks failed logins per email and per client IP and rejects locked out
+    callers before any password hashing happens.
+
+    Once a key reaches its failure threshold it is locked for
+    ``LOGIN_LOCKOUT_BASE_SECONDS``, doubling with every further failure up to
+    ``LOGIN_LOCKOUT_MAX_SECONDS``. Checking a request is a single cache
+    round-trip, so rejecting a credential-stuffing burst costs almost nothing.
+
+    A request with ``X-Forwarded-For`` while ``NUM_PROXIES`` is unset most
+    likely came through a proxy whose address every client shares, so it is
+    only tracked by email rather than locking everyone out together.
+
+    Args:
+        email (str): The email the caller is trying to log in with.
+        request (HttpRequest): The login request, used for the client IP.
+    """
+
+    def __init__(self, email: str, request=None):
+        normalized = email.strip().lower().encode()
+        self.idents = {"email": hashlib.sha256(normalized).hexdigest()}
+        if request is None or untrusted_proxy(request):
+            return
+        client_ip = get_trusted_client_ip(request)
+        if client_ip:
+            self.idents["ip"] = client_ip
+
+    def check(self) -> None:
+        """
+        Raises LockedOut if the email or the client IP is locked out.
+        """
+        locks = cache.get_many(
+            [LOCKOUT_KEY % {"kind": k, "ident": i} for k, i in self.idents.items()]
+        )
+        if locks:
+            wait = max(locks.values()) - time.time()
+            raise LockedOut(wait=max(math.ceil(wait), 1))
+
+    def record_failure(self) -> None:
+        window = getattr(settings, "LOGIN_LOCKOUT_MAX_SECONDS", 3600)
+        for kind, ident in self.idents.items():
+            key = FAILURES_KEY % {"kind": kind, "ident": ident}
+            cache.add(key, 0, window)
+            try:
+                failures = cache.incr(key)
+            except ValueError:
+                # The counter expired between add() and incr()
+                cache.set(key, 1, window)
+                failures = 1
+
+            threshold = self.get_threshold(kind)
+            if failures >= threshold:
+                self.lock(kind, ident, failures - threshold)
+
+    def reset(self) -> None:
+        """
+        Clears the email failures after a successful login. The IP counter is
+        kept so one valid account cannot unlock a stuffing source.
+        """
+        ident = {"kind": "email", "ident": self.idents["email"]}
+        cache.delete_many([FAILURES_KEY % ident, LOCKOUT_KEY % ident])
+
+    def lock(self, kind: str, ident: str, excess: int) -> None:
+        base = getattr(settings, "LOGIN_LOCKOUT_BASE_SECONDS", 30)
+        maximum = getattr(settings, "LOGIN_LOCKOUT_MAX_SECONDS", 3600)
+        backoff = min(base * 2 ** min(excess, 32), maximum)
+        key = LOCKOUT_KEY % {"kind": kind, "ident": ident}
+        cache.set(key, time.time() + backoff, backoff)
+        logger.warning("Login locked out by %s for %d seconds", kind, backoff)
+
+    def get_threshold(self, kind: str) -> int:
+        if kind == "ip":
+            return getattr(settings, "LOGIN_LOCKOUT_IP_THRESHOLD", 20)
+        return getattr(settings, "LOGIN_LOCKOUT_EMAIL_THRESHOLD", 5)
+
+
+def untrusted_proxy(request) -> bool:
+    """
+    Returns True if the request was forwarded by a proxy that ``NUM_PROXIES``
+    does not declare, warning about the missing setting once per process.
+    """
+    global _warned_untrusted_proxy
+    if api_settings.NUM_PROXIES is not None:
+        return False
+    if "HTTP_X_FORWARDED_FOR" not in request.META:
+        return False
+    if not _warned_untrusted_proxy:
+        _warned_untrusted_proxy = True
+        logger.warning(
+            "Login request has X-Forwarded-For but NUM_PROXIES is unset; "
+            "the IP lockout is disabled for proxied requests"
+        )
+    return True
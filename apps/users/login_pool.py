@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from apps.core.metrics import LOGIN_POOL_HASH_TIME, LOGIN_POOL_QUEUE_TIME
+from apps.core.timing import record_timing
+
+logger = logging.getLogger(__name__)
+
+
+class LoginPoolSaturated(Exception):
+    """
+    Raised when the password hashing pool has no free worker or queue slot.
+    """
+
+
+class LoginUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Too many login attempts in progress. Please try again later.")
+    default_code = "login_unavailable"
+
+
+class LoginHashingPool:
+    """
+    A bounded thread pool that runs password hashing off the request thread.
+
+    Scrypt, PBKDF2 and the other hashers release the GIL while hashing, so a
+    small number of threads is enough to keep password checks from pinning
+    every request worker during a login burst. At most ``max_workers`` hashes
+    run at once and at most ``max_queue`` more wait for a worker; anything
+    beyond that fails immediately with ``LoginPoolSaturated``.
+
+    Attributes:
+        max_workers (int): The number of hashing threads.
+        max_queue (int): The number of jobs allowed to wait for a free thread.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="login-hashing"
+        )
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {
+            "completed": 0,
+            "rejected": 0,
+            "queue_time_total": 0.0,
+            "queue_time_max": 0.0,
+            "hash_time_total": 0.0,
+            "hash_time_max": 0.0,
+        }
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise LoginPoolSaturated()
+
+        with self._lock:
+            self._pending += 1
+        enqueued_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._record(started_at - enqueued_at, time.perf_counter() - started_at)
+
+        try:
+            return self._executor.submit(job)
+        except BaseException:
+            self._release()
+            raise
+
+    def run(self, fn, *args, **kwargs):
+        """Runs ``fn`` on the pool and blocks until it returns."""
+        with record_timing("hash"):
+            return self.submit(fn, *args, **kwargs).result()
+
+    async def arun(self, fn, *args, **kwargs):
+        """Runs ``fn`` on the pool without blocking the event loop."""
+        with record_timing("hash"):
+            return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the pool counters, in seconds for the timings.
+
+        ``queue_time`` is the time a job waited for a free thread and
+        ``hash_time`` the time spent hashing, which is what the pool size
+        should be tuned against. Both are also recorded as histograms on
+        ``/metrics`` for every process.
+        """
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["pending"] = self._pending
+        snapshot["max_workers"] = self.max_workers
+        snapshot["max_queue"] = self.max_queue
+        return snapshot
+
+    def _record(self, queue_time: float, hash_time: float) -> None:
+        with self._lock:
+            self._stats["completed"] += 1
+            self._stats["queue_time_total"] += queue_time
+            self._stats["queue_time_max"] = max(self._stats["queue_time_max"], queue_time)
+            self._stats["hash_time_total"] += hash_time
+            self._stats["hash_time_max"] = max(self._stats["hash_time_max"], hash_time)
+        self._release()
+        LOGIN_POOL_QUEUE_TIME.observe(queue_time)
+        LOGIN_POOL_HASH_TIME.observe(hash_time)
+        logger.debug("Login hashing queued %.3fs, hashed %.3fs", queue_time, hash_time)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+
+_pool: LoginHashingPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_login_pool() -> LoginHashingPool:
+    """
+    Returns the process-wide hashing pool, creating it on first use so that
+    forked server workers each get their own threads.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = LoginHashingPool(
+                    max_workers=getattr(settings, "LOGIN_POOL_MAX_WORKERS", 2),
+                    max_queue=getattr(settings, "LOGIN_POOL_MAX_QUEUE", 16),
+                )
+    return _pool
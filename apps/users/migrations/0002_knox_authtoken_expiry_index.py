@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    # Builds the index without locking the table against logins. Other
+    # backends are only used for development and keep the full scan.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS knox_authtoken_expiry_idx "
+        "ON knox_authtoken (expiry);"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX CONCURRENTLY IF EXISTS knox_authtoken_expiry_idx;")
+
+
+class Migration(migrations.Migration):
+    """
+    Indexes knox token expiry so the purge task can find expired rows
+    without scanning the whole table.
+    """
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("users", "0001_initial"),
+        ("knox", "0009_extend_authtoken_field"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -3,6 +3,7 @@ from drf_spectacular.utils import OpenApiExample, OpenApiResponse
 from apps.core.schema import UNAUTHORIZED_EXAMPLES, ErrorResponseSerializer
 
 from .serializers import (
+    BulkCreateUserResultSerializer,
     CreateUserSerializer,
     LoginResponseSerializer,
     UserProfileSerializer,
@@ -32,6 +33,34 @@ LOGIN_RESPONSE_SCHEMA = {
             ),
         ],
     ),
+    429: OpenApiResponse(
+        response=ErrorResponseSerializer,
+        description="Too many failed login attempts or login requests",
+        examples=[
+            OpenApiExample(
+                "Locked Out",
+                value={
+                    "detail": "Too many failed login attempts. "
+                    "Expected available in 30 seconds."
+                },
+                status_codes=["429"],
+            ),
+        ],
+    ),
+    503: OpenApiResponse(
+        response=ErrorResponseSerializer,
+        description="Login hashing pool saturated",
+        examples=[
+            OpenApiExample(
+                "Login Unavailable",
+                value={
+                    "detail": "Too many login attempts in progress. "
+                    "Please try again later."
+                },
+                status_codes=["503"],
+            ),
+        ],
+    ),
 }
 
 USER_CREATE_RESPONSE_SCHEMA = {
@@ -69,6 +98,38 @@ USER_CREATE_RESPONSE_SCHEMA = {
     ),
 }
 
+USER_BULK_CREATE_RESPONSE_SCHEMA = {
+    200: OpenApiResponse(
+        response=BulkCreateUserResultSerializer,
+        description="One NDJSON result per row, streamed as rows are processed",
+        examples=[
+            OpenApiExample(
+                "Created",
+                value={"index": 0, "status": "created", "email": "user@example.com"},
+                status_codes=["200"],
+            ),
+            OpenApiExample(
+                "Invalid Row",
+                value={
+                    "index": 1,
+                    "status": "error",
+                    "errors": {"email": ["custom user with this email already exists."]},
+                },
+                status_codes=["200"],
+            ),
+        ],
+    ),
+    401: OpenApiResponse(
+        response=ErrorResponseSerializer,
+        description="Authentication required",
+        examples=UNAUTHORIZED_EXAMPLES,
+    ),
+    415: OpenApiResponse(
+        response=ErrorResponseSerializer,
+        description="The body is neither application/x-ndjson nor application/json",
+    ),
+}
+
 PROFILE_DETAIL_SCHEMA = {
     200: OpenApiResponse(
         response=UserProfileSerializer,
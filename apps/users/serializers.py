@@ -6,7 +6,14 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework.exceptions import Throttled
 
+from apps.core.metrics import LOGIN_ATTEMPTS
+from apps.core.timing import TimedSerializerMixin
+
+from .backends import RAISE_POOL_SATURATED
+from .lockout import LoginLockout
+from .login_pool import LoginPoolSaturated, LoginUnavailable
 from .models import CustomUser
 from .utils import get_errors
 
@@ -14,7 +21,7 @@ logger = logging.getLogger(__name__)
 MIN_PASSWORD_LENGTH = getattr(settings, "MIN_PASSWORD_LENGTH", 8)
 
 
-class AuthTokenSerializer(serializers.Serializer):
+class AuthTokenSerializer(TimedSerializerMixin, serializers.Serializer):
     email = serializers.EmailField(label=_("Email"), write_only=True)
     password = serializers.CharField(
         label=_("Password"),
@@ -30,17 +37,40 @@ class AuthTokenSerializer(serializers.Serializer):
 
         # The authenticate call simply returns None for is_active=False users
         if email and password:
-            user = cast(
-                CustomUser | None,
-                authenticate(
-                    request=self.context.get("request"), email=email, password=password
-                ),
-            )
+            # Reject locked out emails and IPs before paying for the hash
+            request = self.context.get("request")
+            lockout = LoginLockout(email, request)
+            try:
+                lockout.check()
+            except Throttled:
+                LOGIN_ATTEMPTS.labels("locked").inc()
+                raise
+
+            if request is not None:
+                # Answer 503 rather than failed credentials when the pool is full
+                setattr(request, RAISE_POOL_SATURATED, True)
+            try:
+                user = cast(
+                    CustomUser | None,
+                    authenticate(
+                        request=request,
+                        email=email,
+                        password=password,
+                    ),
+                )
+            except LoginPoolSaturated as e:
+                LOGIN_ATTEMPTS.labels("unavailable").inc()
+                logger.warning("Login hashing pool saturated, rejecting login")
+                raise LoginUnavailable() from e
 
             if not user:
+                LOGIN_ATTEMPTS.labels("failure").inc()
+                lockout.record_failure()
                 msg = _("Unable to log in with provided credentials.")
                 logger.warning("Failed login attempt for email: %s", email)
                 raise serializers.ValidationError(msg, code="authorization")
+            lockout.reset()
+            LOGIN_ATTEMPTS.labels("success").inc()
         else:
             msg = _('Must include "email" and "password".')
             raise serializers.ValidationError(msg, code="authorization")
@@ -49,7 +79,7 @@ class AuthTokenSerializer(serializers.Serializer):
         return attrs
 
 
-class CreateUserSerializer(serializers.ModelSerializer):
+class CreateUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=MIN_PASSWORD_LENGTH)
     password2 = serializers.CharField(write_only=True, min_length=MIN_PASSWORD_LENGTH)
 
@@ -83,7 +113,17 @@ class CreateUserSerializer(serializers.ModelSerializer):
         return CustomUser.objects.create_user(**validated_data)
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class BulkCreateUserSerializer(CreateUserSerializer):
+    """
+    CreateUserSerializer without the per-row email uniqueness query; bulk
+    creation checks a whole batch of emails at once.
+    """
+
+    class Meta(CreateUserSerializer.Meta):
+        extra_kwargs = {"email": {"validators": []}}
+
+
+class UserProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ("email", "password", "first_name", "last_name")
@@ -122,3 +162,10 @@ class LoginResponseSerializer(serializers.Serializer):
     expiry = serializers.DateTimeField()
     token = serializers.CharField()
     user = UserProfileSerializer()
+
+
+class BulkCreateUserResultSerializer(serializers.Serializer):
+    index = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=("created", "error"))
+    email = serializers.EmailField(required=False)
+    errors = serializers.DictField(required=False)
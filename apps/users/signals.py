@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_tokens_on_deactivation(sender, instance, created, update_fields, **kwargs):
+    """
+    Drops cached token lookups as soon as a user is deactivated.
+    """
+    if created or instance.is_active:
+        return
+    if update_fields is not None and "is_active" not in update_fields:
+        return
+
+    # Imported here so that processes without requests (workers, commands) do
+    # not load the token authentication and the Redis client at startup
+    from .authentication import invalidate_cached_user_tokens
+
+    invalidate_cached_user_tokens(instance)
@@ -0,0 +1,82 @@
+import logging
+import time
+
+from celery import shared_task
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
+from knox.models import get_token_model
+
+from apps.core.tasks import BaseTaskWithRetry
+
+logger = logging.getLogger(__name__)
+
+DB_SESSION_ENGINES = (
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+)
+
+
+def delete_in_batches(queryset: QuerySet, batch_size: int) -> int:
+    """
+    Deletes the rows matched by ``queryset`` in primary key batches.
+
+    Each batch selects at most ``batch_size`` keys through the filter's index
+    and deletes them in its own short transaction, so no lock is held across
+    the whole purge. Returns the number of deleted rows.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        count, _ = model._default_manager.filter(pk__in=pks).delete()
+        deleted += count
+
+
+def purge_expired_tokens(batch_size: int) -> int:
+    expired = get_token_model().objects.filter(expiry__lt=timezone.now())
+    return delete_in_batches(expired, batch_size)
+
+
+def purge_expired_sessions(batch_size: int) -> int:
+    if settings.SESSION_ENGINE not in DB_SESSION_ENGINES:
+        return 0
+
+    from django.contrib.sessions.models import Session
+
+    expired = Session.objects.filter(expire_date__lt=timezone.now())
+    return delete_in_batches(expired, batch_size)
+
+
+@shared_task(bind=True, base=BaseTaskWithRetry)
+def purge_expired_auth_data(self, batch_size: int | None = None) -> dict:
+    """
+    Deletes expired knox tokens and database sessions in bounded batches.
+
+    Scheduled through ``CELERY_BEAT_SCHEDULE`` and safe to run on demand.
+
+    Parameters:
+        self: The task instance itself.
+        batch_size: Rows deleted per statement, defaults to
+            ``AUTH_PURGE_BATCH_SIZE``.
+
+    Returns:
+        dict: The number of deleted tokens and sessions and the duration in
+        seconds.
+    """
+    batch_size = batch_size or getattr(settings, "AUTH_PURGE_BATCH_SIZE", 1000)
+    started_at = time.perf_counter()
+
+    tokens = purge_expired_tokens(batch_size)
+    sessions = purge_expired_sessions(batch_size)
+
+    duration = time.perf_counter() - started_at
+    logger.info(
+        "Purged %d expired tokens and %d expired sessions in %.3fs",
+        tokens,
+        sessions,
+        duration,
+    )
+    return {"tokens": tokens, "sessions": sessions, "duration": duration}
@@ -0,0 +1,157 @@
+import io
+import json
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import Mock, patch
+
+from django.contrib.auth.hashers import check_password
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.users import bulk
+from apps.users.bulk import MalformedPayload, hash_passwords, iter_json_array, iter_ndjson
+from apps.users.models import CustomUser as User
+
+
+def make_row(email: str, password: str = "Str0ng-Passw0rd!") -> dict:
+    return {"email": email, "password": password, "password2": password}
+
+
+@override_settings(USER_BULK_CREATE_HASH_WORKERS=0, USER_BULK_CREATE_BATCH_SIZE=2)
+class BulkCreateUserViewTests(APITestCase):
+    """Test suite for the bulk user creation endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("v1:users:bulk_create")
+        cls.admin_user = User.objects.create_superuser(
+            email="admin@example.com", password="adminpass123"
+        )
+        cls.user = User.objects.create_user(
+            email="existing@example.com", password="testpass123"
+        )
+
+    def post(self, body: str, content_type: str):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(self.url, body, content_type=content_type)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        content = b"".join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_bulk_create_from_ndjson(self):
+        """Test each NDJSON line gets a result and valid rows are created"""
+        lines = [
+            json.dumps(make_row("one@example.com")),
+            json.dumps(make_row("two@example.com")),
+            "{not json",
+            json.dumps(make_row("existing@example.com")),
+            json.dumps(make_row("one@example.com")),
+            json.dumps(make_row("three@example.com", "password")),
+            json.dumps(make_row("four@EXAMPLE.com")),
+        ]
+        results = self.post("\n".join(lines) + "\n", "application/x-ndjson")
+
+        self.assertEqual([r["index"] for r in results], list(range(7)))
+        self.assertEqual(
+            [r["status"] for r in results],
+            ["created", "created", "error", "error", "error", "error", "created"],
+        )
+        self.assertIn("non_field_errors", results[2]["errors"])
+        self.assertIn("email", results[3]["errors"])
+        self.assertIn("email", results[4]["errors"])
+        self.assertIn("password", results[5]["errors"])
+        self.assertEqual(results[6]["email"], "four@example.com")
+
+        user = User.objects.get(email="one@example.com")
+        self.assertTrue(check_password("Str0ng-Passw0rd!", user.password))
+        self.assertFalse(User.objects.filter(email="three@example.com").exists())
+
+    def test_bulk_create_from_json_array(self):
+        """Test a JSON array is accepted and parsed item by item"""
+        body = json.dumps([make_row(f"user{i}@example.com") for i in range(5)])
+        results = self.post(body, "application/json")
+        self.assertEqual([r["status"] for r in results], ["created"] * 5)
+        self.assertEqual(User.objects.filter(email__startswith="user").count(), 5)
+
+    def test_bulk_create_truncated_json_array(self):
+        """Test rows before a malformed array tail are still created"""
+        body = json.dumps([make_row("first@example.com")])[:-1] + ', {"email"'
+        results = self.post(body, "application/json")
+        self.assertEqual([r["status"] for r in results], ["created", "error"])
+        self.assertIn("non_field_errors", results[1]["errors"])
+        self.assertTrue(User.objects.filter(email="first@example.com").exists())
+
+    @override_settings(USER_BULK_CREATE_HASH_WORKERS=2)
+    def test_bulk_create_hashes_on_process_pool(self):
+        """Test passwords hashed by the worker processes are usable"""
+        body = "\n".join(json.dumps(make_row(f"pool{i}@example.com")) for i in range(3))
+        results = self.post(body, "application/x-ndjson")
+        self.assertEqual([r["status"] for r in results], ["created"] * 3)
+        for user in User.objects.filter(email__startswith="pool"):
+            self.assertTrue(check_password("Str0ng-Passw0rd!", user.password))
+
+    def test_bulk_create_unsupported_media_type(self):
+        """Test payloads that are not NDJSON or JSON are rejected"""
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(self.url, "email", content_type="text/plain")
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_bulk_create_requires_staff(self):
+        """Test regular users cannot bulk create users"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            self.url, json.dumps([]), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_iter_json_array_small_chunks(self):
+        """Test the array parser handles items split across reads"""
+        items = [{"a": "é" * 3, "n": 12345}, [1, 2], "x", 1.5, None]
+        stream = io.BytesIO(json.dumps(items).encode())
+        self.assertEqual(list(iter_json_array(stream, chunk_size=3)), items)
+
+        with self.assertRaises(MalformedPayload):
+            list(iter_json_array(io.BytesIO(b'{"a": 1}'), chunk_size=3))
+
+    def test_iter_json_array_stops_at_malformed_item(self):
+        """Test a malformed item fails without reading the rest of the stream"""
+        valid = ", ".join(
+            json.dumps(make_row(f"user{i}@example.com")) for i in range(500)
+        )
+        body = f'[{{"a": 1}}, {{oops}}, {valid}]'.encode()
+        for bad in (b"{oops}", b"tru3", b"1.5x", b'"\\uZZZZ"'):
+            with self.subTest(bad=bad):
+                stream = io.BytesIO(body.replace(b"{oops}", bad))
+                items = iter_json_array(stream, chunk_size=16)
+                self.assertEqual(next(items), {"a": 1})
+                with self.assertRaises(MalformedPayload):
+                    list(items)
+                self.assertLess(stream.tell(), 64)
+
+    def test_iter_json_array_rejects_oversized_item(self):
+        """Test an item longer than the limit fails once the limit is read"""
+        body = json.dumps([{"a": 1}, {"a": "x" * 1000}, {"a": 2}]).encode()
+        stream = io.BytesIO(body)
+        items = iter_json_array(stream, chunk_size=16, max_item_size=100)
+        self.assertEqual(next(items), {"a": 1})
+        with self.assertRaisesMessage(MalformedPayload, "exceeds 100 bytes"):
+            list(items)
+        self.assertLess(stream.tell(), 200)
+
+        lines = [b'{"a": 1}', json.dumps({"a": "x" * 1000}).encode()]
+        rows = list(iter_ndjson(lines, max_item_size=100))
+        self.assertEqual(rows[0], {"a": 1})
+        self.assertIsInstance(rows[1], bulk.MalformedRow)
+
+    @override_settings(USER_BULK_CREATE_HASH_WORKERS=2)
+    def test_broken_hashing_pool_falls_back_inline(self):
+        """Test a dead hashing worker is replaced instead of failing every request"""
+        broken = Mock()
+        broken.map.side_effect = BrokenProcessPool()
+        with patch.object(bulk, "_pool", broken):
+            hashed = hash_passwords(["Str0ng-Passw0rd!"])
+            self.assertIsNone(bulk._pool)
+        broken.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        self.assertTrue(check_password("Str0ng-Passw0rd!", hashed[0]))
@@ -1,4 +1,3 @@
-import logging
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
@@ -25,7 +24,7 @@ class CreateUserViewTests(APITestCase):
     def test_create_user_success(self):
         """Test successfully creating a new user"""
         self.client.force_authenticate(user=self.admin_user)
-        with patch.object(logging.Logger, "info") as mock_logger:
+        with patch("apps.users.views.logger.info") as mock_logger:
             response = self.client.post(self.url, self.user_data, format="json")
             self.assertEqual(response.status_code, status.HTTP_201_CREATED)
             self.assertTrue(
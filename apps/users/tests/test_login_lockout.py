@@ -0,0 +1,161 @@
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import Throttled
+from rest_framework.test import APITestCase
+
+from apps.users.lockout import LoginLockout
+from apps.users.login_pool import LoginHashingPool
+from apps.users.models import CustomUser as User
+
+
+@override_settings(
+    LOGIN_LOCKOUT_EMAIL_THRESHOLD=3,
+    LOGIN_LOCKOUT_IP_THRESHOLD=5,
+    LOGIN_LOCKOUT_BASE_SECONDS=30,
+)
+class LoginLockoutTests(APITestCase):
+    """Test suite for the failed login lockout"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("v1:users:knox_login")
+        cls.user = User.objects.create_user(
+            email="testuser@example.com", password="testpassword123"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def login(
+        self, email="testuser@example.com", password="wrongpassword", ip=None, **extra
+    ):
+        if ip:
+            extra["REMOTE_ADDR"] = ip
+        return self.client.post(
+            self.url, {"email": email, "password": password}, format="json", **extra
+        )
+
+    def test_email_locked_after_threshold(self):
+        """Test an email is locked out once it reaches the failure threshold"""
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.login(password="testpassword123")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "30")
+
+    def test_lockout_is_case_insensitive(self):
+        """Test the email is normalized before keying the lockout"""
+        for _ in range(3):
+            self.login()
+        response = self.login(email="  TestUser@Example.com ")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_locked_out_requests_skip_hashing(self):
+        """Test locked out requests never reach the password hasher"""
+        for _ in range(3):
+            self.login()
+
+        with patch.object(LoginHashingPool, "submit") as submit:
+            self.login(password="testpassword123")
+        submit.assert_not_called()
+
+    def test_backoff_doubles_with_each_failure(self):
+        """Test every failure past the threshold doubles the lockout"""
+        lockout = LoginLockout("testuser@example.com")
+        for _ in range(5):
+            lockout.record_failure()
+
+        with self.assertRaises(Throttled) as ctx:
+            lockout.check()
+        self.assertEqual(ctx.exception.wait, 120)
+
+    def test_ip_locked_across_emails(self):
+        """Test a client IP is locked out after failures on many emails"""
+        for i in range(5):
+            self.login(email=f"user{i}@example.com", ip="10.0.0.1")
+
+        response = self.login(password="testpassword123", ip="10.0.0.1")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        response = self.login(password="testpassword123", ip="10.0.0.2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_ip_ignores_spoofed_forwarded_for(self):
+        """Test clients cannot leave an IP lockout by sending X-Forwarded-For"""
+        direct = {**settings.REST_FRAMEWORK, "NUM_PROXIES": 0}
+        with override_settings(REST_FRAMEWORK=direct):
+            for i in range(5):
+                self.login(email=f"user{i}@example.com", ip="10.0.0.1")
+
+            response = self.login(
+                password="testpassword123",
+                ip="10.0.0.1",
+                HTTP_X_FORWARDED_FOR="198.51.100.7",
+            )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_ip_not_shared_behind_undeclared_proxy(self):
+        """Test clients behind a proxy missing from NUM_PROXIES are not locked together"""
+        self.assertIsNone(settings.REST_FRAMEWORK["NUM_PROXIES"])
+        with (
+            patch("apps.users.lockout._warned_untrusted_proxy", False),
+            self.assertLogs("apps.users.lockout", "WARNING") as logs,
+        ):
+            for i in range(5):
+                self.login(
+                    email=f"user{i}@example.com",
+                    ip="10.0.0.1",
+                    HTTP_X_FORWARDED_FOR="198.51.100.7",
+                )
+
+            response = self.login(
+                password="testpassword123",
+                ip="10.0.0.1",
+                HTTP_X_FORWARDED_FOR="203.0.113.2",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        warnings = [line for line in logs.output if "NUM_PROXIES is unset" in line]
+        self.assertEqual(len(warnings), 1)
+
+    def test_ip_behind_trusted_proxy(self):
+        """Test the address the trusted proxy saw identifies the client"""
+        proxied = {**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}
+        with override_settings(REST_FRAMEWORK=proxied):
+            for i in range(5):
+                self.login(
+                    email=f"user{i}@example.com",
+                    ip="10.0.0.1",
+                    HTTP_X_FORWARDED_FOR="198.51.100.7, 203.0.113.1",
+                )
+
+            response = self.login(
+                password="testpassword123",
+                ip="10.0.0.1",
+                HTTP_X_FORWARDED_FOR="203.0.113.2",
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.login(
+                password="testpassword123",
+                ip="10.0.0.1",
+                HTTP_X_FORWARDED_FOR="203.0.113.1",
+            )
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_successful_login_resets_email_failures(self):
+        """Test a successful login clears the email failure counter"""
+        for _ in range(2):
+            self.login()
+        self.assertEqual(
+            self.login(password="testpassword123").status_code, status.HTTP_200_OK
+        )
+        for _ in range(2):
+            self.login()
+        self.assertEqual(
+            self.login(password="testpassword123").status_code, status.HTTP_200_OK
+        )
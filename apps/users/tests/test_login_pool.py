@@ -0,0 +1,99 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import aauthenticate, authenticate
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.core.metrics import collect
+from apps.users.login_pool import LoginHashingPool, LoginPoolSaturated
+from apps.users.models import CustomUser as User
+
+
+class LoginHashingPoolTests(APITestCase):
+    """Test suite for the bounded login hashing pool"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("v1:users:knox_login")
+        cls.user = User.objects.create_user(
+            email="testuser@example.com", password="testpassword123"
+        )
+        cls.valid_credentials = {
+            "email": "testuser@example.com",
+            "password": "testpassword123",
+        }
+
+    def test_pool_rejects_when_full(self):
+        """Test jobs beyond workers plus queue are rejected immediately"""
+        pool = LoginHashingPool(max_workers=1, max_queue=1)
+        release = threading.Event()
+        running = pool.submit(release.wait)
+        queued = pool.submit(lambda: None)
+
+        with self.assertRaises(LoginPoolSaturated):
+            pool.submit(lambda: None)
+
+        release.set()
+        running.result()
+        queued.result()
+        self.assertEqual(pool.stats()["rejected"], 1)
+        self.assertEqual(pool.stats()["pending"], 0)
+
+    def test_pool_records_queue_and_hash_time(self):
+        """Test completed jobs are reflected in the pool stats"""
+        pool = LoginHashingPool(max_workers=2, max_queue=2)
+        self.assertEqual(pool.run(sum, [1, 2]), 3)
+
+        stats = pool.stats()
+        self.assertEqual(stats["completed"], 1)
+        self.assertGreaterEqual(stats["hash_time_total"], 0.0)
+        self.assertGreaterEqual(stats["queue_time_total"], 0.0)
+
+    def test_pool_records_histograms(self):
+        """Test queue and hash times are observed on the metrics histograms"""
+
+        def observations(name):
+            return sum(
+                value
+                for (metric_name, kind, labels), value in collect().items()
+                if metric_name == name and kind != "sum"
+            )
+
+        before = [
+            observations("login_pool_queue_seconds"),
+            observations("login_pool_hash_seconds"),
+        ]
+        LoginHashingPool(max_workers=1, max_queue=1).run(sum, [1, 2])
+        after = [
+            observations("login_pool_queue_seconds"),
+            observations("login_pool_hash_seconds"),
+        ]
+        self.assertEqual(after, [before[0] + 1, before[1] + 1])
+
+    def test_login_returns_503_when_pool_is_saturated(self):
+        """Test login fails fast with 503 when no hashing slot is free"""
+        with patch.object(LoginHashingPool, "submit", side_effect=LoginPoolSaturated):
+            response = self.client.post(self.url, self.valid_credentials, format="json")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.data["detail"].code, "login_unavailable")
+
+    def test_other_callers_fail_credentials_when_pool_is_saturated(self):
+        """Test a saturated pool reads as failed credentials outside the login API"""
+        with patch.object(LoginHashingPool, "submit", side_effect=LoginPoolSaturated):
+            self.assertIsNone(authenticate(**self.valid_credentials))
+            self.assertFalse(self.client.login(**self.valid_credentials))
+
+    async def test_async_callers_fail_credentials_when_pool_is_saturated(self):
+        """Test the async backend path also refuses without raising"""
+        with patch.object(LoginHashingPool, "submit", side_effect=LoginPoolSaturated):
+            self.assertIsNone(await aauthenticate(**self.valid_credentials))
+
+    async def test_async_authenticate_uses_pool(self):
+        """Test the async backend path verifies credentials"""
+        user = await aauthenticate(**self.valid_credentials)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertIsNone(
+            await aauthenticate(email=self.user.email, password="wrongpassword")
+        )
@@ -25,7 +25,7 @@ class LoginViewTests(APITestCase):
 
     def test_login_success(self):
         """Test successful user login with token response"""
-        with patch.object(logging.Logger, "info") as mock_logger:
+        with patch("apps.users.views.logger.info") as mock_logger:
             response = self.client.post(self.url, self.valid_credentials, format="json")
             self.assertEqual(response.status_code, status.HTTP_200_OK)
 
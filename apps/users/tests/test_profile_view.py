@@ -1,8 +1,16 @@
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, RequestFactory, TestCase
 from django.urls import reverse
+from knox.models import AuthToken
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from apps.users import views
+
 
 class ProfileViewTests(APITestCase):
     """Test suite for the user profile view"""
@@ -136,3 +144,110 @@ class ProfileViewTests(APITestCase):
             "The password is too similar to the email address.",
             response.data["password"][0],
         )
+
+    def test_retrieve_profile_sets_etag(self):
+        """Test the profile response carries a strong ETag"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("Authorization", response["Vary"])
+
+    def test_retrieve_profile_not_modified(self):
+        """Test a matching If-None-Match returns 304 without serializing"""
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(self.url)["ETag"]
+
+        with patch("apps.users.views.UserProfileSerializer") as serializer:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        serializer.assert_not_called()
+
+    def test_retrieve_profile_etag_changes_on_update(self):
+        """Test a stale If-None-Match returns the new representation"""
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.patch(self.url, {"first_name": "New"}, format="json")
+        self.assertNotEqual(response["ETag"], etag)
+
+        # Token authentication loads a fresh user on every request
+        self.user.refresh_from_db()
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["first_name"], "New")
+
+    def test_update_profile_if_match(self):
+        """Test If-Match lets only writes based on the current state through"""
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.patch(
+            self.url, {"first_name": "First"}, format="json", HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # A second writer holding the old ETag must not overwrite the change
+        response = self.client.patch(
+            self.url, {"first_name": "Second"}, format="json", HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, "First")
+
+
+class AsyncProfileViewTests(TestCase):
+    """Test suite for the ASGI profile view"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("v1:users:profile")
+        cls.user = get_user_model().objects.create_user(
+            email="testuser@example.com", password="testpassword123", first_name="Test"
+        )
+
+    def setUp(self):
+        cache.clear()
+        _, token = AuthToken.objects.create(user=self.user)
+        self.authorization = f"Bearer {token}"
+
+    def sync_get(self, **headers):
+        request = RequestFactory().get(
+            self.url, HTTP_AUTHORIZATION=self.authorization, **headers
+        )
+        return views.profile_view(request).render()
+
+    async def async_get(self, **headers):
+        request = AsyncRequestFactory().get(
+            self.url, headers={"Authorization": self.authorization, **headers}
+        )
+        return await views.aprofile(request)
+
+    async def test_cached_token_is_served_on_the_event_loop(self):
+        """Test a GET with a cached token gets the same response as the DRF view"""
+        expected = await sync_to_async(self.sync_get)()
+
+        with patch.object(views, "profile_view") as profile_view:
+            response = await self.async_get()
+            not_modified = await self.async_get(**{"If-None-Match": expected["ETag"]})
+        profile_view.assert_not_called()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, expected.content)
+        for header in ("Content-Type", "ETag", "Vary", "Allow"):
+            self.assertEqual(response[header], expected[header], header)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_other_requests_use_the_drf_view(self):
+        """Test uncached tokens and other renderers fall back to the DRF view"""
+        response = await self.async_get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["email"], self.user.email)
+
+        response = await self.async_get(Accept="text/csv")
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+        self.authorization = "Bearer invalid"
+        response = await self.async_get()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,154 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from knox import views as knox_views
+from knox.crypto import hash_token
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.users.authentication import CachedTokenAuthentication, get_token_cache_key
+from apps.users.models import CustomUser as User
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    """Test suite for the cached knox token authentication"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.login_url = reverse("v1:users:knox_login")
+        cls.profile_url = reverse("v1:users:profile")
+        cls.logout_url = reverse("v1:users:knox_logout")
+        cls.logoutall_url = reverse("v1:users:knox_logoutall")
+        cls.user = User.objects.create_user(
+            email="testuser@example.com", password="testpassword123"
+        )
+
+    def login(self):
+        response = self.client.post(
+            self.login_url,
+            {"email": "testuser@example.com", "password": "testpassword123"},
+            format="json",
+        )
+        return response.data["token"]
+
+    def authenticate(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_token_is_cached_after_first_request(self):
+        """Test a verified token is stored in the cache"""
+        token = self.login()
+        self.authenticate(token)
+
+        self.assertIsNone(cache.get(get_token_cache_key(hash_token(token))))
+        response = self.client.get(self.profile_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        user_id, expiry = cache.get(get_token_cache_key(hash_token(token)))
+        self.assertEqual(user_id, self.user.pk)
+        self.assertIsNotNone(expiry)
+
+    def test_cached_token_skips_token_queries(self):
+        """Test a cache hit only fetches the user row"""
+        token = self.login()
+        self.authenticate(token)
+
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(self.profile_url)
+        with CaptureQueriesContext(connection) as warm:
+            response = self.client.get(self.profile_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLess(len(warm), len(cold))
+        self.assertFalse(any("knox_authtoken" in q["sql"] for q in warm.captured_queries))
+
+    def test_logout_invalidates_cached_token(self):
+        """Test logout removes the cached entry and the token stops working"""
+        token = self.login()
+        self.authenticate(token)
+        self.client.get(self.profile_url)
+
+        response = self.client.post(self.logout_url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertIsNone(cache.get(get_token_cache_key(hash_token(token))))
+
+        response = self.client.get(self.profile_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logoutall_invalidates_all_cached_tokens(self):
+        """Test logoutall removes the cached entries of every user token"""
+        tokens = [self.login() for _ in range(2)]
+        for token in tokens:
+            self.authenticate(token)
+            self.client.get(self.profile_url)
+
+        response = self.client.post(self.logoutall_url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        for token in tokens:
+            with self.subTest(token=token):
+                self.assertIsNone(cache.get(get_token_cache_key(hash_token(token))))
+                self.authenticate(token)
+                response = self.client.get(self.profile_url)
+                self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def cache_during(self, view, tokens):
+        """Patches a knox logout view so the tokens are cached right before it
+        deletes them, as by concurrent requests"""
+        logout = view.post
+
+        def post(view, request, format=None):
+            for token in tokens:
+                CachedTokenAuthentication().authenticate_credentials(token.encode())
+            return logout(view, request, format=format)
+
+        return mock.patch.object(view, "post", post)
+
+    def test_logout_invalidates_after_delete(self):
+        """Test logout removes a cached entry added while it runs"""
+        token = self.login()
+        self.authenticate(token)
+
+        with self.cache_during(knox_views.LogoutView, [token]):
+            response = self.client.post(self.logout_url)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertIsNone(cache.get(get_token_cache_key(hash_token(token))))
+        response = self.client.get(self.profile_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logoutall_invalidates_after_delete(self):
+        """Test logoutall removes cached entries added while it runs"""
+        tokens = [self.login() for _ in range(2)]
+        self.authenticate(tokens[0])
+
+        with self.cache_during(knox_views.LogoutAllView, tokens):
+            response = self.client.post(self.logoutall_url)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        for token in tokens:
+            with self.subTest(token=token):
+                self.assertIsNone(cache.get(get_token_cache_key(hash_token(token))))
+
+    def test_deactivation_invalidates_cached_tokens(self):
+        """Test deactivating a user removes their cached tokens"""
+        token = self.login()
+        self.authenticate(token)
+        self.client.get(self.profile_url)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertIsNone(cache.get(get_token_cache_key(hash_token(token))))
+        response = self.client.get(self.profile_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token_is_not_cached(self):
+        """Test unknown tokens are rejected and never cached"""
+        token = "a" * 64
+        self.authenticate(token)
+        response = self.client.get(self.profile_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIsNone(cache.get(get_token_cache_key(hash_token(token))))
@@ -0,0 +1,145 @@
+from datetime import timedelta
+from importlib import import_module
+from unittest.mock import Mock
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from knox.models import AuthToken
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.users.models import CustomUser as User
+from apps.users.tasks import purge_expired_auth_data
+
+
+class PurgeExpiredAuthDataTests(APITestCase):
+    """Test suite for the expired tokens and sessions purge task"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="testuser@example.com", password="testpassword123"
+        )
+
+    def test_purge_deletes_only_expired_rows(self):
+        """Test expired tokens and sessions are deleted in batches"""
+        for _ in range(5):
+            AuthToken.objects.create(user=self.user, expiry=timedelta(hours=-1))
+        AuthToken.objects.create(user=self.user, expiry=timedelta(hours=1))
+        now = timezone.now()
+        for i in range(3):
+            Session.objects.create(
+                session_key=f"expired{i}",
+                session_data="",
+                expire_date=now - timedelta(days=1),
+            )
+        Session.objects.create(
+            session_key="active", session_data="", expire_date=now + timedelta(days=1)
+        )
+
+        result = purge_expired_auth_data.apply(kwargs={"batch_size": 2}).get()
+
+        self.assertEqual(result["tokens"], 5)
+        self.assertEqual(result["sessions"], 3)
+        self.assertGreaterEqual(result["duration"], 0.0)
+        self.assertEqual(AuthToken.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(list(Session.objects.values_list("pk", flat=True)), ["active"])
+
+    def test_purge_with_nothing_to_delete(self):
+        """Test the purge reports zero rows when nothing is expired"""
+        result = purge_expired_auth_data.apply().get()
+        self.assertEqual(result["tokens"], 0)
+        self.assertEqual(result["sessions"], 0)
+
+
+class TokenLimitPerUserTests(APITestCase):
+    """Test suite for the per-user token cap enforced at login"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("v1:users:knox_login")
+        cls.user = User.objects.create_user(
+            email="testuser@example.com", password="testpassword123"
+        )
+        cls.valid_credentials = {
+            "email": "testuser@example.com",
+            "password": "testpassword123",
+        }
+
+    def test_login_evicts_oldest_tokens(self):
+        """Test logging in past the cap evicts the oldest tokens"""
+        knox = {**settings.REST_KNOX, "TOKEN_LIMIT_PER_USER": 2}
+        with override_settings(REST_KNOX=knox):
+            tokens = []
+            for _ in range(3):
+                response = self.client.post(
+                    self.url, self.valid_credentials, format="json"
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                tokens.append(response.data["token"])
+
+        self.assertEqual(AuthToken.objects.filter(user=self.user).count(), 2)
+
+        profile_url = reverse("v1:users:profile")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens[0]}")
+        self.assertEqual(
+            self.client.get(profile_url).status_code, status.HTTP_401_UNAUTHORIZED
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens[-1]}")
+        self.assertEqual(self.client.get(profile_url).status_code, status.HTTP_200_OK)
+
+    def test_default_limit_evicts_oldest_tokens(self):
+        """Test the configured limit applies without any override"""
+        limit = settings.REST_KNOX["TOKEN_LIMIT_PER_USER"]
+        self.assertIsNotNone(limit)
+        for _ in range(limit + 1):
+            response = self.client.post(self.url, self.valid_credentials, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(AuthToken.objects.filter(user=self.user).count(), limit)
+
+    def test_zero_limit_keeps_latest_token(self):
+        """Test a limit of zero leaves only the token of the latest login"""
+        knox = {**settings.REST_KNOX, "TOKEN_LIMIT_PER_USER": 0}
+        with override_settings(REST_KNOX=knox):
+            for _ in range(2):
+                response = self.client.post(
+                    self.url, self.valid_credentials, format="json"
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(AuthToken.objects.filter(user=self.user).count(), 1)
+
+
+class ExpiryIndexMigrationTests(SimpleTestCase):
+    """Test suite for the migration that indexes knox token expiry"""
+
+    migration = import_module("apps.users.migrations.0002_knox_authtoken_expiry_index")
+
+    def run_migration(self, vendor):
+        schema_editor = Mock()
+        schema_editor.connection.vendor = vendor
+        self.migration.create_index(None, schema_editor)
+        self.migration.drop_index(None, schema_editor)
+        return [call.args[0] for call in schema_editor.execute.call_args_list]
+
+    def test_noop_outside_postgresql(self):
+        """Test the migration runs nothing on other databases either way"""
+        for vendor in ("sqlite", "mysql"):
+            with self.subTest(vendor=vendor):
+                self.assertEqual(self.run_migration(vendor), [])
+
+    def test_postgresql_index_is_concurrent_and_reversible(self):
+        """Test the index is built and dropped concurrently outside a transaction"""
+        (operation,) = self.migration.Migration.operations
+        self.assertFalse(self.migration.Migration.atomic)
+        self.assertTrue(operation.reversible)
+
+        create, drop = self.run_migration("postgresql")
+        self.assertIn(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS knox_authtoken_expiry_idx", create
+        )
+        self.assertIn("DROP INDEX CONCURRENTLY IF EXISTS knox_authtoken_expiry_idx", drop)
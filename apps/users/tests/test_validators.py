@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.contrib.auth import password_validation
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from apps.users.models import CustomUser as User
+from apps.users.validators import (
+    CommonPasswordValidator,
+    UserAttributeSimilarityValidator,
+)
+
+
+class PasswordValidatorTests(TestCase):
+    """Test suite for the shared-list password validators"""
+
+    def assertSameOutcome(self, ours, stock, password, user=None):
+        errors = []
+        for validator in (ours, stock):
+            try:
+                validator.validate(password, user)
+                errors.append(None)
+            except ValidationError as e:
+                errors.append(e.messages)
+        self.assertEqual(errors[0], errors[1], password)
+
+    def test_common_password_list_is_shared(self):
+        """Test every instance reuses the same frozenset"""
+        first, second = CommonPasswordValidator(), CommonPasswordValidator()
+        self.assertIs(first.passwords, second.passwords)
+        self.assertIsInstance(first.passwords, frozenset)
+
+    def test_password_list_not_loaded_at_setup(self):
+        """Test processes that never validate a password never read the list"""
+        script = (
+            "import django; django.setup(); "
+            "from apps.users.validators import load_password_list; "
+            "print(load_password_list.cache_info().currsize)"
+        )
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": os.environ.get(
+                "DJANGO_SETTINGS_MODULE", "conf.test_settings"
+            ),
+        }
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "0")
+
+    def test_common_password_matches_stock(self):
+        """Test common passwords are rejected exactly like Django does"""
+        ours = CommonPasswordValidator()
+        stock = password_validation.CommonPasswordValidator()
+        for password in ("password", " Password ", "qwerty123", "Xk2!vR9#qLm7@wPz"):
+            with self.subTest(password=password):
+                self.assertSameOutcome(ours, stock, password)
+
+    def test_similarity_matches_stock(self):
+        """Test the similarity check agrees with Django's validator"""
+        user = User(email="jane.doe@example.com", first_name="Jane", last_name="Doe")
+        passwords = [
+            "janedoe123",
+            "jane.doe@example.com",
+            "example",
+            "doejane",
+            "ab",
+            "correct-horse-battery-staple",
+            "a" * 60,
+            "",
+        ]
+        for max_similarity in (0.1, 0.5, 0.7, 1.0):
+            ours = UserAttributeSimilarityValidator(max_similarity=max_similarity)
+            stock = password_validation.UserAttributeSimilarityValidator(
+                max_similarity=max_similarity
+            )
+            for password in passwords:
+                with self.subTest(password=password, max_similarity=max_similarity):
+                    self.assertSameOutcome(ours, stock, password, user)
+
+    def test_similarity_without_user(self):
+        """Test the similarity check is skipped without a user"""
+        UserAttributeSimilarityValidator().validate("anything")
@@ -1,11 +1,11 @@
-from rest_framework.throttling import SimpleRateThrottle
+from apps.core.throttles import RedisRateThrottle
 
 
-class UserLoginRateThrottle(SimpleRateThrottle):
+class UserLoginRateThrottle(RedisRateThrottle):
     """
     A rate throttle class for user login attempts.
 
-    This class extends SimpleRateThrottle to implement rate limiting for login requests.
+    This class extends RedisRateThrottle to implement rate limiting for login requests.
     It uses different identifiers for authenticated and unauthenticated users.
 
     Attributes:
@@ -1,14 +1,27 @@
+from django.conf import settings
 from django.urls import path
-from knox import views as knox_views
 
-from .views import CreateUserView, LoginView, UserProfileView
+from .views import (
+    BulkCreateUserView,
+    CreateUserView,
+    LoginView,
+    LogoutAllView,
+    LogoutView,
+    UserProfileView,
+    aprofile,
+)
 
 app_name = "users"
 
 urlpatterns = [
     path("create/", CreateUserView.as_view(), name="create"),
-    path("profile/", UserProfileView.as_view(), name="profile"),
+    path("bulk-create/", BulkCreateUserView.as_view(), name="bulk_create"),
+    path(
+        "profile/",
+        aprofile if settings.ASYNC_VIEWS else UserProfileView.as_view(),
+        name="profile",
+    ),
     path("login/", LoginView.as_view(), name="knox_login"),
-    path("logout/", knox_views.LogoutView.as_view(), name="knox_logout"),
-    path("logoutall/", knox_views.LogoutAllView.as_view(), name="knox_logoutall"),
+    path("logout/", LogoutView.as_view(), name="knox_logout"),
+    path("logoutall/", LogoutAllView.as_view(), name="knox_logoutall"),
 ]
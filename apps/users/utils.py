@@ -1,3 +1,11 @@
+import hashlib
+
+from django.utils.http import quote_etag
+
+# The user fields rendered by UserProfileSerializer
+PROFILE_ETAG_FIELDS = ("pk", "email", "first_name", "last_name")
+
+
 def get_errors(e: Exception) -> list:
     """
     Extracts error messages from a ValidationError or similar exception.
@@ -15,3 +23,17 @@ def get_errors(e: Exception) -> list:
             errors.append(str(err))
 
     return errors
+
+
+def get_profile_etag(user) -> str:
+    """
+    Builds a strong ETag for a user's profile from the rendered fields,
+    without running the serializer.
+    Args:
+        user (CustomUser): The user whose profile is rendered.
+    Returns:
+        str: A quoted ETag.
+    """
+    state = "\x1f".join(str(getattr(user, field)) for field in PROFILE_ETAG_FIELDS)
+    digest = hashlib.md5(state.encode(), usedforsecurity=False).hexdigest()
+    return quote_etag(digest)
@@ -0,0 +1,104 @@
+import functools
+import gzip
+import re
+from collections import Counter
+from pathlib import Path
+
+from django.contrib.auth import password_validation
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+
+DEFAULT_PASSWORD_LIST_PATH = (
+    Path(password_validation.__file__).resolve().parent / "common-passwords.txt.gz"
+)
+
+
+@functools.cache
+def load_password_list(path: str) -> frozenset[str]:
+    """
+    Reads a (possibly gzipped) password list once per process.
+
+    Every validator instance built from the same file shares the same
+    frozenset, so rebuilding the validators after a settings change does not
+    decompress the list again.
+    """
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return frozenset(line.strip() for line in f)
+    except OSError:
+        with open(path) as f:
+            return frozenset(line.strip() for line in f)
+
+
+def quick_similarity(counts: Counter, length: int, value: str) -> float:
+    """
+    Same upper bound as ``SequenceMatcher.quick_ratio()``, computed from the
+    password character counts that the caller builds once.
+    """
+    total = length + len(value)
+    if not total:
+        return 1.0
+    matches = (counts & Counter(value)).total()
+    return 2.0 * matches / total
+
+
+class CommonPasswordValidator(password_validation.CommonPasswordValidator):
+    """
+    CommonPasswordValidator backed by a process-wide frozenset, instead of a
+    set parsed from the gzipped list every time the validators are built.
+    """
+
+    def __init__(self, password_list_path=DEFAULT_PASSWORD_LIST_PATH):
+        self.passwords = load_password_list(str(password_list_path))
+
+
+class UserAttributeSimilarityValidator(
+    password_validation.UserAttributeSimilarityValidator
+):
+    """
+    UserAttributeSimilarityValidator with the same result and error, but
+    cheaper per call.
+
+    The password is lowercased and counted once, duplicate and empty
+    attribute parts are skipped, and parts whose length alone keeps them under
+    ``max_similarity`` are rejected before any character counting. No
+    ``SequenceMatcher`` is built: the original only used its ``quick_ratio()``.
+    """
+
+    def validate(self, password, user=None):
+        if not user:
+            return
+
+        password = password.lower()
+        length = len(password)
+        counts = Counter(password)
+        for attribute_name in self.user_attributes:
+            value = getattr(user, attribute_name, None)
+            if not value or not isinstance(value, str):
+                continue
+            value_lower = value.lower()
+            value_parts = dict.fromkeys([*re.split(r"\W+", value_lower), value_lower])
+            for value_part in value_parts:
+                if not value_part and length:
+                    continue
+                if password_validation.exceeds_maximum_length_ratio(
+                    password, self.max_similarity, value_part
+                ):
+                    continue
+                # 2 * min / total bounds the ratio from above, like real_quick_ratio()
+                shortest = min(length, len(value_part))
+                if shortest and 2.0 * shortest / (length + len(value_part)) < (
+                    self.max_similarity
+                ):
+                    continue
+                if quick_similarity(counts, length, value_part) >= self.max_similarity:
+                    try:
+                        verbose_name = str(
+                            user._meta.get_field(attribute_name).verbose_name
+                        )
+                    except FieldDoesNotExist:
+                        verbose_name = attribute_name
+                    raise ValidationError(
+                        self.get_error_message(),
+                        code="password_too_similar",
+                        params={"verbose_name": verbose_name},
+                    )
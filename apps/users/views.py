@@ -1,32 +1,65 @@
+import json
 import logging
 
-from django.contrib.auth import login
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model, login
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from drf_spectacular.utils import extend_schema, extend_schema_view
-from knox.auth import TokenAuthentication
-from knox.views import LoginView as KnoxLoginView
-from rest_framework import generics, permissions, serializers, status, throttling
+from knox import views as knox_views
+from rest_framework import generics, permissions, serializers, status
+from rest_framework.exceptions import NotAcceptable, UnsupportedMediaType
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework.response import Response
 
+from apps.core.throttles import (
+    PipelinedThrottleMixin,
+    RedisRateThrottle,
+    RedisUserRateThrottle,
+)
+from apps.core.views import add_api_headers, stands_in_for, throttled_response
+
+from .authentication import (
+    CachedTokenAuthentication,
+    evict_oldest_tokens,
+    invalidate_cached_tokens,
+)
+from .bulk import BulkUserCreator, iter_json_array, iter_ndjson
 from .schema import (
     LOGIN_RESPONSE_SCHEMA,
     PROFILE_DETAIL_SCHEMA,
     PROFILE_PATCH_SCHEMA,
     PROFILE_PUT_SCHEMA,
+    USER_BULK_CREATE_RESPONSE_SCHEMA,
     USER_CREATE_RESPONSE_SCHEMA,
 )
 from .serializers import AuthTokenSerializer, CreateUserSerializer, UserProfileSerializer
 from .throttles import UserLoginRateThrottle
+from .utils import get_profile_etag
 
 logger = logging.getLogger(__name__)
 
 
 @extend_schema(responses=LOGIN_RESPONSE_SCHEMA)
-class LoginView(KnoxLoginView):
-    authentication_classes = (TokenAuthentication,)
+class LoginView(PipelinedThrottleMixin, knox_views.LoginView):
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.AllowAny,)
     serializer_class = AuthTokenSerializer
     throttle_classes = [UserLoginRateThrottle]
 
+    def get_token_limit_per_user(self):
+        # Knox rejects logins over the limit; evict the oldest tokens instead.
+        return None
+
+    def create_token(self):
+        token_limit_per_user = super().get_token_limit_per_user()
+        if token_limit_per_user is not None:
+            evict_oldest_tokens(self.request.user, keep=token_limit_per_user - 1)
+        return super().create_token()
+
     def post(self, request, format=None) -> Response:
         serializer = AuthTokenSerializer(data=request.data, context={"request": request})
         serializer.is_valid(raise_exception=True)
@@ -36,25 +69,140 @@ class LoginView(KnoxLoginView):
         return super(LoginView, self).post(request, format=None)
 
 
+class LogoutView(knox_views.LogoutView):
+    authentication_classes = (CachedTokenAuthentication,)
+
+    def post(self, request, format=None) -> Response:
+        digest = request.auth.digest
+        response = super().post(request, format=format)
+        # Only once the token is deleted, so a concurrent request cannot
+        # cache it again from the database
+        invalidate_cached_tokens([digest])
+        return response
+
+
+class LogoutAllView(knox_views.LogoutAllView):
+    authentication_classes = (CachedTokenAuthentication,)
+
+    def post(self, request, format=None) -> Response:
+        # Listed before the delete and invalidated after it, as in LogoutView
+        digests = list(request.user.auth_token_set.values_list("digest", flat=True))
+        response = super().post(request, format=format)
+        invalidate_cached_tokens(digests)
+        return response
+
+
 @extend_schema_view(
     get=extend_schema(responses=PROFILE_DETAIL_SCHEMA),
     patch=extend_schema(responses=PROFILE_PATCH_SCHEMA),
     put=extend_schema(responses=PROFILE_PUT_SCHEMA),
 )
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(PipelinedThrottleMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = (permissions.IsAuthenticated,)
-    throttle_classes = [throttling.UserRateThrottle]
+    throttle_classes = [RedisUserRateThrottle]
+    locked_user = None
 
     def get_object(self):
-        return self.request.user
+        return self.locked_user or self.request.user
+
+    def get(self, request, *args, **kwargs):
+        # A matching If-None-Match answers 304 without running the serializer
+        etag = get_profile_etag(request.user)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return self.set_etag(response, etag)
+
+    def update(self, request, *args, **kwargs):
+        # Lock the row so If-Match is checked against the state being updated
+        with transaction.atomic():
+            self.locked_user = (
+                get_user_model()
+                ._default_manager.select_for_update()
+                .get(pk=request.user.pk)
+            )
+            etag = get_profile_etag(self.locked_user)
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                return self.set_etag(response, etag)
+
+            response = super().update(request, *args, **kwargs)
+
+        return self.set_etag(response, get_profile_etag(self.locked_user))
+
+    @staticmethod
+    def set_etag(response, etag: str):
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+        patch_vary_headers(response, ("Authorization",))
+        return response
+
+
+profile_view = UserProfileView.as_view()
+
+
+@stands_in_for(profile_view)
+async def aprofile(request, *args, **kwargs):
+    """
+    ``UserProfileView`` for ASGI. A GET with a cached token is answered on
+    the event loop (see ``aget_profile``); every other request is handled
+    by ``UserProfileView`` in a thread.
+    """
+    if request.method == "GET":
+        response = await aget_profile(request)
+        if response is not None:
+            return response
+    return await sync_to_async(profile_view)(request, *args, **kwargs)
+
+
+async def aget_profile(request) -> HttpResponse | None:
+    """
+    ``UserProfileView.get`` with the async cache, ORM and Redis throttles.
+
+    Returns ``None`` when the request needs the DRF view: a token that is
+    not cached, a client asking for another renderer than JSON, or a
+    throttle without an async check. Until then, nothing is counted against
+    the throttles.
+    """
+    view = UserProfileView(format_kwarg=None)
+    view.setup(Request(request))
+    try:
+        renderer, _ = view.perform_content_negotiation(view.request)
+    except NotAcceptable:
+        return None
+    if not isinstance(renderer, JSONRenderer):
+        return None
+    throttles = view.get_throttles()
+    if not all(isinstance(throttle, RedisRateThrottle) for throttle in throttles):
+        return None
+
+    auth = await CachedTokenAuthentication().aauthenticate_cached(request)
+    if auth is None:
+        return None
+    # The throttles identify users by request.user, like on a DRF request
+    request.user, request.auth = auth
+
+    waits = []
+    for throttle in throttles:
+        if not await throttle.aallow_request(request, view):
+            waits.append(throttle.wait())
+    if waits:
+        return throttled_response(max((w for w in waits if w is not None), default=None))
+
+    etag = get_profile_etag(request.user)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        data = UserProfileSerializer(request.user, context={"request": view.request}).data
+        response = HttpResponse(renderer.render(data), content_type="application/json")
+    return add_api_headers(view, UserProfileView.set_etag(response, etag))
 
 
 @extend_schema(responses=USER_CREATE_RESPONSE_SCHEMA)
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(PipelinedThrottleMixin, generics.CreateAPIView):
     permission_classes = (permissions.IsAdminUser,)
     serializer_class = CreateUserSerializer
-    throttle_classes = [throttling.UserRateThrottle]
+    throttle_classes = [RedisUserRateThrottle]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -73,3 +221,35 @@ class CreateUserView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         serializer.save()
+
+
+@extend_schema(
+    request=CreateUserSerializer(many=True),
+    responses=USER_BULK_CREATE_RESPONSE_SCHEMA,
+)
+class BulkCreateUserView(PipelinedThrottleMixin, generics.GenericAPIView):
+    """
+    Creates users from an NDJSON stream or a JSON array of
+    CreateUserSerializer payloads, streaming back one NDJSON result per row.
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+    serializer_class = CreateUserSerializer
+    throttle_classes = [RedisUserRateThrottle]
+    stream_parsers = {
+        "application/x-ndjson": iter_ndjson,
+        "application/json": iter_json_array,
+    }
+
+    def post(self, request, *args, **kwargs) -> StreamingHttpResponse:
+        media_type = request.content_type.split(";")[0].strip()
+        if media_type not in self.stream_parsers:
+            raise UnsupportedMediaType(media_type)
+
+        # Read the body incrementally instead of going through request.data
+        stream = request.stream if request.stream is not None else []
+        results = BulkUserCreator().run(self.stream_parsers[media_type](stream))
+        return StreamingHttpResponse(
+            (json.dumps(result, cls=DjangoJSONEncoder) + "\n" for result in results),
+            content_type="application/x-ndjson",
+        )
@@ -1,5 +1,13 @@
-# This will make sure the app is always imported when
-# Django starts so that shared_task will use this app.
-from .celery import app as celery_app
+# The Celery app is imported on first use rather than with Django: web
+# processes get it from the task modules their views import (which set it
+# as the current app for shared_task), `celery -A conf` finds conf.celery by
+# itself, and one-off commands do not load Celery at all.
+def __getattr__(name):
+    if name == "celery_app":
+        from .celery import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ("celery_app",)
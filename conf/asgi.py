@@ -11,6 +11,13 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from apps.core.fastpath import ASGIFastPaths
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "conf.settings")
+# Serves requests, so the debug toolbar is loaded when DEBUG is on
+os.environ.setdefault("DEBUG_TOOLBAR", "True")
+# Route to the async views, which only pay off when served by an ASGI server
+os.environ.setdefault("ASYNC_VIEWS", "True")
 
-application = get_asgi_application()
+# Answers the FAST_PATHS without going through Django's handler
+application = ASGIFastPaths(get_asgi_application())
@@ -4,6 +4,9 @@ from celery import Celery
 
 # set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "conf.settings")
+# Django's system checks run with migrate and `check --deploy`. Run by every
+# worker and beat process too, they would load the URLconf and all the views.
+os.environ.setdefault("CELERY_SKIP_CHECKS", "True")
 
 app = Celery("worker")  # worker
 
@@ -0,0 +1,93 @@
+"""
+Gunicorn configuration for production.
+
+    gunicorn -c conf/gunicorn.py
+
+The application is loaded and warmed up once in the master process, then
+forked, so workers start ready to serve and share its memory. See
+docs/deployment.md for the workload profiles and environment variables.
+"""
+
+import gc
+import math
+import os
+
+# Workers per CPU, extra workers, threads per worker and worker class
+WORKLOAD_PROFILES = {
+    # Requests mostly use the CPU (serialization, password hashing)
+    "cpu": (1, 1, 1, "sync"),
+    # The default: requests wait on the database and Redis about as long as
+    # they compute
+    "mixed": (2, 1, 1, "sync"),
+    # Requests mostly wait on the database, Redis or other services
+    "io": (1, 1, 4, "gthread"),
+    # An event loop per CPU, serving conf/asgi.py (see ASYNC_VIEWS)
+    "asgi": (1, 0, 1, "uvicorn_worker.UvicornWorker"),
+}
+
+
+def cpu_count() -> int:
+    """
+    The CPUs this process may use, limited by the container's cgroup CPU
+    quota when there is one.
+    """
+    cpus = os.process_cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+    except OSError:
+        return cpus
+    if quota != "max":
+        cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    return cpus
+
+
+profile = os.environ.get("GUNICORN_PROFILE", "mixed")
+if profile not in WORKLOAD_PROFILES:
+    raise ValueError(f"Unknown GUNICORN_PROFILE {profile!r}")
+workers_per_cpu, extra_workers, profile_threads, worker_class = WORKLOAD_PROFILES[profile]
+
+wsgi_app = "conf.asgi:application" if profile == "asgi" else "conf.wsgi:application"
+bind = [f"0.0.0.0:{os.environ.get('PORT', '8000')}"]
+workers = int(
+    os.environ.get("WEB_CONCURRENCY", cpu_count() * workers_per_cpu + extra_workers)
+)
+threads = int(os.environ.get("GUNICORN_THREADS", profile_threads))
+if worker_class == "sync" and threads > 1:
+    worker_class = "gthread"
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "True").lower() in ("true", "1")
+# Requests are logged by RequestIDMiddleware
+accesslog = None
+
+if preload_app:
+    # Objects freed in the master leave holes in pages the workers share.
+    # The collector is turned back on in the workers.
+    gc.disable()
+
+
+def when_ready(server):
+    from apps.core.metrics import clear_metrics_dir
+
+    clear_metrics_dir()
+    if preload_app:
+        from apps.core.warmup import warm_up
+
+        warm_up()
+        # Move everything allocated so far out of the collector's reach, so
+        # collections in the workers do not write to the shared pages
+        gc.collect()
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        gc.enable()
+
+
+def post_worker_init(worker):
+    # Without preload_app, every worker loads the application itself
+    if not preload_app:
+        from apps.core.warmup import warm_up
+
+        warm_up()
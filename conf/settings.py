@@ -4,7 +4,6 @@ from datetime import timedelta
 from pathlib import Path
 
 import environ
-import sentry_sdk
 
 env = environ.Env()
 root_path = environ.Path(__file__) - 2
@@ -44,13 +43,34 @@ PASSWORD_HASHERS = [
     "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
 ]
 
+AUTHENTICATION_BACKENDS = ["apps.users.backends.PooledModelBackend"]
+
+# Password hashing for logins runs on a bounded per-process thread pool
+LOGIN_POOL_MAX_WORKERS = env.int("LOGIN_POOL_MAX_WORKERS", default=2)
+LOGIN_POOL_MAX_QUEUE = env.int("LOGIN_POOL_MAX_QUEUE", default=16)
+
+# Bulk user creation inserts in batches and hashes on a process pool (0 = inline)
+USER_BULK_CREATE_BATCH_SIZE = env.int("USER_BULK_CREATE_BATCH_SIZE", default=500)
+USER_BULK_CREATE_HASH_WORKERS = env.int("USER_BULK_CREATE_HASH_WORKERS", default=2)
+USER_BULK_CREATE_MAX_ITEM_BYTES = env.int(
+    "USER_BULK_CREATE_MAX_ITEM_BYTES", default=64 * 1024
+)
+
+# Failed logins lock an email or client IP out with exponential backoff
+LOGIN_LOCKOUT_EMAIL_THRESHOLD = env.int("LOGIN_LOCKOUT_EMAIL_THRESHOLD", default=5)
+LOGIN_LOCKOUT_IP_THRESHOLD = env.int("LOGIN_LOCKOUT_IP_THRESHOLD", default=20)
+LOGIN_LOCKOUT_BASE_SECONDS = env.int("LOGIN_LOCKOUT_BASE_SECONDS", default=30)
+LOGIN_LOCKOUT_MAX_SECONDS = env.int("LOGIN_LOCKOUT_MAX_SECONDS", default=3600)
+
+# The common password list is loaded once per process, by the warm-up in the
+# server master or else on the first validation
 AUTH_PASSWORD_VALIDATORS = [
-    {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
+    {"NAME": "apps.users.validators.UserAttributeSimilarityValidator"},
     {
         "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
         "OPTIONS": {"min_length": MIN_PASSWORD_LENGTH},
     },
-    {"NAME": "django.contrib.auth.password_validation.CommonPasswordValidator"},
+    {"NAME": "apps.users.validators.CommonPasswordValidator"},
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
@@ -67,6 +87,8 @@ if not DEBUG:
     SECURE_HSTS_PRELOAD = True
     SECURE_SSL_REDIRECT = True
     SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
+    # Load balancers and orchestrators probe the containers over plain HTTP
+    SECURE_REDIRECT_EXEMPT = [r"^health/"]
 
 # -----------------------------------------------------------------------------
 # Databases
@@ -99,10 +121,32 @@ INSTALLED_APPS = [
     "apps.core",
 ]
 
+# Serve async views where the project has them. conf/asgi.py turns this on,
+# so ASGI servers get them and WSGI servers keep the sync views.
+ASYNC_VIEWS = env.bool("ASYNC_VIEWS", default=False)
+
+# Paths answered with a constant JSON body by conf/wsgi.py and conf/asgi.py
+# before Django's handler runs, with an optional rate per client IP that each
+# process enforces on its own. FAST_PATHS_ENABLED=False sends them to Django.
+FAST_PATHS = (
+    {
+        "/api/v1/core/ping/": {"body": {"ping": "pong"}, "rate": "10/minute"},
+        "/health/live/": {"body": {"status": "ok"}},
+    }
+    if env.bool("FAST_PATHS_ENABLED", default=True)
+    else {}
+)
+
+# Seconds /health/ready/ waits for each dependency, and seconds a process
+# reuses the result for before probing them again
+HEALTH_CHECK_TIMEOUT = env.float("HEALTH_CHECK_TIMEOUT", default=1.0)
+HEALTH_CHECK_CACHE_SECONDS = env.float("HEALTH_CHECK_CACHE_SECONDS", default=5.0)
+
 MIDDLEWARE = [
     "apps.core.middleware.RequestIDMiddleware",
+    "apps.core.middleware.QueryInspectorMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "apps.core.async_middleware.AsyncWhiteNoiseMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -138,7 +182,7 @@ REST_KNOX = {
     "AUTH_TOKEN_CHARACTER_LENGTH": 64,
     "TOKEN_TTL": timedelta(hours=10),
     "USER_SERIALIZER": "apps.users.serializers.UserProfileSerializer",
-    "TOKEN_LIMIT_PER_USER": None,
+    "TOKEN_LIMIT_PER_USER": env.int("TOKEN_LIMIT_PER_USER", default=10),
     "AUTO_REFRESH": False,
     "AUTO_REFRESH_MAX_TTL": None,
     "MIN_REFRESH_INTERVAL": 60,
@@ -146,8 +190,16 @@ REST_KNOX = {
     "TOKEN_MODEL": "knox.AuthToken",
 }
 
+# Seconds a verified token lookup is kept in the default cache (0 disables it)
+AUTH_TOKEN_CACHE_TIMEOUT = env.int("AUTH_TOKEN_CACHE_TIMEOUT", default=300)
+
+# Rows deleted per statement by the expired tokens and sessions purge task
+AUTH_PURGE_BATCH_SIZE = env.int("AUTH_PURGE_BATCH_SIZE", default=1000)
+
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": ("knox.auth.TokenAuthentication",),
+    "DEFAULT_AUTHENTICATION_CLASSES": (
+        "apps.users.authentication.CachedTokenAuthentication",
+    ),
     "DEFAULT_VERSIONING_CLASS": "rest_framework.versioning.URLPathVersioning",
     "DEFAULT_VERSION": "v1",
     "ALLOWED_VERSIONS": ["v1"],
@@ -165,6 +217,9 @@ REST_FRAMEWORK = {
         "anon": "100/day",
         "user_login": "5/minute",
     },
+    # Trusted proxies in front of the app; client IPs are read from the
+    # X-Forwarded-For entry the outermost one added (0 or unset: REMOTE_ADDR)
+    "NUM_PROXIES": env.int("NUM_PROXIES", default=None),
 }
 
 # TODO ⚡ Update the settings for the DRF Spectacular
@@ -199,12 +254,14 @@ if not CORS_ALLOW_ALL_ORIGINS:
 # -----------------------------------------------------------------------------
 # Cache
 # -----------------------------------------------------------------------------
+REDIS_URL = env("REDIS_URL", default="redis://redis:6379")
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": env("REDIS_URL", default="redis://redis:6379"),
+        "LOCATION": REDIS_URL,
         "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            # Records cache calls in the request's Server-Timing
+            "CLIENT_CLASS": "apps.core.cache.TimedRedisClient",
         },
     }
 }
@@ -220,6 +277,12 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
 CELERY_RESULT_EXTENDED = True
+CELERY_BEAT_SCHEDULE = {
+    "purge-expired-auth-data": {
+        "task": "apps.users.tasks.purge_expired_auth_data",
+        "schedule": timedelta(hours=1),
+    },
+}
 
 # -----------------------------------------------------------------------------
 # Email
@@ -240,12 +303,60 @@ IGNORABLE_404_URLS = [
     re.compile(r"^/robots\.txt$"),
 ]
 
+# Clients allowed to see the per-phase Server-Timing header (staff always can)
+SERVER_TIMING_INTERNAL_IPS = env.list(
+    "SERVER_TIMING_INTERNAL_IPS", default=["127.0.0.1/32", "::1/128"]
+)
+
+# Directory shared by all server and Celery processes for the metrics files.
+# Without it, /metrics only reports the process that serves the scrape.
+METRICS_DIR = env("METRICS_DIR", default=None)
+# Scrapers allowed to read /metrics; they must connect directly, not via a proxy
+METRICS_INTERNAL_IPS = env.list(
+    "METRICS_INTERNAL_IPS", default=["127.0.0.1/32", "::1/128"]
+)
+
+# Bounded queue between the request threads and the log writer thread. When
+# it is full, "drop" discards records and "block" waits up to the timeout.
+LOG_QUEUE_SIZE = env.int("LOG_QUEUE_SIZE", default=10000)
+LOG_QUEUE_POLICY = env("LOG_QUEUE_POLICY", default="drop")
+LOG_QUEUE_BLOCK_TIMEOUT = env.float("LOG_QUEUE_BLOCK_TIMEOUT", default=1.0)
+
+# Fraction of requests whose queries are inspected, and the per-request
+# budgets: query count, database seconds, executions of the same SQL shape
+# and seconds for a single query. Requests over budget log a warning, with
+# the plan of the slowest query when QUERY_EXPLAIN is set.
+QUERY_INSPECTOR_SAMPLE_RATE = env.float("QUERY_INSPECTOR_SAMPLE_RATE", default=0.1)
+QUERY_BUDGET_COUNT = env.int("QUERY_BUDGET_COUNT", default=30)
+QUERY_BUDGET_DB_TIME = env.float("QUERY_BUDGET_DB_TIME", default=0.5)
+QUERY_BUDGET_DUPLICATES = env.int("QUERY_BUDGET_DUPLICATES", default=5)
+QUERY_BUDGET_SLOW_QUERY = env.float("QUERY_BUDGET_SLOW_QUERY", default=0.1)
+QUERY_EXPLAIN = env.bool("QUERY_EXPLAIN", default=False)
+
+# Access log sampling: the fraction of informational, successful and redirect
+# responses logged, per-route and per-status-class overrides (e.g.
+# {"api/v1/core/ping/": {"2xx": 0.01}, "*": {"4xx": 0.5}}), the latency in
+# seconds above which requests are always logged, and how many records per
+# route and status class are logged in full every second. Server errors are
+# always logged.
+ACCESS_LOG_SAMPLE_RATE = env.float("ACCESS_LOG_SAMPLE_RATE", default=1.0)
+ACCESS_LOG_SAMPLE_RATES = {}
+ACCESS_LOG_SLOW_THRESHOLD = env.float("ACCESS_LOG_SLOW_THRESHOLD", default=1.0)
+ACCESS_LOG_SAMPLE_BURST = env.int("ACCESS_LOG_SAMPLE_BURST", default=10)
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
     "filters": {
         "request_id": {"()": "apps.core.middleware.RequestIDFilter"},
         "timed_log": {"()": "apps.core.middleware.TimeLogFilter"},
+        "access_sampling": {
+            "()": "apps.core.middleware.AccessLogSamplingFilter",
+            "rates": ACCESS_LOG_SAMPLE_RATES,
+            "default_rate": ACCESS_LOG_SAMPLE_RATE,
+            "slow_threshold": ACCESS_LOG_SLOW_THRESHOLD,
+            "burst": ACCESS_LOG_SAMPLE_BURST,
+        },
     },
     "formatters": {
         "json": {
@@ -262,37 +373,88 @@ LOGGING = {
         },
     },
     "handlers": {
+        # Formats and writes the records in batches on the listener thread
         "console": {
-            "class": "logging.StreamHandler",
+            "class": "apps.core.log_handlers.BatchStreamHandler",
             "formatter": "json",
+        },
+        # Request threads only enqueue; the request_id filter must run here
+        # to read the request's context variables
+        "queue": {
+            "class": "apps.core.log_handlers.BufferedQueueHandler",
+            "handlers": ["console"],
+            "listener": "apps.core.log_handlers.BatchQueueListener",
+            "queue": {"()": "queue.Queue", "maxsize": LOG_QUEUE_SIZE},
+            "respect_handler_level": True,
+            "policy": LOG_QUEUE_POLICY,
+            "block_timeout": LOG_QUEUE_BLOCK_TIMEOUT,
             "filters": ["request_id"],
         },
     },
     "loggers": {
         "": {
-            "handlers": ["console"],
+            "handlers": ["queue"],
             "level": "INFO",
         },
         "django": {
-            "handlers": ["console"],
+            "handlers": ["queue"],
             "level": "INFO",
             "propagate": False,
         },
         "apps": {
-            "handlers": ["console"],
+            "handlers": ["queue"],
             "level": "DEBUG" if DEBUG else "INFO",
             "propagate": False,
         },
+        # Sampled on the request thread, before the record is queued
+        "apps.access": {
+            "handlers": ["queue"],
+            "level": "INFO",
+            "filters": ["access_sampling"],
+            "propagate": False,
+        },
     },
 }
 
+# Sentry trace sampling: the default rate, per-route (URL pattern or Celery
+# task name) rates, the rate of routes that were slower than the threshold
+# within the window, and the most traces a second each process may send.
+# profiles_sample_rate is the fraction of the sampled traces that is profiled.
+SENTRY_TRACES_SAMPLE_RATE = env.float("SENTRY_TRACES_SAMPLE_RATE", default=0.1)
+SENTRY_TRACES_SAMPLE_RATES = {
+    "api/v1/core/ping/": 0.0,
+    "health/live/": 0.0,
+    "health/ready/": 0.0,
+    "api/v1/auth/login/": 0.5,
+}
+SENTRY_TRACES_SLOW_THRESHOLD = env.float("SENTRY_TRACES_SLOW_THRESHOLD", default=1.0)
+SENTRY_TRACES_SLOW_TASK_THRESHOLD = env.float(
+    "SENTRY_TRACES_SLOW_TASK_THRESHOLD", default=60.0
+)
+SENTRY_TRACES_SLOW_RATE = env.float("SENTRY_TRACES_SLOW_RATE", default=1.0)
+SENTRY_TRACES_SLOW_WINDOW = env.float("SENTRY_TRACES_SLOW_WINDOW", default=60.0)
+SENTRY_TRACES_PER_SECOND = env.float("SENTRY_TRACES_PER_SECOND", default=10.0)
+SENTRY_PROFILES_SAMPLE_RATE = env.float("SENTRY_PROFILES_SAMPLE_RATE", default=0.1)
+
 if not DEBUG:
     sentry_dsn = env("SENTRY_DSN", default=None)
     if sentry_dsn:
+        # Only imported when it is used: loading the SDK takes longer than the
+        # rest of the settings
+        import sentry_sdk
+
+        from apps.core.tracing import TracesSampler
+
         sentry_sdk.init(
             dsn=sentry_dsn,
-            traces_sample_rate=0.1,
-            profiles_sample_rate=0.1,
+            traces_sampler=TracesSampler(
+                rates=SENTRY_TRACES_SAMPLE_RATES,
+                default_rate=SENTRY_TRACES_SAMPLE_RATE,
+                slow_rate=SENTRY_TRACES_SLOW_RATE,
+                slow_window=SENTRY_TRACES_SLOW_WINDOW,
+                per_second=SENTRY_TRACES_PER_SECOND,
+            ),
+            profiles_sample_rate=SENTRY_PROFILES_SAMPLE_RATE,
         )
 
 # -----------------------------------------------------------------------------
@@ -309,7 +471,14 @@ STORAGES = {
 
 STATIC_URL = "/static/"
 STATICFILES_DIRS = [root_path("static")]
-STATIC_ROOT = tempfile.mkdtemp() if DEBUG else root_path("static_root")
+if DEBUG:
+    # The same directory at every start, rather than a new one each time.
+    # WhiteNoise warns when it is missing and DEBUG is off, as in tests.
+    static_root = Path(tempfile.gettempdir(), "django-starter-static")
+    static_root.mkdir(exist_ok=True)
+    STATIC_ROOT = str(static_root)
+else:
+    STATIC_ROOT = root_path("static_root")
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = root_path("media_root")
@@ -318,12 +487,18 @@ MEDIA_ROOT = root_path("media_root")
 # Django Debug Toolbar and Django Extensions
 # -----------------------------------------------------------------------------
 if DEBUG:
-    import socket
-
-    INSTALLED_APPS += ["debug_toolbar"]
     INTERNAL_IPS = ["127.0.0.1"]
 
-    hostname, _, ips = socket.gethostbyname_ex(socket.gethostname())
-    INTERNAL_IPS += [".".join(ip.split(".")[:-1] + ["1"]) for ip in ips]
+# Only the processes that serve requests (conf/wsgi.py, conf/asgi.py and
+# runserver) turn the toolbar on: loading its panels takes longer than the
+# rest of Django's setup, and workers and other commands never use them.
+DEBUG_TOOLBAR = DEBUG and env.bool("DEBUG_TOOLBAR", default=False)
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS += ["debug_toolbar"]
+    # Also shows the toolbar to the Docker host. Its address is looked up on
+    # the first request rather than when the settings are loaded.
+    DEBUG_TOOLBAR_CONFIG = {
+        "SHOW_TOOLBAR_CALLBACK": "apps.core.middleware.show_debug_toolbar",
+    }
 
     MIDDLEWARE.insert(0, "debug_toolbar.middleware.DebugToolbarMiddleware")
@@ -10,6 +10,9 @@ CACHES = {
 # Match production middleware ordering — insert at position 0
 MIDDLEWARE.insert(0, "conf.test_utils.RequestIDMiddleware")  # noqa
 
+# Inspect the queries of every test request
+QUERY_INSPECTOR_SAMPLE_RATE = 1.0
+
 # Use mock filter that provides all JSON formatter fields
 LOGGING["filters"]["request_id"]["()"] = "conf.test_utils.RequestIDFilter"  # noqa
 LOGGING["loggers"]["apps"]["level"] = "DEBUG"  # noqa
@@ -18,3 +21,7 @@ LOGGING["loggers"]["apps"]["level"] = "DEBUG"  # noqa
 REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]["user_login"] = "1000/minute"  # noqa
 REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]["user"] = "1000/minute"  # noqa
 REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]["anon"] = "1000/minute"  # noqa
+
+# Relax login lockouts for tests
+LOGIN_LOCKOUT_EMAIL_THRESHOLD = 1000
+LOGIN_LOCKOUT_IP_THRESHOLD = 1000
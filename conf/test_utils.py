@@ -1,3 +1,7 @@
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+
+
 class RequestIDFilter:
     """Mock filter for tests that provides dummy values for all log record fields"""
 
@@ -11,12 +15,21 @@ class RequestIDFilter:
         return True
 
 
+@sync_and_async_middleware
 def mock_request_id(get_response):
     """Test utility to mock request ID generation"""
 
-    def middleware(request):
-        request.id = "test-request-id"
-        return get_response(request)
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            request.id = "test-request-id"
+            return await get_response(request)
+
+    else:
+
+        def middleware(request):
+            request.id = "test-request-id"
+            return get_response(request)
 
     return middleware
 
@@ -3,7 +3,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.shortcuts import render
 from django.urls import include, path
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+
+from apps.core import views as core_views
 
 
 # TODO 🚫 Delete the index view, route and template.
@@ -38,11 +39,24 @@ urlpatterns = [
             namespace="v1",
         ),
     ),
+    # Internal only, see METRICS_INTERNAL_IPS
+    path("metrics", core_views.metrics, name="metrics"),
+    # For load balancers and orchestrators, see docs/deployment.md
+    path(
+        "health/live/",
+        core_views.alive if settings.ASYNC_VIEWS else core_views.live,
+        name="health_live",
+    ),
+    path(
+        "health/ready/",
+        core_views.aready if settings.ASYNC_VIEWS else core_views.ready,
+        name="health_ready",
+    ),
     path("", index),
 ]
 
 if settings.DEBUG:
-    import debug_toolbar
+    from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
     urlpatterns += [
         path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
@@ -51,5 +65,9 @@ if settings.DEBUG:
             SpectacularSwaggerView.as_view(url_name="schema"),
             name="swagger-ui",
         ),
-        path("__debug__/", include(debug_toolbar.urls)),
     ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+if settings.DEBUG_TOOLBAR:
+    import debug_toolbar
+
+    urlpatterns += [path("__debug__/", include(debug_toolbar.urls))]
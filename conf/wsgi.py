@@ -11,6 +11,11 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from apps.core.fastpath import WSGIFastPaths
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "conf.settings")
+# Serves requests, so the debug toolbar is loaded when DEBUG is on
+os.environ.setdefault("DEBUG_TOOLBAR", "True")
 
-application = get_wsgi_application()
+# Answers the FAST_PATHS without going through Django's handler
+application = WSGIFastPaths(get_wsgi_application())
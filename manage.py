@@ -8,6 +8,10 @@ import sys
 def main():
     """Run administrative tasks."""
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "conf.settings")
+    # The development server is the only command that serves requests, and so
+    # the only one that loads the debug toolbar when DEBUG is on
+    if sys.argv[1:2] == ["runserver"]:
+        os.environ.setdefault("DEBUG_TOOLBAR", "True")
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc: